@@ -0,0 +1 @@
+"""压测工具：模拟接口、SMTP收信端和端到端压测脚本"""
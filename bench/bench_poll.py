@@ -0,0 +1,238 @@
+"""轮询引擎端到端压测
+
+在子进程中启动模拟成绩接口和SMTP收信端，用查询引擎驱动大量账号轮询，
+统计吞吐、成绩公布后的发现延迟、CPU和内存占用。每个考试季前跑一遍做回归。
+
+    python -m bench.bench_poll --accounts 1000 --interval 5 --publish-after 10
+    python -m bench.bench_poll --accounts 5000 --json > bench_output.json
+    python -m bench.bench_poll --accounts 1000 --replay day1.cassette --replay-speed 60
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+
+from bench.fake_server import FakeScoreServer
+from bench.smtp_sink import SmtpSink
+
+
+def _serve(conn, options):
+    """子进程：运行模拟接口和SMTP收信端，直到父进程要求停止"""
+    publish_at = time.time() + options["publish_after"]
+    server = FakeScoreServer(publish_at=publish_at, latency=options["latency"],
+                             latency_jitter=options["latency_jitter"], error_rate=options["error_rate"],
+                             throttle_rate=options["throttle_rate"], stall_rate=options["stall_rate"],
+                             stall=options["stall"]).start()
+    sink = SmtpSink().start()
+    conn.send((server.url, sink.port, publish_at))
+    conn.recv()
+    stats = server.snapshot()
+    stats["mails_received"] = sink.received
+    stats["smtp_connections"] = sink.connections
+    conn.send(stats)
+    server.stop()
+    sink.stop()
+
+
+def current_rss():
+    """当前进程常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # Linux上 ru_maxrss 单位为KB，macOS上为字节
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if sys.platform == "darwin" else rss * 1024
+    except ImportError:
+        return None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def _published(record):
+    """录制的响应是否为“成绩已公布”"""
+    try:
+        body = json.loads(record.get("body") or "")
+    except ValueError:
+        return False
+    return record.get("status") == 200 and isinstance(body, dict) and body.get("msg") == "ok" and bool(body.get("data"))
+
+
+def run_benchmark(options):
+    from scorecheck.config import build_account
+    from scorecheck.engine import PollEngine
+    from scorecheck.mailer import MailDispatcher
+    from scorecheck.metrics import PollMetrics
+    from scorecheck.profiling import profiler
+    from scorecheck.sharding import ShardedEngine
+
+    parent_conn, child_conn = multiprocessing.Pipe()
+    server_process = multiprocessing.Process(target=_serve, args=(child_conn, options), daemon=True)
+    server_process.start()
+    url, smtp_port, publish_at = parent_conn.recv()
+
+    rss_before = current_rss()
+    accounts = [build_account({
+        "name": f"bench{i}",
+        "url": url,
+        "cookie": f"PHPSESSID=bench{i // options['watchers']}",
+        "interval": options["interval"],
+        "fail_interval": 1000000,
+        "smtp_server": "127.0.0.1",
+        "smtp_port": smtp_port,
+        "smtp_ssl": False,
+        "sender_email": "bench@localhost",
+        "sender_pwd": "bench",
+        "receiver_email": f"bench{i}@localhost"
+    }) for i in range(options["accounts"])]
+
+    # 回放磁带时查询不访问模拟接口，成绩公布时间取磁带中第一次“已公布”响应的时刻
+    session = None
+    publish_offset = None
+    if options["replay"]:
+        from scorecheck.cassette import ReplayTransport
+        session = ReplayTransport(options["replay"], options["replay_speed"])
+        publish_offset = session.first(_published)
+        options["processes"] = 1
+
+    metrics = PollMetrics()
+    mailer_options = {"workers": 4, "queue_size": options["accounts"] + 100, "min_interval": 0}
+    mailer = MailDispatcher(**mailer_options)
+    if options["processes"] > 1:
+        engine = ShardedEngine(accounts, options["processes"], host_limit=options["host_limit"],
+                               metrics=metrics, mailer_options=mailer_options,
+                               hedge_percentile=options["hedge_percentile"], hedge_budget=options["hedge_budget"],
+                               rate_limit=options["rate_limit"])
+    else:
+        engine = PollEngine(accounts, host_limit=options["host_limit"], metrics=metrics, mailer=mailer, session=session,
+                            hedge_percentile=options["hedge_percentile"], hedge_budget=options["hedge_budget"],
+                            rate_limit=options["rate_limit"])
+
+    deadline = threading.Timer(options["duration"], engine.stop)
+    deadline.daemon = True
+    # 子进程的CPU在被回收后计入 os.times() 的 children 部分；模拟接口进程此时尚未回收，不会算进去
+    times_start = os.times()
+    if session is not None:
+        publish_at = time.time() + publish_offset / options["replay_speed"] if publish_offset is not None else None
+    if options["profile"]:
+        # 只分析本进程；多进程分片时子进程不在分析范围内
+        profiler.output_dir = options["profile"]
+        profiler.trace_allocations = options["trace_allocations"]
+        profiler.start()
+    wall_start = time.perf_counter()
+    deadline.start()
+    engine.run()
+    deadline.cancel()
+    profile_path = profiler.stop()
+    wall = time.perf_counter() - wall_start
+    times_end = os.times()
+    cpu = sum(times_end[:4]) - sum(times_start[:4])
+    rss_after = current_rss()
+    mailer.stop()
+
+    parent_conn.send("stop")
+    server_stats = parent_conn.recv()
+    server_process.join(5)
+
+    attempts = sum(state.attempt_count for state in engine.states)
+    detection = [state.published_at - publish_at for state in engine.states
+                 if state.published and publish_at is not None]
+    per_1k = 1000.0 / len(accounts)
+    summary = metrics.summary()
+    return {
+        "accounts": len(accounts),
+        "host_limit": options["host_limit"],
+        "wall_seconds": round(wall, 3),
+        "attempts": attempts,
+        "attempts_per_second": round(attempts / wall, 1) if wall else None,
+        "detected": len(detection),
+        "detection_p50": percentile(detection, 0.5),
+        "detection_p99": percentile(detection, 0.99),
+        "detection_max": max(detection) if detection else None,
+        "request_p50": summary["p50"],
+        "request_p99": summary["p99"],
+        "error_rate": summary["error_rate"],
+        "hedged": summary["hedged"],
+        "hedge_wins": summary["hedge_wins"],
+        "coalesced": summary["coalesced"],
+        "cpu_seconds": round(cpu, 3),
+        "cpu_seconds_per_1k_accounts": round(cpu * per_1k, 3),
+        "rss_mb": round(rss_after / 2 ** 20, 1) if rss_after else None,
+        "rss_mb_per_1k_accounts": round((rss_after - rss_before) * per_1k / 2 ** 20, 2)
+        if rss_after and rss_before else None,
+        "processes": options["processes"],
+        "mails_sent": mailer.stats()["sent"] if options["processes"] == 1 else None,
+        "server": server_stats,
+        "profile": profile_path,
+    }
+
+
+def print_report(report):
+    def seconds(value):
+        return "-" if value is None else f"{value:.3f}s"
+
+    print(f"账号数:           {report['accounts']}（{report['processes']} 个进程，每主机并发 {report['host_limit']}）")
+    print(f"运行时间:         {report['wall_seconds']}s，共 {report['attempts']} 次查询，"
+          f"{report['attempts_per_second']} 次/秒")
+    print(f"发现成绩:         {report['detected']}/{report['accounts']}，公布后延迟 "
+          f"p50 {seconds(report['detection_p50'])} / p99 {seconds(report['detection_p99'])} / "
+          f"最大 {seconds(report['detection_max'])}")
+    print(f"请求耗时:         p50 {seconds(report['request_p50'])} / p99 {seconds(report['request_p99'])}，"
+          f"错误率 {report['error_rate']:.1%}，对冲 {report['hedged']} 次（先返回 {report['hedge_wins']} 次），"
+          f"合并 {report['coalesced']} 次")
+    print(f"CPU:              {report['cpu_seconds']}s（每千账号 {report['cpu_seconds_per_1k_accounts']}s）")
+    print(f"内存:             RSS {report['rss_mb']}MB（每千账号增加 {report['rss_mb_per_1k_accounts']}MB）")
+    print(f"邮件:             发送 {report['mails_sent'] if report['mails_sent'] is not None else '-'}，收信端收到 {report['server']['mails_received']}，"
+          f"SMTP连接 {report['server']['smtp_connections']}")
+    if report["profile"]:
+        print(f"性能分析:         {report['profile']}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="查询引擎端到端压测")
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--interval", type=int, default=5, help="每个账号的查询间隔（秒）")
+    parser.add_argument("--publish-after", type=float, default=10, help="开始后多少秒公布成绩")
+    parser.add_argument("--duration", type=float, default=60, help="最长运行时间（秒）")
+    parser.add_argument("--host-limit", type=int, default=32)
+    parser.add_argument("--processes", type=int, default=1, help="查询进程数（多进程分片）")
+    parser.add_argument("--latency", type=float, default=0.01, help="模拟接口响应延迟（秒）")
+    parser.add_argument("--latency-jitter", type=float, default=0.01)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="模拟接口卡住的请求比例")
+    parser.add_argument("--stall", type=float, default=10.0, help="卡住的请求额外延迟（秒）")
+    parser.add_argument("--hedge-percentile", type=float, default=0, help="开启对冲请求的耗时分位数，0为关闭")
+    parser.add_argument("--hedge-budget", type=float, default=0.05, help="对冲请求最多占全部请求的比例")
+    parser.add_argument("--rate-limit", type=float, default=0, help="每秒最多请求数，0为不限速")
+    parser.add_argument("--replay", metavar="CASSETTE", help="回放录制的磁带代替模拟接口")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="回放速度倍数")
+    parser.add_argument("--profile", metavar="DIR", help="运行期间开启性能分析，报告写入该目录")
+    parser.add_argument("--trace-allocations", action="store_true", help="性能分析时用tracemalloc记录分配位置")
+    parser.add_argument("--watchers", type=int, default=1, help="每个考生账号被多少个收件人同时关注（相同Cookie）")
+    parser.add_argument("--json", action="store_true", help="以JSON输出结果")
+    return parser
+
+
+def main(argv=None):
+    options = vars(build_parser().parse_args(argv))
+    report = run_benchmark(options)
+    if options["json"]:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == "__main__":
+    main()
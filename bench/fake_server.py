@@ -0,0 +1,162 @@
+"""本地模拟的成绩查询接口
+
+模拟 /query/score/result 的POST接口，可配置响应延迟、卡住的请求、错误率、429限流，
+并在指定时间“公布成绩”。用于压测和回归测试，不会访问真实网站。
+
+    python -m bench.fake_server --port 8000 --publish-in 60 --latency 0.05 --error-rate 0.01
+
+控制接口：
+    GET  /_stats            请求统计（JSON）
+    POST /_control/publish  立即公布成绩
+    POST /_control/reset    恢复为未公布
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+NOT_PUBLISHED = {"msg": "成绩尚未公布", "data": None}
+
+
+class FakeScoreServer:
+    """可编程的模拟成绩服务器"""
+
+    def __init__(self, port=0, host="127.0.0.1", publish_at=None, latency=0.0, latency_jitter=0.0,
+                 error_rate=0.0, throttle_rate=0.0, retry_after=5, seed=None, stall_rate=0.0, stall=0.0):
+        self.publish_at = publish_at
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.stall_rate = stall_rate
+        self.stall = stall
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "published": 0, "not_published": 0, "errors": 0, "throttled": 0,
+                      "stalled": 0}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(handler):
+                length = int(handler.headers.get("Content-Length", 0))
+                handler.rfile.read(length)
+                if handler.path.startswith("/_control/"):
+                    server.control(handler.path[len("/_control/"):])
+                    handler.reply(200, {"msg": "ok"})
+                    return
+                status, body, headers = server.respond(handler.headers.get("Cookie", ""))
+                handler.reply(status, body, headers)
+
+            def do_GET(handler):
+                if handler.path == "/_stats":
+                    handler.reply(200, server.snapshot())
+                else:
+                    handler.reply(200, {"msg": "ok"})
+
+            def do_HEAD(handler):
+                handler.send_response(200)
+                handler.send_header("Content-Length", "0")
+                handler.end_headers()
+
+            def reply(handler, status, body, headers=None):
+                data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+                handler.send_response(status)
+                handler.send_header("Content-Type", "application/json; charset=utf-8")
+                handler.send_header("Content-Length", str(len(data)))
+                for key, value in (headers or {}).items():
+                    handler.send_header(key, value)
+                handler.end_headers()
+                handler.wfile.write(data)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self.url = f"http://{host}:{self.port}/query/score/result"
+        self._thread = None
+
+    @property
+    def published(self):
+        return self.publish_at is not None and time.time() >= self.publish_at
+
+    def control(self, action):
+        if action == "publish":
+            self.publish_at = time.time()
+        elif action == "reset":
+            self.publish_at = None
+
+    def respond(self, cookie):
+        """生成一次查询的 (状态码, 响应体, 额外响应头)"""
+        delay = self.latency + self.rng.uniform(0, self.latency_jitter) if self.latency_jitter else self.latency
+        if self.stall_rate and self.rng.random() < self.stall_rate:
+            # 模拟公布当天偶尔卡住很久的请求
+            delay += self.stall
+            with self._lock:
+                self.stats["stalled"] += 1
+        if delay:
+            time.sleep(delay)
+
+        roll = self.rng.random()
+        with self._lock:
+            self.stats["requests"] += 1
+            if roll < self.error_rate:
+                self.stats["errors"] += 1
+                return 500, {"msg": "服务器繁忙"}, None
+            if roll < self.error_rate + self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429, {"msg": "请求过于频繁"}, {"Retry-After": str(self.retry_after)}
+            if self.published:
+                self.stats["published"] += 1
+                return 200, {"msg": "ok", "data": {"cookie": cookie, "综合知识": 52, "案例分析": 48}}, None
+            self.stats["not_published"] += 1
+            return 200, NOT_PUBLISHED, None
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats["published_now"] = self.published
+        return stats
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="fake-score", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地模拟成绩查询接口")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--publish-in", type=float, help="多少秒后公布成绩（不填则不公布）")
+    parser.add_argument("--latency", type=float, default=0.0, help="固定响应延迟（秒）")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回500的比例")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="返回429的比例")
+    parser.add_argument("--stall-rate", type=float, default=0.0, help="卡住的请求比例")
+    parser.add_argument("--stall", type=float, default=10.0, help="卡住的请求额外延迟（秒）")
+    args = parser.parse_args(argv)
+
+    publish_at = time.time() + args.publish_in if args.publish_in is not None else None
+    server = FakeScoreServer(args.port, publish_at=publish_at, latency=args.latency,
+                             latency_jitter=args.latency_jitter, error_rate=args.error_rate,
+                             throttle_rate=args.throttle_rate, stall_rate=args.stall_rate, stall=args.stall)
+    print(f"模拟接口: {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""本地SMTP收信端
+
+接受任意登录，收下的邮件只计数并保留最近若干封，不会真正投递。
+只支持明文SMTP，账号配置里需设置 "smtp_ssl": false。
+
+    python -m bench.smtp_sink --port 2525
+"""
+import argparse
+import asyncio
+import threading
+from collections import deque
+
+
+class SmtpSink:
+    """最简SMTP服务器"""
+
+    def __init__(self, port=0, host="127.0.0.1", keep=100):
+        self.host = host
+        self.port = port
+        self.messages = deque(maxlen=keep)
+        self.received = 0
+        self.connections = 0
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+
+        def reply(line):
+            writer.write((line + "\r\n").encode("utf-8"))
+
+        reply("220 smtp-sink ready")
+        in_data = False
+        lines = []
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode("utf-8", "replace").rstrip("\r\n")
+                if in_data:
+                    if line == ".":
+                        in_data = False
+                        self.received += 1
+                        self.messages.append("\n".join(lines))
+                        lines = []
+                        reply("250 OK")
+                    else:
+                        lines.append(line[1:] if line.startswith("..") else line)
+                    continue
+
+                command = line.split(" ", 1)[0].upper()
+                if command == "EHLO":
+                    reply("250-smtp-sink")
+                    reply("250 AUTH PLAIN LOGIN")
+                elif command == "AUTH":
+                    reply("235 Authentication successful")
+                elif command == "DATA":
+                    in_data = True
+                    reply("354 End data with <CR><LF>.<CR><LF>")
+                elif command == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    break
+                else:
+                    reply("250 OK")
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="smtp-sink", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="本地SMTP收信端")
+    parser.add_argument("--port", type=int, default=2525)
+    args = parser.parse_args(argv)
+    sink = SmtpSink(args.port).start()
+    print(f"SMTP收信端: {sink.host}:{sink.port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print(f"共收到 {sink.received} 封邮件")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,33 @@
+import os
 import sys
-import re
-import requests
 import time
-import smtplib
-from email.mime.text import MIMEText
-from email.header import Header
-from urllib.parse import quote, unquote
+from concurrent.futures import CancelledError
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QGridLayout,
-                             QGroupBox, QLabel, QLineEdit, QPushButton, QTextEdit, QTabWidget,
+                             QGroupBox, QLabel, QLineEdit, QPushButton, QTabWidget,
                              QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox,
-                             QCheckBox, QProgressBar, QStyleFactory, QPlainTextEdit, QSplitter)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
-from PyQt5.QtGui import QFont, QPalette, QColor, QIcon, QTextCursor
+                             QCheckBox, QProgressBar, QStyleFactory, QPlainTextEdit, QSplitter, QFileDialog,
+                             QTableView, QComboBox)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QPalette, QColor, QIcon
+
+from scorecheck.config import DEFAULTS, ConfigError, build_account
+from scorecheck.engine import PollEngine
+from scorecheck.gui.dashboard import FILTER_NAMES, AccountTableModel
+from scorecheck.gui.tasks import TaskRunner
+from scorecheck.importer import import_accounts, parse_cookie, parse_curl
+from scorecheck.logpipe import DEBUG, INFO, WARNING, LogPipeline
+from scorecheck.mailer import SmtpProfile, shared_dispatcher
+from scorecheck.metrics import MetricsServer, PollMetrics
+from scorecheck.profiling import profiler
+from scorecheck.sharding import ShardedEngine
+from scorecheck.state_store import StateStore
+from scorecheck.throttle import CIRCUIT_NAMES
+
+# 界面查询时每个主机每秒最多请求数，账号再多也不会集中冲击服务器
+GUI_RATE_LIMIT = 5
+# 导入的账号达到这个数量时分到多个进程查询，单个事件循环处理几万个账号会占满一个CPU
+GUI_SHARD_THRESHOLD = 20000
+GUI_MAX_PROCESSES = 4
 
 # 主应用类
 class ScoreCheckerApp(QMainWindow):
@@ -38,12 +54,34 @@ class ScoreCheckerApp(QMainWindow):
         palette.setColor(QPalette.HighlightedText, Qt.black)
         self.setPalette(palette)
 
+        # 日志管道：界面只显示最近的日志，完整日志由后台线程写入滚动文件
+        self.logs = LogPipeline(capacity=5000, file_path="score_checker.log")
+        profiler.log = self.logs.log
+
+        # 查询指标，界面摘要和本地Prometheus接口共用
+        self.metrics = PollMetrics()
+        self.metrics_server = None
+
+        # 发送测试邮件、解析cURL、导入账号等阻塞操作都交给后台任务执行，界面不会卡住
+        self.tasks = TaskRunner(self)
+        self.tasks.busy_changed.connect(self.update_busy)
+
+        # 查询进度保存在本地数据库，重启后继续，已通知过的成绩不会重复发送
+        self.state_store = StateStore("score_checker_state.db")
+
         # 初始化UI
         self.init_ui()
 
         # 初始化默认值
         self.load_default_settings()
 
+        # 启动本地指标接口
+        try:
+            self.metrics_server = MetricsServer(self.metrics.registry).start()
+            self.log_message(f"指标接口: http://127.0.0.1:{self.metrics_server.port}/metrics")
+        except OSError as e:
+            self.log_message(f"指标接口启动失败: {str(e)}")
+
     def init_ui(self):
         # 创建主控件和布局
         central_widget = QWidget()
@@ -86,6 +124,21 @@ class ScoreCheckerApp(QMainWindow):
         parse_btn_layout.addWidget(clear_curl_btn)
 
         curl_layout.addLayout(parse_btn_layout)
+
+        # 批量导入（CSV或浏览器导出的HAR文件），在后台线程中解析
+        import_layout = QHBoxLayout()
+        self.import_btn = QPushButton("批量导入账号(CSV/HAR)")
+        self.import_btn.clicked.connect(self.import_accounts)
+        import_layout.addWidget(self.import_btn)
+
+        clear_import_btn = QPushButton("清除导入")
+        clear_import_btn.clicked.connect(self.clear_imported)
+        import_layout.addWidget(clear_import_btn)
+
+        self.import_label = QLabel("未导入账号，使用下方的单个账号设置")
+        import_layout.addWidget(self.import_label, 1)
+
+        curl_layout.addLayout(import_layout)
         basic_layout.addWidget(curl_group)
 
         # 查询设置组
@@ -128,6 +181,16 @@ class ScoreCheckerApp(QMainWindow):
         self.user_agent_input = QLineEdit()
         query_layout.addWidget(self.user_agent_input, 4, 1, 1, 3)
 
+        # 预计公布窗口（可选），窗口外低频轮询，临近和窗口内高频轮询
+        query_layout.addWidget(QLabel("预计公布时间:"), 5, 0)
+        self.release_start_input = QLineEdit()
+        self.release_start_input.setPlaceholderText("开始，如 2025-08-10 09:00（可选）")
+        query_layout.addWidget(self.release_start_input, 5, 1)
+        query_layout.addWidget(QLabel("至"), 5, 2)
+        self.release_end_input = QLineEdit()
+        self.release_end_input.setPlaceholderText("结束（可选）")
+        query_layout.addWidget(self.release_end_input, 5, 3)
+
         basic_layout.addWidget(query_group)
 
         # Cookie设置组
@@ -204,6 +267,35 @@ class ScoreCheckerApp(QMainWindow):
         mail_layout.addWidget(test_group)
         mail_layout.addStretch()
 
+        # 账号看板选项卡：表格只渲染可见行，引擎的更新按固定帧率合并刷新
+        dashboard_tab = QWidget()
+        dashboard_layout = QVBoxLayout(dashboard_tab)
+        tabs.addTab(dashboard_tab, "账号看板")
+
+        filter_layout = QHBoxLayout()
+        self.dashboard_filter_input = QLineEdit()
+        self.dashboard_filter_input.setPlaceholderText("按账号或考试阶段筛选")
+        self.dashboard_filter_input.textChanged.connect(self.filter_dashboard)
+        filter_layout.addWidget(self.dashboard_filter_input)
+
+        self.dashboard_status_combo = QComboBox()
+        self.dashboard_status_combo.addItems(FILTER_NAMES)
+        self.dashboard_status_combo.currentIndexChanged.connect(self.filter_dashboard)
+        filter_layout.addWidget(self.dashboard_status_combo)
+        dashboard_layout.addLayout(filter_layout)
+
+        self.dashboard_model = AccountTableModel(self)
+        self.dashboard_view = QTableView()
+        self.dashboard_view.setModel(self.dashboard_model)
+        self.dashboard_view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        self.dashboard_view.setSortingEnabled(True)
+        self.dashboard_view.verticalHeader().setVisible(False)
+        self.dashboard_view.verticalHeader().setDefaultSectionSize(22)
+        self.dashboard_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.dashboard_view.setSelectionBehavior(QTableView.SelectRows)
+        self.dashboard_view.setAlternatingRowColors(True)
+        dashboard_layout.addWidget(self.dashboard_view)
+
         # 添加设置区域到分割器
         splitter.addWidget(settings_widget)
 
@@ -214,12 +306,18 @@ class ScoreCheckerApp(QMainWindow):
         log_group = QGroupBox("运行日志")
         log_group_layout = QVBoxLayout(log_group)
 
-        self.log_output = QTextEdit()
+        self.log_output = QPlainTextEdit()
         self.log_output.setReadOnly(True)
+        self.log_output.setMaximumBlockCount(self.logs.capacity)
         self.log_output.setFont(QFont("Consolas", 10))
         self.log_output.setStyleSheet("background-color: #1e1e1e; color: #d4d4d4;")
         log_group_layout.addWidget(self.log_output)
 
+        # 定时批量刷新日志到界面，而不是每条日志都操作一次控件
+        self.log_timer = QTimer(self)
+        self.log_timer.timeout.connect(self.flush_logs)
+        self.log_timer.start(200)
+
         # 控制按钮区域
         control_layout = QHBoxLayout()
 
@@ -238,6 +336,15 @@ class ScoreCheckerApp(QMainWindow):
         self.clear_log_btn.clicked.connect(self.clear_log)
         control_layout.addWidget(self.clear_log_btn)
 
+        self.debug_log_check = QCheckBox("显示调试日志")
+        self.debug_log_check.toggled.connect(self.toggle_debug_log)
+        control_layout.addWidget(self.debug_log_check)
+
+        self.profile_check = QCheckBox("性能分析")
+        self.profile_check.setToolTip(f"记录各阶段耗时、采样调用栈并跟踪内存增长，取消勾选时把报告写入 {profiler.output_dir} 目录")
+        self.profile_check.toggled.connect(self.toggle_profiling)
+        control_layout.addWidget(self.profile_check)
+
         # 进度条
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
@@ -266,6 +373,16 @@ class ScoreCheckerApp(QMainWindow):
         log_layout.addWidget(self.progress_bar)
         log_layout.addWidget(self.status_label)
 
+        # 指标摘要
+        self.metrics_label = QLabel("暂无请求数据")
+        self.metrics_label.setAlignment(Qt.AlignCenter)
+        self.metrics_label.setStyleSheet("color: #9E9E9E;")
+        log_layout.addWidget(self.metrics_label)
+
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.timeout.connect(self.update_metrics)
+        self.metrics_timer.start(1000)
+
         # 添加日志区域到分割器
         splitter.addWidget(log_widget)
 
@@ -277,14 +394,17 @@ class ScoreCheckerApp(QMainWindow):
 
         # 初始化工作线程
         self.worker = None
+        self.import_task = None
+        self.test_email_task = None
+        self.imported_accounts = None
 
     def load_default_settings(self):
         """加载默认设置"""
-        self.url_input.setText("https://bm.ruankao.org.cn/query/score/result")
-        self.stage_input.setText("2025年上半年")
-        self.interval_input.setValue(600)
-        self.max_attempts_input.setValue(0)
-        self.user_agent_input.setText("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36")
+        self.url_input.setText(DEFAULTS["url"])
+        self.stage_input.setText(DEFAULTS["stage"])
+        self.interval_input.setValue(DEFAULTS["interval"])
+        self.max_attempts_input.setValue(DEFAULTS["max_attempts"])
+        self.user_agent_input.setText(DEFAULTS["user_agent"])
 
         # 设置默认Cookie
         cookies = []
@@ -295,11 +415,11 @@ class ScoreCheckerApp(QMainWindow):
             self.cookie_table.setItem(i, 1, QTableWidgetItem(value))
 
         # 邮件设置
-        self.smtp_server_input.setText("")
-        self.smtp_port_input.setValue(465)
-        self.sender_email_input.setText("")
-        self.sender_pwd_input.setText("")
-        self.receiver_email_input.setText("")
+        self.smtp_server_input.setText(DEFAULTS["smtp_server"])
+        self.smtp_port_input.setValue(DEFAULTS["smtp_port"])
+        self.sender_email_input.setText(DEFAULTS["sender_email"])
+        self.sender_pwd_input.setText(DEFAULTS["sender_pwd"])
+        self.receiver_email_input.setText(DEFAULTS["receiver_email"])
 
     def add_cookie_row(self):
         """添加Cookie行"""
@@ -322,17 +442,66 @@ class ScoreCheckerApp(QMainWindow):
         self.log_output.clear()
         self.log_message("日志已清空")
 
-    def log_message(self, message):
-        """记录日志消息"""
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] {message}"
+    def log_message(self, message, level=INFO):
+        """记录日志消息（可在任意线程调用，由定时器批量显示）"""
+        self.logs.log(message, level)
 
-        # 在界面上显示日志
-        self.log_output.append(log_entry)
-        self.log_output.moveCursor(QTextCursor.End)
+    def flush_logs(self):
+        """把新日志批量追加到日志区域"""
+        lines = self.logs.drain()
+        if lines:
+            self.log_output.appendPlainText("\n".join(lines))
 
-        # 同时在控制台打印
-        print(log_entry)
+    def update_metrics(self):
+        """刷新指标摘要"""
+        summary = self.metrics.summary()
+        if not summary["total"]:
+            return
+        counts = summary["counts"]
+
+        def ms(value):
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        self.metrics_label.setText(
+            f"请求 {summary['total']} 次 | 已公布 {counts['published']} | 未公布 {counts['not_published']} | "
+            f"HTTP错误 {counts['http_error']} | 异常 {counts['exception']} | "
+            f"耗时 p50 {ms(summary['p50'])} / p99 {ms(summary['p99'])} | 错误率 {summary['error_rate']:.1%}"
+            + (f" | 对冲 {summary['hedged']}（胜 {summary['hedge_wins']}）" if summary["hedged"] else "")
+            + (f" | 合并 {summary['coalesced']}" if summary["coalesced"] else "")
+            + (f" | 登录失效 {counts['logged_out']}" if counts["logged_out"] else "")
+            + (f" | 被拦截 {counts['blocked']}" if counts["blocked"] else "")
+            + (f" | 已隔离 {summary['quarantined']} 个账号" if summary["quarantined"] else "")
+            + "".join(f" | {host} {CIRCUIT_NAMES[state]}" for host, state in summary["circuits"].items())
+        )
+
+    def filter_dashboard(self, *args):
+        """按筛选条件刷新账号看板"""
+        self.dashboard_model.set_filter(self.dashboard_filter_input.text(),
+                                        self.dashboard_status_combo.currentIndex())
+
+    def toggle_debug_log(self, checked):
+        """切换是否显示每次请求的详细内容"""
+        self.logs.level = DEBUG if checked else INFO
+
+    def toggle_profiling(self, checked):
+        """开启或关闭性能分析，关闭时在后台写出报告"""
+        if checked:
+            profiler.start()
+            return
+        self.profile_check.setEnabled(False)
+        self.tasks.submit(profiler.stop, name="写出性能分析报告", on_done=self.profiling_saved,
+                          on_error=self.profiling_failed)
+
+    def profiling_saved(self, path):
+        """性能分析报告已写出"""
+        self.profile_check.setEnabled(True)
+        if path:
+            self.profile_check.setToolTip(f"上次报告: {os.path.abspath(path)}")
+
+    def profiling_failed(self, error):
+        """写出性能分析报告失败"""
+        self.profile_check.setEnabled(True)
+        self.log_message(f"写出性能分析报告时出错: {str(error)}", WARNING)
 
     def get_cookie_string(self):
         """从表格中获取Cookie字符串"""
@@ -347,94 +516,148 @@ class ScoreCheckerApp(QMainWindow):
         return "; ".join(cookie_items)
 
     def parse_curl(self):
-        """解析cURL命令"""
+        """解析cURL命令（在后台任务中解析，完成后填充到界面）"""
         curl_text = self.curl_input.toPlainText().strip()
         if not curl_text:
             self.log_message("错误: cURL输入为空")
             QMessageBox.warning(self, "解析错误", "请粘贴有效的cURL命令")
             return
 
-        try:
-            # 解析URL
-            url_match = re.search(r"curl\s+['\"](https?://[^'\"]+)['\"]", curl_text)
-            if not url_match:
-                self.log_message("错误: 无法解析URL")
-                raise ValueError("无法解析URL")
-
-            url = url_match.group(1)
-            self.url_input.setText(url)
-            self.log_message(f"解析URL: {url}")
-
-            # 解析请求头
-            headers = {}
-            header_matches = re.findall(r"-H\s+['\"]([^'\"]+)['\"]", curl_text)
-            for header in header_matches:
-                if ':' in header:
-                    key, value = header.split(':', 1)
-                    key = key.strip()
-                    value = value.strip()
-                    headers[key] = value
-                    self.log_message(f"解析请求头: {key} = {value}")
-
-            # 更新特定请求头
-            if "User-Agent" in headers:
-                self.user_agent_input.setText(headers["User-Agent"])
-                self.log_message(f"设置User-Agent: {headers['User-Agent']}")
-
-            # 解析Cookie
-            cookie_match = re.search(r"-b\s+['\"]([^'\"]+)['\"]", curl_text)
-            if not cookie_match:
-                cookie_match = re.search(r"--cookie\s+['\"]([^'\"]+)['\"]", curl_text)
-
-            if cookie_match:
-                cookie_str = cookie_match.group(1)
-                self.log_message(f"解析Cookie字符串: {cookie_str}")
-
-                # 清除现有Cookie
-                self.cookie_table.setRowCount(0)
-
-                # 解析Cookie键值对
-                cookies = []
-                for cookie in cookie_str.split(';'):
-                    cookie = cookie.strip()
-                    if '=' in cookie:
-                        key, value = cookie.split('=', 1)
-                        cookies.append((key.strip(), value.strip()))
-
-                # 填充Cookie表格
-                self.cookie_table.setRowCount(len(cookies))
-                for i, (key, value) in enumerate(cookies):
-                    self.cookie_table.setItem(i, 0, QTableWidgetItem(key))
-                    self.cookie_table.setItem(i, 1, QTableWidgetItem(value))
-                    self.log_message(f"添加Cookie: {key} = {value}")
-
-            # 解析请求数据
-            data_match = re.search(r"--data-raw\s+['\"]([^'\"]+)['\"]", curl_text)
-            if not data_match:
-                data_match = re.search(r"--data\s+['\"]([^'\"]+)['\"]", curl_text)
-
-            if data_match:
-                data_str = data_match.group(1)
-                self.log_message(f"解析请求数据: {data_str}")
-
-                # 尝试解析考试阶段
-                if 'stage=' in data_str:
-                    stage_match = re.search(r"stage=([^&]+)", data_str)
-                    if stage_match:
-                        stage_encoded = stage_match.group(1)
-                        stage = unquote(stage_encoded)
-                        self.stage_input.setText(stage)
-                        self.log_message(f"解析考试阶段: {stage}")
-
-            self.log_message("cURL解析完成")
-            QMessageBox.information(self, "解析成功", "cURL命令已成功解析并填充到相应字段")
-
-        except Exception as e:
-            self.log_message(f"解析cURL时出错: {str(e)}")
-            QMessageBox.critical(self, "解析错误", f"解析cURL时出错:\n{str(e)}")
+        self.parse_curl_btn.setEnabled(False)
+        self.tasks.submit(parse_curl, curl_text, name="解析cURL", timeout=10,
+                          on_done=self.curl_parsed, on_error=self.curl_failed)
+
+    def curl_parsed(self, request):
+        """把解析出的cURL内容填充到相应字段"""
+        self.parse_curl_btn.setEnabled(True)
+
+        url = request["url"]
+        self.url_input.setText(url)
+        self.log_message(f"解析URL: {url}")
+
+        for key, value in request["headers"].items():
+            self.log_message(f"解析请求头: {key} = {value}")
+
+        # 更新特定请求头
+        if request["user_agent"]:
+            self.user_agent_input.setText(request["user_agent"])
+            self.log_message(f"设置User-Agent: {request['user_agent']}")
+
+        # 解析Cookie
+        if request["cookie"]:
+            self.log_message(f"解析Cookie字符串: {request['cookie']}")
+
+            # 填充Cookie表格
+            cookies = parse_cookie(request["cookie"])
+            self.cookie_table.setRowCount(len(cookies))
+            for i, (key, value) in enumerate(cookies):
+                self.cookie_table.setItem(i, 0, QTableWidgetItem(key))
+                self.cookie_table.setItem(i, 1, QTableWidgetItem(value))
+                self.log_message(f"添加Cookie: {key} = {value}")
+
+        # 解析请求数据中的考试阶段
+        if request["data"]:
+            self.log_message(f"解析请求数据: {request['data']}")
+        if request["stage"]:
+            self.stage_input.setText(request["stage"])
+            self.log_message(f"解析考试阶段: {request['stage']}")
+
+        self.log_message("cURL解析完成")
+        QMessageBox.information(self, "解析成功", "cURL命令已成功解析并填充到相应字段")
+
+    def curl_failed(self, error):
+        """cURL解析失败"""
+        self.parse_curl_btn.setEnabled(True)
+        self.log_message(f"解析cURL时出错: {str(error)}")
+        QMessageBox.critical(self, "解析错误", f"解析cURL时出错:\n{str(error)}")
+
+    def form_params(self):
+        """界面上填写的查询参数（未校验）"""
+        return {
+            "url": self.url_input.text(),
+            "stage": self.stage_input.text(),
+            "interval": self.interval_input.value(),
+            "max_attempts": self.max_attempts_input.value(),
+            "fail_interval": self.fail_interval_input.value(),
+            "user_agent": self.user_agent_input.text(),
+            "cookie": self.get_cookie_string(),
+            "release_start": self.release_start_input.text(),
+            "release_end": self.release_end_input.text(),
+            "smtp_server": self.smtp_server_input.text(),
+            "smtp_port": self.smtp_port_input.value(),
+            "sender_email": self.sender_email_input.text(),
+            "sender_pwd": self.sender_pwd_input.text(),
+            "receiver_email": self.receiver_email_input.text()
+        }
+
+    def import_accounts(self):
+        """选择CSV或HAR文件，在后台任务中导入账号；导入过程中再次点击则取消"""
+        if self.import_task is not None:
+            self.import_task.cancel()
+            return
+        if self.worker:
+            QMessageBox.warning(self, "无法导入", "请先停止正在进行的查询")
+            return
+        path, _ = QFileDialog.getOpenFileName(self, "选择账号文件", "",
+                                              "账号文件 (*.csv *.har *.json);;所有文件 (*)")
+        if not path:
+            return
+
+        # 文件中没有的字段使用界面上的设置
+        defaults = self.form_params()
+        del defaults["cookie"]
+
+        self.log_message(f"开始导入账号: {path}")
+        self.import_btn.setText("取消导入")
+        self.progress_bar.setValue(0)
+        # 追加导入时在副本上进行，看板显示的注册表在导入完成后才整体替换
+        registry = self.imported_accounts
+        self.import_task = self.tasks.submit(
+            lambda task: import_accounts(path, defaults, registry.copy() if registry is not None else None,
+                                         progress=task.progress, should_stop=lambda: task.cancelled),
+            name="导入账号", pass_task=True, on_done=self.import_finished, on_error=self.import_failed,
+            on_progress=self.update_progress)
+
+    def import_finished(self, result):
+        """导入完成"""
+        self.import_task = None
+        self.import_btn.setText("批量导入账号(CSV/HAR)")
+        self.progress_bar.setValue(0)
+        self.imported_accounts = result.accounts
+        self.dashboard_model.set_registry(result.accounts)
+        self.import_label.setText(f"已导入 {len(result.accounts)} 个账号")
+        self.log_message(f"导入完成：新增 {result.added} 个账号，重复 {result.duplicates} 个，无效 {result.invalid} 个")
+        for error in result.errors:
+            self.log_message(f"导入错误: {error}", WARNING)
+
+    def import_failed(self, error):
+        """导入出错或被取消"""
+        self.import_task = None
+        self.import_btn.setText("批量导入账号(CSV/HAR)")
+        self.progress_bar.setValue(0)
+        if isinstance(error, CancelledError):
+            # 导入在副本上进行，取消后仍是导入前的账号
+            self.log_message("已取消导入")
+            return
+        self.log_message(f"导入账号失败: {str(error)}")
+        QMessageBox.critical(self, "导入失败", f"导入账号失败:\n{str(error)}")
+
+    def clear_imported(self):
+        """清除导入的账号，恢复使用单个账号设置"""
+        if self.worker:
+            QMessageBox.warning(self, "无法清除", "请先停止查询")
+            return
+        self.imported_accounts = None
+        self.dashboard_model.set_registry(None)
+        self.import_label.setText("未导入账号，使用下方的单个账号设置")
+        self.log_message("已清除导入的账号")
 
     def send_test_email(self):
-        """发送测试邮件"""
+        """发送测试邮件（发送中再次点击则取消）"""
+        if self.test_email_task is not None:
+            self.test_email_task.cancel()
+            return
+
         smtp_server = self.smtp_server_input.text()
         smtp_port = self.smtp_port_input.value()
         sender_email = self.sender_email_input.text()
@@ -449,35 +672,53 @@ class ScoreCheckerApp(QMainWindow):
 
         self.log_message("开始发送测试邮件...")
 
-        try:
-            subject = "软考成绩查询工具测试邮件"
-            content = """
-            <h2>测试邮件</h2>
-            <p>这是一封来自软考成绩查询工具的测试邮件。</p>
-            <p>如果您能收到此邮件，说明您的邮件配置是正确的。</p>
-            <p style="color:gray">发送时间: {}</p>
-            """.format(time.strftime('%Y-%m-%d %H:%M:%S'))
-
-            msg = MIMEText(content, "html", "utf-8")
-            msg["Subject"] = Header(subject, "utf-8")
-            msg["From"] = sender_email
-            msg["To"] = receiver_email
-
-            with smtplib.SMTP_SSL(smtp_server, smtp_port) as server:
-                server.login(sender_email, sender_pwd)
-                server.sendmail(sender_email, [receiver_email], msg.as_string())
-
-            self.log_message("测试邮件发送成功！")
-            self.test_result_label.setText("测试邮件发送成功！")
-            self.test_result_label.setStyleSheet("color: green;")
-        except Exception as e:
-            error_msg = f"邮件发送失败: {str(e)}"
-            self.log_message(error_msg)
-            self.test_result_label.setText(error_msg)
-            self.test_result_label.setStyleSheet("color: red;")
+        subject = "软考成绩查询工具测试邮件"
+        content = """
+        <h2>测试邮件</h2>
+        <p>这是一封来自软考成绩查询工具的测试邮件。</p>
+        <p>如果您能收到此邮件，说明您的邮件配置是正确的。</p>
+        <p style="color:gray">发送时间: {}</p>
+        """.format(time.strftime('%Y-%m-%d %H:%M:%S'))
+
+        # 通过共享的发送队列发送，复用已登录的SMTP连接；界面只等待结果回调
+        profile = SmtpProfile(smtp_server, smtp_port, sender_email, sender_pwd, True)
+        future = shared_dispatcher().submit(profile, [receiver_email], subject, content)
+        self.test_email_task = self.tasks.watch(future, name="测试邮件发送", timeout=60,
+                                                on_done=self.test_email_sent, on_error=self.test_email_failed)
+        self.test_email_btn.setText("取消发送")
+        self.test_result_label.setText("正在发送测试邮件...")
+        self.test_result_label.setStyleSheet("color: #9E9E9E;")
+
+    def test_email_sent(self, result):
+        """测试邮件发送成功"""
+        self.test_email_task = None
+        self.test_email_btn.setText("测试邮件发送")
+        self.log_message("测试邮件发送成功！")
+        self.test_result_label.setText("测试邮件发送成功！")
+        self.test_result_label.setStyleSheet("color: green;")
+
+    def test_email_failed(self, error):
+        """测试邮件发送失败、超时或被取消"""
+        self.test_email_task = None
+        self.test_email_btn.setText("测试邮件发送")
+        if isinstance(error, CancelledError):
+            self.log_message("已取消测试邮件")
+            self.test_result_label.setText("已取消")
+            self.test_result_label.setStyleSheet("color: #9E9E9E;")
+            return
+        error_msg = f"邮件发送失败: {str(error)}"
+        self.log_message(error_msg)
+        self.test_result_label.setText(error_msg)
+        self.test_result_label.setStyleSheet("color: red;")
 
     def start_checking(self):
         """开始查询"""
+        if self.imported_accounts is not None:
+            self.log_message(f"使用导入的 {len(self.imported_accounts)} 个账号启动查询任务...")
+            self.start_worker(self.imported_accounts)
+            self.log_message(f"开始查询 {len(self.imported_accounts)} 个账号的软考成绩...")
+            return
+
         # 验证必要参数
         if not self.url_input.text():
             self.log_message("错误: 请填写查询URL")
@@ -494,30 +735,16 @@ class ScoreCheckerApp(QMainWindow):
             QMessageBox.warning(self, "参数缺失", "请至少添加一个Cookie")
             return
 
-        # 获取参数
-        params = {
-            "url": self.url_input.text(),
-            "stage": self.stage_input.text(),
-            "interval": self.interval_input.value(),
-            "max_attempts": self.max_attempts_input.value(),
-            "fail_interval": self.fail_interval_input.value(),
-            "user_agent": self.user_agent_input.text(),
-            "cookie": self.get_cookie_string(),
-            "smtp_server": self.smtp_server_input.text(),
-            "smtp_port": self.smtp_port_input.value(),
-            "sender_email": self.sender_email_input.text(),
-            "sender_pwd": self.sender_pwd_input.text(),
-            "receiver_email": self.receiver_email_input.text()
-        }
+        # 获取参数（与无界面模式共用同一套参数构建逻辑）
+        try:
+            params = build_account(self.form_params())
+        except ConfigError as e:
+            self.log_message(f"错误: {e}")
+            QMessageBox.warning(self, "参数缺失", str(e))
+            return
 
         # 检查邮件配置是否完整
-        email_fields = [
-            params["smtp_server"],
-            params["sender_email"],
-            params["sender_pwd"],
-            params["receiver_email"]
-        ]
-        enable_email = all(email_fields)  # 所有字段都有值才启用邮件
+        enable_email = params["enable_email"]
 
         if enable_email:
             self.log_message("邮件配置完整，启用邮件通知功能")
@@ -529,15 +756,19 @@ class ScoreCheckerApp(QMainWindow):
         self.log_message(f"目标URL: {params['url']}")
         self.log_message(f"考试阶段: {params['stage']}")
         self.log_message(f"请求间隔: {params['interval']}秒")
+        if params["release_start"]:
+            self.log_message(f"预计公布时间: {params['release_start']} 至 {params['release_end'] or '不限'}")
         self.log_message(f"最大尝试次数: {'无限' if params['max_attempts'] == 0 else params['max_attempts']}")
         self.log_message(f"失败提醒间隔: 每 {params['fail_interval']} 次失败发送提醒")
 
-        # 添加邮件配置状态到参数
-        params["enable_email"] = enable_email
+        self.start_worker([params])
+        self.log_message(f"开始查询 {params['stage']} 软考成绩...")
 
-        # 启动工作线程
-        self.worker = WorkerThread(params)
-        self.worker.log_signal.connect(self.log_message)
+    def start_worker(self, accounts):
+        """启动工作线程"""
+        self.worker = WorkerThread(accounts, self.log_message, self.metrics, self.state_store,
+                                   self.dashboard_model.mark_changed)
+        self.dashboard_model.set_registry(self.worker.engine.accounts)
         self.worker.status_signal.connect(self.update_status)
         self.worker.progress_signal.connect(self.update_progress)
         self.worker.finished.connect(self.worker_finished)
@@ -550,7 +781,6 @@ class ScoreCheckerApp(QMainWindow):
 
         # 启动线程
         self.worker.start()
-        self.log_message(f"开始查询 {params['stage']} 软考成绩...")
 
     def stop_checking(self):
         """停止查询"""
@@ -576,192 +806,70 @@ class ScoreCheckerApp(QMainWindow):
         """更新进度条"""
         self.progress_bar.setValue(value)
 
+    def update_busy(self, count):
+        """在状态栏显示正在进行的后台任务数"""
+        if count:
+            self.statusBar().showMessage(f"后台任务进行中（{count}个）")
+        else:
+            self.statusBar().clearMessage()
+
+    def closeEvent(self, event):
+        """关闭窗口时停止查询并发完队列中的邮件"""
+        if self.worker and self.worker.isRunning():
+            self.worker.stop()
+            self.worker.wait(5000)
+        self.tasks.shutdown()
+        profiler.stop()
+        shared_dispatcher().stop(timeout=5)
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        self.state_store.close()
+        self.logs.close()
+        super().closeEvent(event)
+
 
 # 工作线程类
 class WorkerThread(QThread):
-    log_signal = pyqtSignal(str)
+    """在后台线程中运行多账号异步轮询引擎"""
     status_signal = pyqtSignal(str)
     progress_signal = pyqtSignal(int)
 
-    def __init__(self, params):
+    def __init__(self, accounts, log, metrics=None, store=None, changed=None):
         super().__init__()
-        self.params = params
-        self.running = True
-        self.attempt_count = 0
-        self.fail_count = 0
+        changed = changed or (lambda index: None)
+        processes = min(os.cpu_count() or 1, GUI_MAX_PROCESSES) if len(accounts) >= GUI_SHARD_THRESHOLD else 1
+        if processes > 1:
+            # 子进程各自打开同一个状态库，账号状态发回本进程的注册表，看板照常显示
+            self.engine = ShardedEngine(
+                accounts,
+                processes,
+                log=log,
+                metrics=metrics,
+                state_file=store.path if store is not None else None,
+                changed=changed,
+                rate_limit=GUI_RATE_LIMIT,
+                status=self.status_signal.emit,
+                progress=self.progress_signal.emit
+            )
+            return
+        self.engine = PollEngine(
+            accounts,
+            log=log,
+            metrics=metrics,
+            store=store,
+            changed=changed,
+            rate_limit=GUI_RATE_LIMIT,
+            status=self.status_signal.emit,
+            progress=self.progress_signal.emit
+        )
 
     def run(self):
         """线程主函数"""
-        self.log_signal.emit(f"任务启动，最大尝试次数: {'无限' if self.params['max_attempts'] == 0 else self.params['max_attempts']}")
-        self.log_signal.emit(f"邮件通知功能: {'启用' if self.params['enable_email'] else '禁用'}")
-
-        while self.running and (self.params["max_attempts"] == 0 or self.attempt_count < self.params["max_attempts"]):
-            self.attempt_count += 1
-            self.fail_count += 1
-
-            current_time = time.strftime('%Y-%m-%d %H:%M:%S')
-            self.log_signal.emit(f"\n尝试 #{self.attempt_count} [{current_time}]")
-            self.status_signal.emit(f"尝试 #{self.attempt_count}")
-
-            # 更新进度
-            progress = min(100, self.attempt_count % 100)
-            self.progress_signal.emit(progress)
-
-            # 执行查询
-            self.log_signal.emit("正在发送查询请求...")
-            success, result = self.query_score()
-
-            if success:
-                self.log_signal.emit("🎉 成绩已公布！")
-                self.log_signal.emit(f"成绩信息：{result}")
-
-                # 发送成功通知邮件（如果邮件功能启用）
-                if self.params["enable_email"]:
-                    self.log_signal.emit("正在发送成绩通知邮件...")
-                    if self.send_email("成绩已公布", result):
-                        self.log_signal.emit("邮件通知已发送")
-                else:
-                    self.log_signal.emit("邮件功能未启用，跳过发送成绩通知")
-
-                self.status_signal.emit("成绩已公布")
-                self.progress_signal.emit(100)
-                break
-
-            self.log_signal.emit(f"查询结果: {result}")
-
-            # 检查是否需要发送失败提醒（如果邮件功能启用）
-            if self.params["enable_email"] and self.fail_count % self.params["fail_interval"] == 0:
-                self.log_signal.emit(f"达到失败提醒间隔 ({self.params['fail_interval']}次)，发送提醒邮件")
-                subject = f"软考成绩查询失败提醒 - 已尝试{self.attempt_count}次"
-                content = f"""
-                <h3>软考成绩查询失败提醒</h3>
-                <p>考试阶段：{self.params['stage']}</p>
-                <p>已尝试查询次数：{self.attempt_count}</p>
-                <p>最近一次错误：{result}</p>
-                <p>最后尝试时间：{current_time}</p>
-                """
-                self.send_email(subject, content)
-            elif self.fail_count % self.params["fail_interval"] == 0:
-                self.log_signal.emit(f"达到失败提醒间隔 ({self.params['fail_interval']}次)，但邮件功能未启用，跳过发送提醒")
-
-            # 检查是否继续
-            if not self.running:
-                break
-
-            # 等待下次查询
-            self.log_signal.emit(f"{self.params['interval']}秒后再次尝试...")
-            self.status_signal.emit(f"等待中... ({self.params['interval']}秒)")
-
-            # 分多次等待，以便可以中断
-            for i in range(self.params["interval"]):
-                if not self.running:
-                    break
-                if i % 30 == 0:  # 每30秒记录一次等待状态
-                    remaining = self.params["interval"] - i
-                    self.status_signal.emit(f"等待中... ({remaining}秒)")
-                time.sleep(1)
-
-        if self.running:
-            if self.attempt_count >= self.params["max_attempts"] and self.params["max_attempts"] > 0:
-                self.log_signal.emit("\n已达到最大尝试次数，停止查询")
-                self.status_signal.emit("已达最大尝试次数")
-            else:
-                self.log_signal.emit("\n查询已停止")
-                self.status_signal.emit("已停止")
+        self.engine.run()
 
     def stop(self):
         """停止线程"""
-        self.running = False
-        self.log_signal.emit("正在停止查询...")
-
-    def query_score(self):
-        """查询软考成绩"""
-        # 准备请求头
-        headers = {
-            "Accept": "*/*",
-            "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
-            "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-            "Cookie": self.params["cookie"],
-            "Origin": "https://bm.ruankao.org.cn",
-            "Referer": "https://bm.ruankao.org.cn/index.php/query/score",
-            "Priority": "u=1, i",
-            "Sec-Ch-Ua": '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
-            "Sec-Ch-Ua-Mobile": "?0",
-            "Sec-Ch-Ua-Platform": '"Windows"',
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin",
-            "User-Agent": self.params["user_agent"],
-            "X-Requested-With": "XMLHttpRequest"
-        }
-
-        # 准备表单数据（URL编码考试阶段）
-        data = {
-            "stage": self.params["stage"],
-            "jym": ""  # 空验证码
-        }
-
-        try:
-            self.log_signal.emit(f"请求URL: {self.params['url']}")
-            self.log_signal.emit(f"请求数据: stage={data['stage']}, jym={data['jym']}")
-
-            response = requests.post(
-                self.params["url"],
-                headers=headers,
-                data=data,
-                timeout=15
-            )
-
-            self.log_signal.emit(f"响应状态码: {response.status_code}")
-
-            if response.status_code == 200:
-                result = response.json()
-                self.log_signal.emit(f"响应内容: {result}")
-
-                # 检查是否包含成绩数据
-                if result.get("msg") == "ok" and result.get("data"):
-                    return True, result["data"]
-                return False, f"成绩未公布: {result.get('msg', '未知状态')}"
-
-            return False, f"HTTP错误: {response.status_code}"
-
-        except Exception as e:
-            return False, f"请求异常: {str(e)}"
-
-    def send_email(self, subject, content):
-        """发送邮件"""
-        try:
-            # 构建邮件内容
-            full_content = f"""
-            <h2>软考成绩查询通知</h2>
-            <p>考试阶段：{self.params['stage']}</p>
-            <p>查询时间：{time.strftime('%Y-%m-%d %H:%M:%S')}</p>
-            <hr>
-            {content}
-            <p style="color:gray">此邮件由自动查询脚本发送，请勿回复</p>
-            """
-
-            msg = MIMEText(full_content, "html", "utf-8")
-            msg["Subject"] = Header(subject, "utf-8")
-            msg["From"] = self.params["sender_email"]
-            msg["To"] = self.params["receiver_email"]
-
-            with smtplib.SMTP_SSL(
-                    self.params["smtp_server"],
-                    self.params["smtp_port"]
-            ) as server:
-                server.login(self.params["sender_email"], self.params["sender_pwd"])
-                server.sendmail(
-                    self.params["sender_email"],
-                    [self.params["receiver_email"]],
-                    msg.as_string()
-                )
-
-            self.log_signal.emit(f"邮件发送成功: {subject}")
-            return True
-        except Exception as e:
-            self.log_signal.emit(f"邮件发送失败: {str(e)}")
-            return False
+        self.engine.stop()
 
 
 # 运行应用
@@ -0,0 +1 @@
+"""软考成绩查询核心（不依赖PyQt5）"""
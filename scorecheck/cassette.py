@@ -0,0 +1,167 @@
+"""请求录制与回放
+
+录制（RecordingTransport）：包装真实的传输层，把每次查询的状态码、关键响应头、响应体和耗时
+逐行追加到磁带文件（JSON Lines，只追加不改写）。账号只记录由URL、考试阶段和Cookie算出的哈希，
+磁带里不含Cookie。
+回放（ReplayTransport）：不访问网络，按录制时的时间线返回响应，可以用 speed 加速，
+用于离线重现公布当天的流量、测量引擎的表现。
+
+    python -m scorecheck config.json --record day1.cassette
+    python -m scorecheck config.json --replay day1.cassette --replay-speed 60
+"""
+import bisect
+import json
+import threading
+import time
+
+from requests.structures import CaseInsensitiveDict
+
+from .state_store import account_key
+
+# 只录制会影响查询结果判断的响应头
+RECORDED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+
+def _stage(data):
+    return data.get("stage", "") if isinstance(data, dict) else ""
+
+
+class RecordingTransport:
+    """录制查询请求的传输层包装"""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = path
+        self.recorded = 0
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def post(self, url, cookie, user_agent, data, timeout=15, headers=None):
+        record = {"t": round(time.time(), 3), "url": url, "stage": _stage(data),
+                  "account": account_key(url, _stage(data), cookie)[:16]}
+        try:
+            response = self.inner.post(url, cookie, user_agent, data, timeout=timeout, headers=headers)
+        except Exception as e:
+            record["error"] = str(e)
+            self._append(record)
+            raise
+        record["status"] = response.status_code
+        record["headers"] = {key: response.headers[key] for key in RECORDED_HEADERS if response.headers.get(key)}
+        try:
+            record["body"] = response.content.decode("utf-8")
+        except UnicodeDecodeError:
+            record["body"] = response.content.decode("latin-1")
+            record["latin1"] = True
+        timings = getattr(response, "timings", None) or {}
+        record["timings"] = {phase: round(value, 6) for phase, value in timings.items()}
+        self._append(record)
+        return response
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._file.flush()
+            self.recorded += 1
+
+    def prewarm(self, *args, **kwargs):
+        prewarm = getattr(self.inner, "prewarm", None)
+        return prewarm(*args, **kwargs) if prewarm is not None else 0
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class ReplayResponse:
+    """回放的响应，提供 query_score 用到的属性"""
+
+    def __init__(self, record):
+        self.status_code = record["status"]
+        self.headers = CaseInsensitiveDict(record.get("headers") or {})
+        self.content = record["body"].encode("latin-1" if record.get("latin1") else "utf-8")
+        self.timings = dict(record.get("timings") or {})
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ReplayTransport:
+    """按录制的时间线回放响应
+
+    回放从第一次请求开始计时；每次请求返回同一账号在“当前回放时刻”之前最近的一条录制，
+    磁带中没有该账号时使用所有账号合并的时间线。响应按录制的耗时除以 speed 延迟返回，
+    录制时的请求异常按原样抛出。传给 PollEngine 的 timeline 参数时，轮询间隔和公布窗口也按同一时间线换算。
+    """
+
+    def __init__(self, path, speed=1.0, latency=True):
+        self.path = path
+        self.speed = speed
+        self.latency = latency
+        self.replayed = 0
+        self._start = None
+        self._started_at = None
+        self._lock = threading.Lock()
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+        if not records:
+            raise ValueError(f"磁带为空: {path}")
+        records.sort(key=lambda record: record["t"])
+        self.origin = records[0]["t"]
+        self.duration = records[-1]["t"] - self.origin
+        self._timelines = {}
+        for record in records:
+            self._timelines.setdefault(record["account"], []).append(record)
+        self._timelines[None] = records
+        self._offsets = {key: [record["t"] - self.origin for record in timeline]
+                         for key, timeline in self._timelines.items()}
+
+    def __len__(self):
+        return len(self._timelines[None])
+
+    def start(self):
+        """开始计时（第一次请求时自动开始）；返回开始时的时间戳"""
+        with self._lock:
+            if self._start is None:
+                self._start = time.monotonic()
+                self._started_at = time.time()
+            return self._started_at
+
+    def elapsed(self):
+        """当前回放到磁带的第几秒"""
+        self.start()
+        return (time.monotonic() - self._start) * self.speed
+
+    def wall_time(self, recorded):
+        """录制时的时间戳 recorded 在回放中对应的时间戳"""
+        return self.start() + (recorded - self.origin) / self.speed
+
+    def first(self, predicate):
+        """第一条满足条件的录制在磁带中的时刻（秒），没有时返回 None"""
+        for offset, record in zip(self._offsets[None], self._timelines[None]):
+            if predicate(record):
+                return offset
+        return None
+
+    def post(self, url, cookie, user_agent, data, timeout=15, headers=None):
+        key = account_key(url, _stage(data), cookie)[:16]
+        if key not in self._timelines:
+            key = None
+        offsets = self._offsets[key]
+        position = max(0, bisect.bisect_right(offsets, self.elapsed()) - 1)
+        record = self._timelines[key][position]
+        delay = (record.get("timings") or {}).get("total", 0.0) / self.speed if self.latency else 0.0
+        if delay:
+            time.sleep(min(delay, timeout))
+        with self._lock:
+            self.replayed += 1
+        if "error" in record:
+            raise RuntimeError(f"回放的请求异常: {record['error']}")
+        return ReplayResponse(record)
+
+    def close(self):
+        pass
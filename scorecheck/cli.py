@@ -0,0 +1,187 @@
+"""无界面运行入口
+
+    python -m scorecheck config.json               # 守护进程模式，持续轮询
+    python -m scorecheck config.json --check-once  # 每个账号只查询一次，适合cron
+    kill -USR1 <pid>                               # 开启/关闭性能分析，关闭时写出报告
+
+退出码：0 有账号查询到成绩，2 均未公布，1 配置错误。
+较重的模块在解析完参数后才导入，保证单次运行启动足够快。
+"""
+import argparse
+import signal
+import sys
+import threading
+import time
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="scorecheck", description="软考成绩自动查询（无界面模式）")
+    parser.add_argument("config", help="JSON配置文件路径")
+    parser.add_argument("--check-once", action="store_true", help="每个账号只查询一次后退出")
+    parser.add_argument("--host-limit", type=int, help="每个主机的最大并发请求数")
+    parser.add_argument("--processes", type=int, help="查询进程数，账号按Cookie分片到各进程")
+    parser.add_argument("--preview-schedule", type=float, metavar="HOURS",
+                        help="只打印未来若干小时每小时的预计请求数，不实际查询")
+    parser.add_argument("--metrics-port", type=int, help="在 127.0.0.1 的该端口提供Prometheus指标")
+    parser.add_argument("--log-file", help="结构化日志文件路径（按大小滚动）")
+    parser.add_argument("--state-file", help="查询状态数据库路径，重启后从中恢复进度")
+    parser.add_argument("--hedge-percentile", type=float, metavar="Q",
+                        help="请求超过近期耗时的Q分位数（如0.95）仍未返回时发出对冲请求")
+    parser.add_argument("--rate-limit", type=float, help="每个主机每秒最多请求数（所有账号合计）")
+    parser.add_argument("--http2", action="append", metavar="HOST",
+                        help="对该主机使用HTTP/2多路复用（可多次指定，需要安装 httpx[http2]）")
+    parser.add_argument("--record", metavar="CASSETTE", help="把每次查询的请求和响应追加录制到磁带文件")
+    parser.add_argument("--replay", metavar="CASSETTE", help="不访问网络，回放磁带文件中录制的响应（不发邮件、不保存状态）")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="回放速度倍数，轮询间隔和公布窗口按同样倍数换算到磁带的时间线")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出每次请求的详细内容")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不在控制台输出日志")
+    return parser
+
+
+def _tuning(engine_options):
+    """传给查询引擎的对冲、限速、熔断、预热、提醒汇总、传输协议和会话隔离参数"""
+    keys = ("hedge_percentile", "hedge_budget", "rate_limit", "breaker_threshold", "breaker_cooldown",
+            "prewarm_lead", "keepalive_interval", "digest_window", "http2_hosts", "quarantine_after")
+    return {key: engine_options[key] for key in keys}
+
+
+def _shortest_interval(policy):
+    """轮询策略在磁带时间线上的最短查询间隔（秒）"""
+    from .scheduler import PollScheduler
+    scheduler = PollScheduler.from_params(policy)
+    return min(scheduler.interval, scheduler.burst_interval)
+
+
+def print_load_profile(engine, duration):
+    """按小时打印调度器预计产生的请求数"""
+    groups = {}
+    for params in engine.accounts:
+        scheduler = engine.scheduler_for(params)
+        groups[scheduler] = groups.get(scheduler, 0) + 1
+
+    start = time.time()
+    totals = {}
+    for scheduler, count in groups.items():
+        for bucket_start, requests in scheduler.load_profile(start, duration, count):
+            totals[bucket_start] = totals.get(bucket_start, 0) + requests
+
+    for bucket_start in sorted(totals):
+        hour = time.strftime("%Y-%m-%d %H:%M", time.localtime(bucket_start))
+        print(f"{hour}  {totals[bucket_start]:>8} 次请求")
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    from .config import ConfigError, load_config
+    overrides = {}
+    if args.check_once:
+        overrides["max_attempts"] = 1
+    if args.replay:
+        overrides["enable_email"] = False
+    try:
+        accounts, engine_options = load_config(args.config, overrides or None)
+    except ConfigError as e:
+        print(f"配置错误: {e}", file=sys.stderr)
+        return 1
+
+    if args.host_limit:
+        engine_options["host_limit"] = args.host_limit
+    if args.hedge_percentile:
+        engine_options["hedge_percentile"] = args.hedge_percentile
+    if args.rate_limit:
+        engine_options["rate_limit"] = args.rate_limit
+    if args.http2:
+        engine_options["http2_hosts"] = list(engine_options["http2_hosts"]) + args.http2
+    if args.processes:
+        engine_options["processes"] = args.processes
+
+    from .engine import PollEngine
+    from .mailer import shared_dispatcher
+    from .logpipe import DEBUG, ERROR, INFO, WARNING, LogPipeline
+    from .registry import PUBLISHED
+    logs = LogPipeline(capacity=1000, level=DEBUG if args.verbose else INFO,
+                       file_path=args.log_file or engine_options.get("log_file"), console=not args.quiet)
+    log = logs.log
+    metrics = None
+    metrics_server = None
+    metrics_port = args.metrics_port or engine_options.get("metrics_port")
+    if metrics_port:
+        from .metrics import MetricsServer, PollMetrics
+        metrics = PollMetrics()
+        metrics_server = MetricsServer(metrics.registry, metrics_port).start()
+        log(f"指标接口: http://127.0.0.1:{metrics_server.port}/metrics")
+
+    if args.preview_schedule:
+        print_load_profile(PollEngine(accounts), args.preview_schedule * 3600)
+        logs.close()
+        return 0
+
+    state_file = args.state_file or engine_options.get("state_file")
+    store = None
+    session = None
+    if args.record or args.replay:
+        if engine_options["processes"] > 1 or engine_options["http2_hosts"]:
+            log("录制和回放只支持单进程HTTP/1.1，忽略 processes 和 http2_hosts 设置", WARNING)
+            engine_options["processes"] = 1
+            engine_options["http2_hosts"] = []
+        from .cassette import RecordingTransport, ReplayTransport
+        if args.replay:
+            session = ReplayTransport(args.replay, args.replay_speed)
+            state_file = None
+            log(f"回放 {args.replay}：{len(session)} 条录制，共 {session.duration:.0f} 秒，{args.replay_speed}倍速")
+            shortest = min(_shortest_interval(dict(policy)) for policy in accounts.policies.values)
+            if not args.check_once and shortest > session.duration:
+                log(f"最短轮询间隔 {shortest:.0f} 秒超过磁带时长，每个账号只能回放到一次查询；"
+                    f"请在配置中调小 interval/burst_interval", ERROR)
+                logs.close()
+                return 1
+        else:
+            from .http_session import shared_pool
+            session = RecordingTransport(shared_pool(pool_size=engine_options["host_limit"] * 2), args.record)
+            log(f"录制查询到 {args.record}")
+    if engine_options["processes"] > 1:
+        from .sharding import ShardedEngine
+        engine = ShardedEngine(accounts, engine_options["processes"], log=log,
+                               host_limit=engine_options["host_limit"], metrics=metrics, state_file=state_file,
+                               **_tuning(engine_options))
+    else:
+        if state_file:
+            from .state_store import StateStore
+            store = StateStore(state_file)
+        engine = PollEngine(accounts, log=log, host_limit=engine_options["host_limit"], metrics=metrics,
+                            store=store, session=session, timeline=session if args.replay else None,
+                            **_tuning(engine_options))
+
+    # 收到终止信号时优雅停止，与界面上的“停止查询”等价
+    def handle_signal(signum, frame):
+        engine.stop()
+
+    signal.signal(signal.SIGINT, handle_signal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, handle_signal)
+
+    # SIGUSR1 开关性能分析；写报告较慢，放到单独的线程里，不阻塞事件循环
+    from .profiling import profiler
+    profiler.output_dir = engine_options["profile_dir"]
+    profiler.trace_allocations = engine_options["profile_allocations"]
+    profiler.log = log
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: threading.Thread(target=profiler.toggle).start())
+
+    log(f"共 {len(accounts)} 个账号，{'单次查询' if args.check_once else '持续轮询'}")
+    engine.run()
+    profiler.stop()
+    shared_dispatcher().stop()
+    if store is not None:
+        store.close()
+    if session is not None:
+        session.close()
+    if metrics_server is not None:
+        metrics_server.stop()
+
+    published = engine.accounts.count(PUBLISHED)
+    log(f"查询结束：{published}/{len(accounts)} 个账号成绩已公布")
+    logs.close()
+    return 0 if published else 2
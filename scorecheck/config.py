@@ -0,0 +1,158 @@
+import json
+
+from .registry import AccountRegistry
+from .scheduler import parse_time
+
+
+# 默认设置（与界面上的默认值一致）
+DEFAULTS = {
+    "url": "https://bm.ruankao.org.cn/query/score/result",
+    "stage": "2025年上半年",
+    "interval": 600,
+    "max_attempts": 0,
+    "fail_interval": 6,
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/137.0.0.0 Safari/537.36",
+    "cookie": "",
+    "release_start": "",  # 预计公布窗口，如 "2025-08-10 09:00"，为空表示按固定间隔轮询
+    "release_end": "",
+    "smtp_server": "",
+    "smtp_port": 465,
+    "smtp_ssl": True,
+    "sender_email": "",
+    "sender_pwd": "",
+    "receiver_email": ""
+}
+
+# 账号中数值和开关字段的类型；CSV导入时所有值都是字符串，在 build_account 中统一转换
+FIELD_TYPES = {
+    "interval": int,
+    "max_attempts": int,
+    "fail_interval": int,
+    "smtp_port": int,
+    "idle_interval": float,
+    "burst_interval": float,
+    "ramp": float,
+    "jitter": float,
+    "max_backoff": float,
+    "smtp_ssl": bool,
+}
+
+_TRUE = ("1", "true", "yes", "on", "是")
+_FALSE = ("0", "false", "no", "off", "否")
+
+# 引擎相关的默认设置
+ENGINE_DEFAULTS = {
+    "host_limit": 8,
+    "processes": 1,
+    "log_file": "",
+    "state_file": "",  # 查询状态数据库，为空时不保存
+    "metrics_port": 0,
+    "hedge_percentile": 0,  # 对冲请求的耗时分位数（如0.95），为0时不发对冲请求
+    "hedge_budget": 0.05,  # 对冲请求最多占全部请求的比例
+    "rate_limit": 0,  # 每个主机每秒最多请求数，为0时不限速
+    "breaker_threshold": 5,  # 连续多少次服务端错误后暂停查询，为0时不熔断
+    "breaker_cooldown": 30,  # 熔断后多少秒发送试探请求
+    "prewarm_lead": 120,  # 公布窗口开始前多少秒预热连接，为0时不预热
+    "keepalive_interval": 20,  # 预热后空闲连接的保活探测间隔（秒）
+    "digest_window": 600,  # 失败提醒按收件人合并发送的时间窗口（秒），为0时每次单独发送
+    "http2_hosts": [],  # 使用HTTP/2多路复用的主机，需要安装 httpx[http2]
+    "quarantine_after": 2,  # 连续多少次返回未登录后停止查询该账号并通知一次，为0时不停止
+    "profile_dir": "profiles",  # 性能分析报告的输出目录
+    "profile_allocations": False  # 性能分析时是否用tracemalloc记录分配位置（开销很大）
+}
+
+
+class ConfigError(ValueError):
+    """配置文件错误"""
+
+
+def convert_field(key, value):
+    """按 FIELD_TYPES 转换字段值（字符串来自CSV），无法转换时抛出 ConfigError"""
+    kind = FIELD_TYPES.get(key)
+    if kind is None or value is None:
+        return value
+    if kind is bool:
+        if isinstance(value, str):
+            text = value.strip().lower()
+            if text in _TRUE:
+                return True
+            if text in _FALSE:
+                return False
+            raise ConfigError(f"{key} 应为 true 或 false: {value!r}")
+        return bool(value)
+    if isinstance(value, bool):
+        raise ConfigError(f"{key} 应为数字: {value!r}")
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ConfigError(f"{key} 应为数字: {value!r}")
+    if kind is int:
+        if number != int(number):
+            raise ConfigError(f"{key} 应为整数: {value!r}")
+        return int(number)
+    return number
+
+
+def build_account(raw, defaults=None):
+    """合并默认值，生成一个账号的查询参数"""
+    params = dict(DEFAULTS)
+    if defaults:
+        params.update(defaults)
+    params.update(raw)
+
+    for key in ("url", "stage", "cookie"):
+        if not params.get(key):
+            raise ConfigError(f"账号 {params.get('name') or ''} 缺少必要参数: {key}")
+
+    for key in FIELD_TYPES:
+        if key in params:
+            params[key] = convert_field(key, params[key])
+
+    for key in ("release_start", "release_end"):
+        try:
+            parse_time(params.get(key))
+        except ValueError as e:
+            raise ConfigError(str(e))
+
+    # 所有字段都有值才启用邮件；明确设置了 enable_email 为 False 时（如回放模式）不发邮件
+    params["enable_email"] = params.get("enable_email") is not False and all([
+        params["smtp_server"],
+        params["sender_email"],
+        params["sender_pwd"],
+        params["receiver_email"]
+    ])
+    return params
+
+
+def load_config(path, overrides=None):
+    """读取JSON配置文件，返回 (账号注册表, 引擎设置)
+
+    overrides 中的参数覆盖所有账号的配置（如单次检查时的 max_attempts）。
+
+    配置格式：
+        {
+            "defaults": {"stage": "2025年上半年", "smtp_server": "...",
+                         "release_start": "2025-08-10 09:00", "release_end": "2025-08-12 18:00",
+                         "burst_interval": 60, "idle_interval": 3600, "jitter": 0.1, ...},
+            "accounts": [{"name": "张三", "cookie": "...", "receiver_email": "..."}],
+            "engine": {"host_limit": 8, "processes": 1}
+        }
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"无法读取配置文件 {path}: {e}")
+
+    defaults = data.get("defaults", {})
+    raw_accounts = data.get("accounts", [])
+    if not raw_accounts:
+        raise ConfigError("配置文件中没有账号")
+
+    # 逐个加入注册表，不保留每个账号完整的参数字典
+    accounts = AccountRegistry()
+    for raw in raw_accounts:
+        accounts.add(build_account(dict(raw, **overrides) if overrides else raw, defaults))
+    engine = dict(ENGINE_DEFAULTS)
+    engine.update(data.get("engine", {}))
+    return accounts, engine
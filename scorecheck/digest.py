@@ -0,0 +1,80 @@
+import html
+import time
+
+from .logpipe import ERROR, INFO
+from .mailer import profile_from_params
+
+
+class ReminderDigest:
+    """失败提醒汇总
+
+    同一收件人（同一SMTP账号发出）的失败提醒先攒起来，第一条提醒后 window 秒合并成一封邮件发出，
+    邮件中列出各账号的尝试次数和最近一次错误；同一账号在窗口内多次提醒只保留最新的一条。
+    成绩公布通知不经过这里，仍然立即发送。只在引擎的事件循环线程中使用，不加锁。
+    """
+
+    def __init__(self, mailer, window=600, log=None):
+        self.mailer = mailer
+        self.window = window
+        self.log = log or (lambda *args: None)
+        self._pending = {}  # (SMTP配置, 收件人) -> {账号名: (考试阶段, 尝试次数, 最近错误, 时间)}
+        self.batches = 0  # 已发出的汇总邮件数
+        self.merged = 0  # 合并进汇总的提醒数
+
+    def add(self, params, label, attempts, error, when):
+        """加入一条失败提醒，开始了新的一批时返回这一批的键（调用方在 window 秒后 flush）"""
+        key = (profile_from_params(params), params["receiver_email"])
+        batch = self._pending.get(key)
+        started = batch is None
+        if started:
+            batch = self._pending[key] = {}
+        batch[label] = (params["stage"], attempts, error, when)
+        self.merged += 1
+        return key if started else None
+
+    def flush(self, key):
+        """发出一批提醒，返回邮件的 Future（没有待发提醒时返回 None）"""
+        batch = self._pending.pop(key, None)
+        if not batch:
+            return None
+        profile, receiver = key
+        if len(batch) == 1:
+            subject = f"软考成绩查询失败提醒 - 已尝试{next(iter(batch.values()))[1]}次"
+        else:
+            subject = f"软考成绩查询失败提醒 - {len(batch)}个账号"
+        future = self.mailer.submit(profile, [receiver], subject, self._render(batch))
+        self.batches += 1
+
+        def done(f):
+            if f.exception() is None:
+                self.log(f"失败提醒汇总已发送给 {receiver}（{len(batch)} 个账号）", INFO)
+            else:
+                self.log(f"失败提醒汇总发送失败: {f.exception()}", ERROR)
+
+        future.add_done_callback(done)
+        return future
+
+    def flush_all(self):
+        """立即发出所有待发的提醒（引擎结束时调用）"""
+        for key in list(self._pending):
+            self.flush(key)
+
+    def __len__(self):
+        return len(self._pending)
+
+    @staticmethod
+    def _render(batch):
+        rows = "".join(
+            f"<tr><td>{html.escape(label)}</td><td>{html.escape(stage)}</td><td>{attempts}</td>"
+            f"<td>{html.escape(str(error))}</td><td>{when}</td></tr>"
+            for label, (stage, attempts, error, when) in sorted(batch.items()))
+        return f"""
+    <h2>软考成绩查询失败提醒</h2>
+    <p>以下 {len(batch)} 个账号达到失败提醒间隔，仍未查询到成绩：</p>
+    <table border="1" cellspacing="0" cellpadding="4">
+    <tr><th>账号</th><th>考试阶段</th><th>已尝试次数</th><th>最近一次错误</th><th>最后尝试时间</th></tr>
+    {rows}
+    </table>
+    <p>汇总时间：{time.strftime('%Y-%m-%d %H:%M:%S')}</p>
+    <p style="color:gray">此邮件由自动查询脚本发送，请勿回复</p>
+    """
@@ -0,0 +1,853 @@
+import asyncio
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .digest import ReminderDigest
+from .hedging import HedgePolicy
+from .http_session import shared_pool
+from .logpipe import DEBUG, INFO, WARNING, ERROR
+from .mailer import profile_from_params, shared_dispatcher
+from .profiling import profiler
+from .registry import (AccountRegistry, COOKIE_BLOCKED, COOKIE_OK, COOKIE_REJECTED, COOKIE_UNKNOWN, STATUS_ERROR,
+                       STATUS_PENDING, STATUS_PUBLISHED)
+from .response_cache import ResponseCache
+from .scheduler import PollScheduler, parse_retry_after
+from .session_health import (classify_message, classify_response, cookie_updates, merge_cookie,
+                             redirect_location)
+from .state_store import account_key
+from .throttle import CIRCUIT_NAMES, CLOSED, OPEN, CircuitBreaker, TokenBucket
+from .timing_wheel import TimingWheel
+from .transport import create_transport
+
+
+def _noop(*args):
+    pass
+
+
+_SESSION_REASONS = {COOKIE_REJECTED: "登录已失效", COOKIE_BLOCKED: "请求被拦截"}
+
+
+class QueryResult:
+    """单次查询结果
+
+    success 为 True 时 result 是成绩数据，否则是可读的失败原因；
+    error 表示HTTP错误或请求异常（而不是“成绩未公布”），用于退避；
+    timings 是各阶段耗时（秒），size 是响应体字节数；
+    unchanged 表示响应与上次相同（指纹相同或304），结果直接取自缓存；
+    hedged 在发出过对冲请求时为先返回的一方（"primary" 或 "hedge"），否则为 None；
+    session 是按响应判断的会话状态（COOKIE_*），cookies 是响应中 Set-Cookie 设置的 {名称: 值}。
+    """
+    __slots__ = ("success", "result", "status_code", "error", "retry_after", "timings", "size", "unchanged",
+                 "hedged", "session", "cookies")
+
+    def __init__(self, success, result, status_code=None, error=False, retry_after=None,
+                 timings=None, size=None, unchanged=False, hedged=None, session=COOKIE_UNKNOWN, cookies=None):
+        self.success = success
+        self.result = result
+        self.status_code = status_code
+        self.error = error
+        self.retry_after = retry_after
+        self.timings = timings or {}
+        self.size = size
+        self.unchanged = unchanged
+        self.hedged = hedged
+        self.session = session
+        self.cookies = cookies
+
+
+@profiler.wrap
+def query_score(params, log=_noop, session=None, cache=None):
+    """查询软考成绩，返回 QueryResult
+
+    cache 为 ResponseCache 时，同一账号的响应与上次相同则直接复用上次的判断，不解析响应体。
+    """
+    if session is None:
+        session = shared_pool()
+    key = None
+    conditional = None
+    if cache is not None:
+        key = cache.key(params["url"], params["stage"], params["cookie"])
+        conditional = cache.conditional_headers(key)
+
+    # 准备表单数据（URL编码考试阶段）
+    data = {
+        "stage": params["stage"],
+        "jym": ""  # 空验证码
+    }
+
+    start = time.perf_counter()
+    try:
+        log(f"请求URL: {params['url']}", DEBUG)
+        log(f"请求数据: stage={data['stage']}, jym={data['jym']}", DEBUG)
+
+        response = session.post(
+            params["url"],
+            params["cookie"],
+            params["user_agent"],
+            data,
+            timeout=15,
+            headers=conditional
+        )
+
+        log(f"响应状态码: {response.status_code}", DEBUG)
+        timings = getattr(response, "timings", None) or {"total": time.perf_counter() - start}
+        size = len(response.content)
+        updates = cookie_updates(response)
+
+        # 缓存中只有会话正常时的结果，沿用缓存即说明会话正常
+        if response.status_code == 304 and conditional:
+            verdict = cache.last(key, conditional)
+            if verdict is not None:
+                log("响应未修改(304)，沿用上次结果", DEBUG)
+                return QueryResult(verdict[0], verdict[1], 200, timings=timings, size=size, unchanged=True,
+                                   session=COOKIE_OK, cookies=updates)
+
+        if response.status_code == 200:
+            # 响应与上次完全相同时跳过解析
+            fingerprint = None
+            if cache is not None:
+                fingerprint = cache.fingerprint(response)
+                verdict = cache.lookup(key, fingerprint)
+                if verdict is not None:
+                    log("响应与上次相同，沿用上次结果", DEBUG)
+                    return QueryResult(verdict[0], verdict[1], 200, timings=timings, size=size, unchanged=True,
+                                       session=COOKIE_OK, cookies=updates)
+
+            try:
+                with profiler.stage("json_decode"):
+                    result = response.json()
+            except ValueError as e:
+                # 不是JSON，多半是跳转到了登录页或被防火墙拦截
+                session = classify_response(200, response.content.decode("utf-8", "replace"),
+                                            redirect_location(response))
+                reason = (f"{_SESSION_REASONS[session]}: 返回的不是查询结果" if session in _SESSION_REASONS
+                          else f"响应解析失败: {e}")
+                return QueryResult(False, reason, 200, error=session != COOKIE_REJECTED, timings=timings, size=size,
+                                   session=session, cookies=updates)
+            log(f"响应内容: {result}", DEBUG)
+
+            # 检查是否包含成绩数据
+            msg = result.get("msg", "未知状态")
+            session = COOKIE_OK
+            if msg == "ok" and result.get("data"):
+                outcome = QueryResult(True, result["data"], 200, timings=timings, size=size)
+            else:
+                session = classify_message(msg)
+                if session == COOKIE_OK:
+                    outcome = QueryResult(False, f"成绩未公布: {msg}", 200, timings=timings, size=size)
+                else:
+                    outcome = QueryResult(False, f"{_SESSION_REASONS[session]}: {msg}", 200,
+                                          error=session == COOKIE_BLOCKED, timings=timings, size=size)
+            outcome.session = session
+            outcome.cookies = updates
+            if cache is not None and session == COOKIE_OK:
+                cache.store(key, fingerprint, outcome.success, outcome.result, response.headers)
+            return outcome
+
+        session = classify_response(response.status_code, response.content.decode("utf-8", "replace"),
+                                    redirect_location(response))
+        reason = _SESSION_REASONS.get(session, "HTTP错误")
+        return QueryResult(False, f"{reason}: {response.status_code}", response.status_code,
+                           error=session != COOKIE_REJECTED,
+                           retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                           timings=timings, size=size, session=session, cookies=updates)
+
+    except Exception as e:
+        return QueryResult(False, f"请求异常: {str(e)}", error=True,
+                           timings={"total": time.perf_counter() - start})
+
+
+@profiler.wrap
+def send_email(params, subject, content, log=_noop, mailer=None):
+    """发送邮件（提交到后台发送队列，立即返回 Future）"""
+    if mailer is None:
+        mailer = shared_dispatcher()
+
+    # 构建邮件内容
+    full_content = f"""
+    <h2>软考成绩查询通知</h2>
+    <p>考试阶段：{params['stage']}</p>
+    <p>查询时间：{time.strftime('%Y-%m-%d %H:%M:%S')}</p>
+    <hr>
+    {content}
+    <p style="color:gray">此邮件由自动查询脚本发送，请勿回复</p>
+    """
+
+    future = mailer.submit(profile_from_params(params), [params["receiver_email"]], subject, full_content)
+
+    def done(f):
+        if f.exception() is None:
+            log(f"邮件发送成功: {subject}")
+        else:
+            log(f"邮件发送失败: {str(f.exception())}", ERROR)
+
+    future.add_done_callback(done)
+    return future
+
+
+class PollEngine:
+    """多账号异步轮询引擎
+
+    所有账号的下一次查询时间放在一个时间轮中，由单个驱动协程在有账号到期时醒来并按批派发；
+    阻塞的HTTP请求交给一个有界线程池执行，每个目标主机的并发请求数由 host_limit 限制。
+    空闲时事件循环只睡到下一个到期时间，不会为每个账号定时唤醒。
+    """
+
+    def __init__(self, accounts, log=_noop, status=_noop, progress=_noop, host_limit=8, session=None,
+                 mailer=None, metrics=None, store=None, changed=_noop, hedge_percentile=0, hedge_budget=0.05,
+                 rate_limit=0, breaker_threshold=5, breaker_cooldown=30, prewarm_lead=120, keepalive_interval=20,
+                 digest_window=600, http2_hosts=(), quarantine_after=2, timeline=None):
+        self.accounts = AccountRegistry.of(accounts)
+        self.states = self.accounts.states
+        self.log = profiler.wrap(log, "log")
+        self.status = status
+        self.progress = progress
+        self.host_limit = host_limit
+        self.session = session
+        # 回放磁带时的时间线（ReplayTransport），调度器按它换算公布窗口和轮询间隔
+        self.timeline = timeline
+        self.cache = ResponseCache()  # 响应指纹缓存，内容不变的响应不再解析
+        # 对冲请求，hedge_percentile 为0时关闭
+        self.hedge = HedgePolicy(hedge_percentile, hedge_budget) if hedge_percentile else None
+        self.rate_limit = rate_limit  # 每个主机每秒最多请求数，为0时不限速
+        self.breaker_threshold = breaker_threshold  # 连续多少次服务端错误后熔断，为0时不熔断
+        self.breaker_cooldown = breaker_cooldown
+        self.prewarm_lead = prewarm_lead  # 公布窗口开始前多少秒预热连接，为0时不预热
+        self.keepalive_interval = keepalive_interval  # 窗口内空闲连接的保活探测间隔
+        self._limiters = {}
+        self._breakers = {}
+        self._stopping = None
+        self._prewarm_tasks = []
+        self.digest_window = digest_window  # 失败提醒按收件人汇总的时间窗口（秒），为0时每次单独发送
+        self.digest = None
+        self.http2_hosts = set(http2_hosts or ())  # 使用HTTP/2传输的主机（主机名或 主机:端口）
+        self._transports = {}
+        self.quarantine_after = quarantine_after  # 连续多少次判断为已退出登录后隔离账号，为0时不隔离
+        self._rejections = {}  # 账号编号 -> 连续判断为已退出登录的次数
+        self._renewed = set()  # Cookie被服务器更新过的账号，保存状态时一并保存新的Cookie
+        self._flights = {}  # (URL, Cookie, 考试阶段) -> (发起查询的账号编号, 结果的Future)
+        self.mailer = mailer
+        self.metrics = metrics
+        self.store = store  # StateStore，为空时不保存状态
+        self.changed = changed  # 账号状态变化时以编号调用，供界面按需刷新
+        self.running = True
+        self._loop = None
+        self._wake = None
+        self._executor = None
+        self._host_slots = {}
+        self._schedulers = {}
+        self._policy_schedulers = {}
+        self._wheel = None
+        self._sleep_until = None
+        self._inflight = None
+        self._tasks = set()
+        self._finished = 0
+        self._keys = None
+        self._baseline = None  # 开始时各账号已有的尝试次数，本次运行的尝试次数从这里算起
+
+    def run(self):
+        """在当前线程中运行事件循环，直到所有账号结束或被停止"""
+        asyncio.run(self.run_async())
+
+    def stop(self):
+        """停止引擎（可在任意线程调用）"""
+        self.running = False
+        self.log("正在停止查询...")
+        if self._loop is not None and self._wake is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake.set)
+                self._loop.call_soon_threadsafe(self._stopping.set)
+            except RuntimeError:
+                # 引擎已经运行结束，事件循环已关闭
+                pass
+
+    async def run_async(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._stopping = asyncio.Event()
+
+        hosts = {urlsplit(url).netloc for url in self.accounts.urls.values}
+        self._host_slots = {host: asyncio.Semaphore(self.host_limit) for host in hosts}
+        # 同一主机的所有账号共用一个令牌桶和熔断器
+        if self.rate_limit:
+            self._limiters = {host: TokenBucket(self.rate_limit) for host in hosts}
+        if self.breaker_threshold:
+            self._breakers = {host: CircuitBreaker(self.breaker_threshold, self.breaker_cooldown,
+                                                   on_change=lambda state, host=host: self._circuit_changed(host, state))
+                              for host in hosts}
+        # 对冲请求不占主机并发名额，线程和连接各多留一份给它们
+        spare = 2 if self.hedge is not None else 1
+        if self.session is None:
+            self.session = shared_pool(pool_size=self.host_limit * spare)
+        if self.mailer is None:
+            self.mailer = shared_dispatcher()
+        if self.digest_window:
+            self.digest = ReminderDigest(self.mailer, self.digest_window, self.log)
+        for host in hosts:
+            if host in self.http2_hosts or host.rsplit(":", 1)[0] in self.http2_hosts:
+                try:
+                    self._transports[host] = create_transport("http2", pool_size=self.host_limit * spare)
+                except RuntimeError as e:
+                    self.log(f"{e}，{host} 使用HTTP/1.1", WARNING)
+        workers = max(1, self.host_limit * len(hosts))
+        self._executor = ThreadPoolExecutor(max_workers=workers * spare, thread_name_prefix="query")
+        # 同时存在的查询任务数有上限，到期太多时剩余账号留在时间轮里等下一批
+        self._inflight = asyncio.Semaphore(workers * 4)
+
+        self._wheel = TimingWheel()
+        saved = {}
+        if self.store is not None:
+            accounts = self.accounts
+            self._keys = [account_key(accounts.url(i), accounts.stage(i), accounts.cookies[i], accounts.receiver(i))
+                          for i in range(len(accounts))]
+            saved = await self._loop.run_in_executor(None, self.store.load)
+            self._adopt_legacy_rows(saved)
+        now = time.time()
+        for index in range(len(self.accounts)):
+            when = now
+            row = saved.get(self._keys[index]) if saved else None
+            if row is not None:
+                when = self._restore(index, row, now)
+                if when is None:
+                    continue
+            self._start_account(index)
+            self.accounts.next_fire[index] = when
+            self._wheel.schedule(index, when)
+        del saved
+        self._baseline = array("I", self.accounts.attempts)
+        if self.prewarm_lead:
+            self._prewarm_tasks = [self._loop.create_task(self._prewarm(*plan)) for plan in self._prewarm_plans()]
+
+        try:
+            await self._drive()
+        finally:
+            for task in self._prewarm_tasks:
+                task.cancel()
+            self._wheel.clear()
+            if self.digest is not None:
+                self.digest.flush_all()
+            for host, transport in self._transports.items():
+                used = "，".join(f"{version} {count} 次" for version, count in transport.protocols.items())
+                self.log(f"{host} 的HTTP/2传输：{used or '未发出请求'}", DEBUG)
+                transport.close()
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            # 等待已提交的通知邮件发出
+            await self._loop.run_in_executor(None, self.mailer.join, 30)
+            if self.store is not None:
+                await self._loop.run_in_executor(None, self.store.flush)
+
+    async def _drive(self):
+        """时间轮驱动循环：只在有账号到期时醒来，按批派发查询"""
+        while self.running and (len(self._wheel) or self._tasks):
+            for index in self._wheel.advance(time.time()):
+                if not self.running:
+                    break
+                await self._inflight.acquire()
+                task = self._loop.create_task(self._attempt(index))
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+
+            self._wake.clear()
+            if not self.running:
+                break
+            self._sleep_until = self._wheel.next_due()
+            timeout = None if self._sleep_until is None else max(0.0, self._sleep_until - time.time())
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        # 停止后等待正在进行的查询结束
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def _task_done(self, task):
+        self._tasks.discard(task)
+        self._inflight.release()
+        if not self._tasks:
+            self._wake.set()
+        if not task.cancelled() and task.exception() is not None:
+            self.log(f"查询任务异常: {task.exception()}", ERROR)
+
+    def _schedule(self, index, when):
+        """安排账号的下一次查询，比驱动循环计划的醒来时间更早时提前唤醒它"""
+        self.states[index].next_fire = when
+        self._wheel.schedule(index, when)
+        if self._sleep_until is None or when < self._sleep_until:
+            self._wake.set()
+
+    def _circuit_changed(self, host, state):
+        if state == OPEN:
+            breaker = self._breakers[host]
+            message = f"主机 {host} 连续出错，暂停查询 {breaker.cooldown:.0f} 秒"
+            self.log(message, WARNING)
+        elif state == CLOSED:
+            message = f"主机 {host} 已恢复，继续查询"
+            self.log(message)
+        else:
+            message = f"主机 {host} 熔断冷却结束，发送试探请求"
+            self.log(message, DEBUG)
+        self.status(message)
+        if self.metrics is not None:
+            self.metrics.circuit(host, state)
+
+    async def _pause(self, seconds):
+        """等待 seconds 秒，引擎停止时提前返回"""
+        if seconds > 0:
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _prewarm_plans(self):
+        """每个主机的预热计划 (主机, URL, User-Agent, 连接数, 窗口开始, 窗口结束)
+
+        同一主机有多个公布窗口时取最早的开始和最晚的结束；连接数为该主机的账号数，不超过并发上限。
+        """
+        plans = {}
+        now = time.time()
+        for index in range(len(self.accounts)):
+            if self.states[index].finished:
+                continue
+            scheduler = self._scheduler(index)
+            start, end = scheduler.window_start, scheduler.window_end
+            if start is None or (end is not None and end <= now):
+                continue
+            url = self.accounts.url(index)
+            host = urlsplit(url).netloc
+            plan = plans.get(host)
+            if plan is None:
+                plans[host] = [host, url, self.accounts.user_agent(index), 1, start, end]
+                continue
+            plan[3] += 1
+            plan[4] = min(plan[4], start)
+            plan[5] = None if end is None or plan[5] is None else max(plan[5], end)
+        for plan in plans.values():
+            plan[3] = min(plan[3], self.host_limit)
+        return list(plans.values())
+
+    def _transport(self, host):
+        """主机使用的传输层：配置了HTTP/2的主机用各自的 Http2Transport，其余共用 self.session"""
+        return self._transports.get(host, self.session)
+
+    async def _prewarm(self, host, url, user_agent, count, window_start, window_end):
+        """公布窗口开始前 prewarm_lead 秒预热到主机的连接，窗口内定期探测保活
+
+        DNS结果提前缓存，连接完成TCP和TLS握手后放回连接池，成绩公布时的第一批查询不用再建连。
+        没有窗口结束时间时保活到窗口开始后一小时。
+        """
+        transport = self._transport(host)
+        if not hasattr(transport, "prewarm"):
+            return
+        await self._pause(window_start - self.prewarm_lead - time.time())
+        end = window_end if window_end is not None else window_start + 3600
+        first = True
+        while self.running and time.time() < end:
+            try:
+                warmed = await self._call(transport.prewarm, url, count, user_agent)
+            except Exception as e:
+                self.log(f"预热到 {host} 的连接失败: {e}", WARNING)
+            else:
+                if first:
+                    self.log(f"已预热到 {host} 的 {warmed}/{count} 个连接")
+                    first = False
+            await self._pause(self.keepalive_interval)
+
+    async def _throttle(self, host):
+        """等待主机的令牌桶放行，返回熔断时可以再试的时间（可以发请求时返回 None）
+
+        先问熔断器：被拒绝的查询不占用令牌，也不排在限速队列里，试探请求不会被它们拖后。
+        """
+        breaker = self._breakers.get(host)
+        now = time.time()
+        if breaker is not None and not breaker.allow(now):
+            return breaker.retry_at(now)
+        limiter = self._limiters.get(host)
+        if limiter is not None:
+            await self._pause(limiter.reserve(now))
+        return None
+
+    def _prefix(self, index):
+        if len(self.accounts) == 1:
+            return ""
+        return f"[{self.states[index].label}] "
+
+    def _emit_progress(self, state):
+        if len(self.accounts) == 1:
+            self.progress(min(100, state.attempt_count % 100))
+        else:
+            self.progress(self._finished * 100 // len(self.states))
+
+    def scheduler_for(self, params):
+        """获取账号的调度器，参数相同的账号共用一个"""
+        key = (params["interval"], params.get("release_start"), params.get("release_end"),
+               params.get("idle_interval"), params.get("burst_interval"), params.get("ramp"),
+               params.get("jitter"), params.get("max_backoff"))
+        scheduler = self._schedulers.get(key)
+        if scheduler is None:
+            scheduler = PollScheduler.from_params(params)
+            if self.timeline is not None:
+                scheduler = scheduler.replayed(self.timeline.wall_time, self.timeline.speed)
+            self._schedulers[key] = scheduler
+        return scheduler
+
+    def _scheduler(self, index):
+        # 同一轮询策略的账号共用调度器，按策略编号缓存，不必每次拼参数
+        policy = self.accounts.policy_id[index]
+        scheduler = self._policy_schedulers.get(policy)
+        if scheduler is None:
+            scheduler = self._policy_schedulers[policy] = self.scheduler_for(self.accounts.policy(index))
+        return scheduler
+
+    def next_fire_times(self):
+        """各账号下一次查询的时间戳（已结束的账号为 None）"""
+        return [None if state.finished else state.next_fire for state in self.states]
+
+    async def _call(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    async def _query(self, params, log, host):
+        """执行一次查询
+
+        开启对冲时，超过近期耗时的分位数仍未返回就再发一个相同的请求（会用到连接池中的另一个连接），
+        取先返回的结果并取消另一个；已经在执行的阻塞请求无法中断，它的结果会被丢弃。
+        """
+        session = self._transport(host)
+        hedge = self.hedge
+        if hedge is None:
+            return await self._call(query_score, params, log, session, self.cache)
+
+        hedge.started()
+        primary = self._loop.run_in_executor(self._executor, query_score, params, log, session, self.cache)
+        delay = hedge.delay()
+        limiter = self._limiters.get(host)
+        if (delay is None or (await asyncio.wait({primary}, timeout=delay))[0]
+                or (limiter is not None and not limiter.try_take(time.time())) or not hedge.acquire()):
+            outcome = await primary
+            hedge.record(outcome.timings.get("total"))
+            return outcome
+
+        log(f"请求 {delay * 1000:.0f}ms 未返回，发送对冲请求", DEBUG)
+        backup = self._loop.run_in_executor(self._executor, query_score, params, log, session, self.cache)
+        done, _ = await asyncio.wait({primary, backup}, return_when=asyncio.FIRST_COMPLETED)
+        if primary in done:
+            backup.cancel()
+            outcome = primary.result()
+            outcome.hedged = "primary"
+            hedge.record(outcome.timings.get("total"))
+            return outcome
+        # 分位数按原请求的耗时统计：只记录先返回的对冲请求会让样本偏短、对冲越发越早，
+        # 所以不丢弃原请求，等它完成后再记录它的耗时
+        primary.add_done_callback(lambda future: self._record_latency(hedge, future))
+        outcome = backup.result()
+        outcome.hedged = "hedge"
+        hedge.won += 1
+        log("对冲请求先返回", DEBUG)
+        return outcome
+
+    @staticmethod
+    def _record_latency(hedge, future):
+        if not future.cancelled() and future.exception() is None:
+            hedge.record(future.result().timings.get("total"))
+
+    def _restore(self, index, row, now):
+        """按上次运行保存的状态恢复账号，返回第一次查询的时间；已发现并通知过的账号返回 None"""
+        state = self.states[index]
+        prefix = self._prefix(index)
+        state.attempt_count = row["attempts"]
+        state.fail_count = row["fails"]
+        state.errors = row["errors"]
+        state.last_status = row["last_status"]
+        state.status_code = row["last_code"]
+        state.cookie_status = row["cookie_status"]
+        state.published = bool(row["published"])
+        state.published_at = row["published_at"]
+        state.notified = bool(row["notified"])
+        state.quarantined = bool(row["quarantined"])
+        if row["cookie_jar"]:
+            self.accounts.cookies[index] = row["cookie_jar"]
+            self._renewed.add(index)
+
+        if state.published and (state.notified or not self.accounts.email_enabled(index)):
+            state.finished = True
+            self._finished += 1
+            self.log(f"{prefix}上次运行已发现成绩公布并完成通知，跳过")
+            return None
+        if state.quarantined:
+            state.finished = True
+            self._finished += 1
+            self.log(f"{prefix}上次运行发现登录已失效，跳过（更新Cookie后会重新查询）")
+            return None
+        self.log(f"{prefix}恢复上次的查询状态：已尝试 {state.attempt_count} 次，失败 {state.fail_count} 次")
+        if state.published or not row["next_fire"]:
+            return now
+        return max(now, row["next_fire"])
+
+    def _adopt_legacy_rows(self, saved):
+        """旧版本的键不含收件人：只有一个账号用这个Cookie时沿用旧记录，
+        多个收件人共用Cookie时旧记录分不清属于谁，不恢复（从头查询，避免漏发或重发通知）"""
+        if not saved:
+            return
+        accounts = self.accounts
+        legacy = {}
+        for index in range(len(accounts)):
+            key = account_key(accounts.url(index), accounts.stage(index), accounts.cookies[index])
+            legacy.setdefault(key, []).append(index)
+        for key, indexes in legacy.items():
+            if len(indexes) == 1 and key in saved and self._keys[indexes[0]] not in saved:
+                saved[self._keys[indexes[0]]] = saved[key]
+
+    def _save(self, index, result=None):
+        if self.store is None:
+            return
+        state = self.states[index]
+        self.store.put(
+            self._keys[index],
+            label=state.label,
+            attempts=state.attempt_count,
+            fails=state.fail_count,
+            errors=state.errors,
+            last_status=state.last_status,
+            last_code=state.status_code,
+            last_result=None if result is None else str(result)[:500],
+            cookie_status=state.cookie_status,
+            next_fire=state.next_fire,
+            published=int(state.published),
+            published_at=state.published_at,
+            notified=int(state.notified),
+            quarantined=int(state.quarantined),
+            cookie_jar=self.accounts.cookies[index] if index in self._renewed else None
+        )
+
+    def _exhausted(self, index):
+        """本次运行是否已达到最大尝试次数"""
+        max_attempts = self.accounts.policy(index)["max_attempts"]
+        attempts = self.states[index].attempt_count - self._baseline[index]
+        return max_attempts > 0 and attempts >= max_attempts
+
+    def _start_account(self, index):
+        max_attempts = self.accounts.policy(index)["max_attempts"]
+        prefix = self._prefix(index)
+        self.log(f"{prefix}任务启动，最大尝试次数: {'无限' if max_attempts == 0 else max_attempts}")
+        self.log(f"{prefix}邮件通知功能: {'启用' if self.accounts.email_enabled(index) else '禁用'}")
+
+    def _renew_cookie(self, index, updates, log):
+        """把服务器下发的 Set-Cookie 合并进账号的Cookie"""
+        cookie = merge_cookie(self.accounts.cookies[index], updates)
+        if cookie != self.accounts.cookies[index]:
+            self.accounts.cookies[index] = cookie
+            self._renewed.add(index)
+            log(f"服务器更新了Cookie: {', '.join(updates)}", DEBUG)
+
+    def _quarantine(self, index, reason):
+        """隔离会话已失效的账号：停止查询，发送一次通知"""
+        state = self.states[index]
+        prefix = self._prefix(index)
+        state.quarantined = True
+        self._rejections.pop(index, None)
+        if self.metrics is not None:
+            self.metrics.quarantine()
+        self._finish_account(index)
+        self.log(f"{prefix}连续{self.quarantine_after}次返回未登录，Cookie已失效，停止查询该账号"
+                 f"（更新Cookie后重新开始查询）", WARNING)
+        self.status(f"{prefix}登录已失效")
+        if self.accounts.email_enabled(index):
+            content = f"""
+            <h3>登录已失效</h3>
+            <p>账号：{state.label}</p>
+            <p>已尝试查询次数：{state.attempt_count}</p>
+            <p>最近一次结果：{reason}</p>
+            <p>该账号已停止查询，请重新登录后更新Cookie。</p>
+            """
+            send_email(self.accounts.params(index), "软考成绩查询 - 登录已失效", content,
+                       lambda message, level=INFO: self.log(prefix + message, level), self.mailer)
+        self._save(index, reason)
+
+    def _finish_account(self, index):
+        state = self.states[index]
+        prefix = self._prefix(index)
+        state.finished = True
+        state.next_fire = None
+        self._finished += 1
+        self._emit_progress(state)
+        if self.running:
+            if self._exhausted(index):
+                self.log(f"\n{prefix}已达到最大尝试次数，停止查询")
+                self.status(f"{prefix}已达最大尝试次数")
+            else:
+                self.log(f"\n{prefix}查询已停止")
+                self.status(f"{prefix}已停止")
+
+    async def _attempt(self, index):
+        try:
+            await self._poll_once(index)
+        finally:
+            self.changed(index)
+
+    async def _poll_once(self, index):
+        """执行账号的一次查询，然后安排下一次或结束该账号
+
+        只在发邮件时拼出完整的参数字典，查询和重试判断只读需要的字段。
+        """
+        accounts = self.accounts
+        request = accounts.request(index)
+        policy = accounts.policy(index)
+        email = accounts.email_enabled(index)
+        state = self.states[index]
+        prefix = self._prefix(index)
+        scheduler = self._scheduler(index)
+
+        def log(message, level=INFO):
+            self.log(prefix + message, level)
+
+        # 相同URL、Cookie和考试阶段的查询正在进行时直接等它的结果，不另发请求
+        flight_key = (request["url"], request["cookie"], request["stage"])
+        flight = self._flights.get(flight_key)
+
+        # 限速和熔断：熔断期间推迟查询，不计入尝试次数
+        host = urlsplit(request["url"]).netloc
+        if flight is None:
+            retry_at = await self._throttle(host)
+            if not self.running:
+                return
+            if retry_at is not None:
+                log(f"主机{CIRCUIT_NAMES[self._breakers[host].state]}，{retry_at - time.time():.0f}秒后再试", DEBUG)
+                self._schedule(index, retry_at)
+                return
+            # 等待限速期间可能已经有相同的查询发出
+            flight = self._flights.get(flight_key)
+
+        state.attempt_count += 1
+        state.fail_count += 1
+
+        current_time = time.strftime('%Y-%m-%d %H:%M:%S')
+        self.log(f"\n{prefix}尝试 #{state.attempt_count} [{current_time}]")
+        self.status(f"{prefix}尝试 #{state.attempt_count}")
+        self._emit_progress(state)
+        self.changed(index)
+
+        leader = None
+        if flight is not None:
+            leader, future = flight
+            log(f"与 {self.states[leader].label} 的查询相同，共用其请求结果", DEBUG)
+            outcome = await asyncio.shield(future)
+            if self.metrics is not None:
+                self.metrics.coalesce()
+        else:
+            # 执行查询（同一主机的并发请求数受限）
+            future = self._loop.create_future()
+            self._flights[flight_key] = (index, future)
+            log("正在发送查询请求...", DEBUG)
+            try:
+                async with self._host_slots[host]:
+                    outcome = await self._query(request, log, host)
+                future.set_result(outcome)
+            finally:
+                del self._flights[flight_key]
+                if not future.done():
+                    future.cancel()
+            breaker = self._breakers.get(host)
+            if breaker is not None and outcome.status_code != 429:
+                # 只有5xx、超时和连接错误说明服务器有问题；429由调度器按Retry-After退避
+                breaker.record(outcome.error and (outcome.status_code is None or outcome.status_code >= 500),
+                               time.time())
+            if self.metrics is not None:
+                self.metrics.observe(outcome)
+        success, result = outcome.success, outcome.result
+        state.errors = state.errors + 1 if outcome.error else 0
+        state.status_code = outcome.status_code or 0
+        state.latency = outcome.timings.get("total")
+        state.last_status = STATUS_PUBLISHED if success else STATUS_ERROR if outcome.error else STATUS_PENDING
+        if outcome.session != COOKIE_UNKNOWN:
+            state.cookie_status = outcome.session
+        if outcome.cookies:
+            self._renew_cookie(index, outcome.cookies, log)
+
+        if success:
+            log("🎉 成绩已公布！")
+            log(f"成绩信息：{result}")
+
+            # 发送成功通知邮件（如果邮件功能启用）
+            if email:
+                log("正在发送成绩通知邮件...")
+                future = send_email(accounts.params(index), "成绩已公布", result, log, self.mailer)
+
+                def notified(f):
+                    if f.exception() is None:
+                        log("邮件通知已发送")
+                        state.notified = True
+                        self._save(index, result)
+
+                future.add_done_callback(notified)
+            else:
+                log("邮件功能未启用，跳过发送成绩通知")
+
+            self.status(f"{prefix}成绩已公布")
+            state.published = True
+            state.published_at = time.time()
+            if len(self.accounts) == 1:
+                self.progress(100)
+            self._finish_account(index)
+            self._save(index, result)
+            return
+
+        # 与上次相同的响应在 query_score 中已记过一行DEBUG日志，不再格式化和输出结果
+        if not outcome.unchanged:
+            log(f"查询结果: {result}", WARNING if outcome.error else INFO)
+
+        # 会话失效：确认后移出轮询，不再消耗请求和发送失败提醒
+        if outcome.session == COOKIE_REJECTED:
+            self._rejections[index] = self._rejections.get(index, 0) + 1
+            if self.quarantine_after and self._rejections[index] >= self.quarantine_after:
+                self._quarantine(index, result)
+                return
+        elif outcome.session == COOKIE_OK:
+            self._rejections.pop(index, None)
+
+        # 检查是否需要发送失败提醒（如果邮件功能启用）
+        fail_interval = policy["fail_interval"]
+        if email and state.fail_count % fail_interval == 0:
+            params = accounts.params(index)
+            if self.digest is not None:
+                # 同一收件人的提醒合并到一封汇总邮件
+                log(f"达到失败提醒间隔 ({fail_interval}次)，{self.digest.window:.0f}秒内的提醒合并发送")
+                key = self.digest.add(params, state.label, state.attempt_count, result, current_time)
+                if key is not None:
+                    self._loop.call_later(self.digest.window, self.digest.flush, key)
+            else:
+                log(f"达到失败提醒间隔 ({fail_interval}次)，发送提醒邮件")
+                subject = f"软考成绩查询失败提醒 - 已尝试{state.attempt_count}次"
+                content = f"""
+                <h3>软考成绩查询失败提醒</h3>
+                <p>考试阶段：{params['stage']}</p>
+                <p>已尝试查询次数：{state.attempt_count}</p>
+                <p>最近一次错误：{result}</p>
+                <p>最后尝试时间：{current_time}</p>
+                """
+                send_email(params, subject, content, log, self.mailer)
+        elif state.fail_count % fail_interval == 0:
+            log(f"达到失败提醒间隔 ({fail_interval}次)，但邮件功能未启用，跳过发送提醒")
+
+        # 检查是否继续（最后一次尝试后不再等待）
+        if not self.running:
+            self._save(index, result)
+            return
+        if self._exhausted(index):
+            self._finish_account(index)
+            self._save(index, result)
+            return
+
+        # 安排下次查询（公布窗口、错误退避、Retry-After和随机抖动由调度器决定）
+        now = time.time()
+        delay = scheduler.next_delay(now, state.errors, outcome.retry_after)
+        if leader is not None and self._scheduler(leader) is scheduler:
+            # 与发起查询的账号同一时间再查，下一轮仍然合并成一次请求
+            leader_next = self.states[leader].next_fire
+            if leader_next is not None and leader_next > now:
+                delay = leader_next - now
+        log(f"{delay:.0f}秒后再次尝试...")
+        self.status(f"{prefix}等待中... ({delay:.0f}秒)")
+        self._schedule(index, now + delay)
+        self._save(index, result)
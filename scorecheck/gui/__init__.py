@@ -0,0 +1 @@
+"""界面组件（依赖PyQt5，只由图形界面导入，无界面模式不需要）"""
@@ -0,0 +1,215 @@
+import math
+import threading
+import time
+from array import array
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer
+from PyQt5.QtGui import QColor
+
+from ..registry import (COOKIE_BLOCKED, COOKIE_REJECTED, PUBLISHED, QUARANTINED, STATUS_ERROR, STATUS_NONE,
+                        STATUS_PENDING, STATUS_PUBLISHED)
+
+# 状态筛选
+FILTER_ALL = 0
+FILTER_UNPUBLISHED = 1
+FILTER_PUBLISHED = 2
+FILTER_ERROR = 3
+FILTER_COOKIE = 4
+FILTER_NAMES = ("全部", "未公布", "已公布", "出错", "Cookie失效")
+
+_STATUS_TEXT = {
+    STATUS_NONE: "-",
+    STATUS_PENDING: "未公布",
+    STATUS_ERROR: "出错",
+    STATUS_PUBLISHED: "已公布",
+}
+
+_STATUS_COLOR = {
+    STATUS_ERROR: QColor("#EF5350"),
+    STATUS_PUBLISHED: QColor("#66BB6A"),
+}
+
+
+def _number(value):
+    return -1.0 if value is None or math.isnan(value) else value
+
+
+class AccountTableModel(QAbstractTableModel):
+    """账号看板的数据模型
+
+    数据直接从 AccountRegistry 的列中读取，只有视图请求的（可见的）单元格才会被格式化。
+    引擎线程通过 mark_changed() 登记变化的账号，模型按 fps 定时合并成一次 dataChanged；
+    排序和筛选只维护一个行号数组，不复制账号数据；它们在设置时计算，之后的变化只刷新单元格。
+    """
+
+    COLUMNS = ("账号", "考试阶段", "尝试次数", "失败次数", "最近耗时", "最近结果", "下次查询")
+
+    def __init__(self, parent=None, fps=4):
+        super().__init__(parent)
+        self._registry = None
+        self._order = None  # 显示顺序 -> 账号编号，为 None 时按编号顺序
+        self._rows = None  # 账号编号 -> 显示行，未显示为 -1
+        self._filter_text = ""
+        self._filter_status = FILTER_ALL
+        self._sort = None  # (列, 顺序)
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.flush)
+        self._timer.start(1000 // fps)
+
+    def set_registry(self, registry):
+        """切换显示的账号表"""
+        self.beginResetModel()
+        self._registry = registry
+        with self._lock:
+            self._dirty.clear()
+        self._rebuild()
+        self.endResetModel()
+
+    def mark_changed(self, index):
+        """登记账号状态有变化（可在任意线程调用）"""
+        with self._lock:
+            self._dirty.add(index)
+
+    def flush(self):
+        """把登记的变化合并为一次 dataChanged"""
+        with self._lock:
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+        if self._registry is None:
+            return
+        if self._rows is None:
+            rows = [index for index in dirty if index < len(self._registry)]
+        else:
+            rows = [self._rows[index] for index in dirty if index < len(self._rows) and self._rows[index] >= 0]
+        if rows:
+            self.dataChanged.emit(self.index(min(rows), 0), self.index(max(rows), len(self.COLUMNS) - 1))
+
+    # ---- 排序和筛选 ----
+
+    def _rebuild(self):
+        registry = self._registry
+        if registry is None or (self._sort is None and not self._filter_text
+                                and self._filter_status == FILTER_ALL):
+            self._order = None
+            self._rows = None
+            return
+
+        if self._filter_status == FILTER_UNPUBLISHED:
+            indexes = registry.select(PUBLISHED, False)
+        elif self._filter_status == FILTER_PUBLISHED:
+            indexes = registry.select(PUBLISHED)
+        elif self._filter_status == FILTER_ERROR:
+            indexes = [i for i, status in enumerate(registry.last_status) if status == STATUS_ERROR]
+        elif self._filter_status == FILTER_COOKIE:
+            indexes = [i for i, status in enumerate(registry.cookie_status) if status == COOKIE_REJECTED]
+        else:
+            indexes = range(len(registry))
+
+        if self._filter_text:
+            text = self._filter_text.lower()
+            indexes = [i for i in indexes
+                       if text in registry.label(i).lower() or text in registry.stage(i).lower()]
+
+        if self._sort is not None:
+            column, order = self._sort
+            indexes = sorted(indexes, key=self._sort_key(column), reverse=order == Qt.DescendingOrder)
+
+        self._order = array("I", indexes)
+        self._rows = array("i", [-1]) * len(registry)
+        for row, index in enumerate(self._order):
+            self._rows[index] = row
+
+    def _sort_key(self, column):
+        registry = self._registry
+        if column == 0:
+            return registry.label
+        if column == 1:
+            return registry.stage
+        if column == 2:
+            return registry.attempts.__getitem__
+        if column == 3:
+            return registry.fails.__getitem__
+        if column == 4:
+            return lambda index: _number(registry.latency[index])
+        if column == 5:
+            return registry.last_status.__getitem__
+        return lambda index: _number(registry.next_fire[index])
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self._sort = (column, order) if column >= 0 else None
+        self._rebuild()
+        self.layoutChanged.emit()
+
+    def set_filter(self, text=None, status=None):
+        """按账号名/考试阶段的关键字和状态筛选"""
+        self.beginResetModel()
+        if text is not None:
+            self._filter_text = text.strip()
+        if status is not None:
+            self._filter_status = status
+        self._rebuild()
+        self.endResetModel()
+
+    # ---- QAbstractTableModel ----
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self._registry is None:
+            return 0
+        return len(self._registry) if self._order is None else len(self._order)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def account_at(self, row):
+        """显示行对应的账号编号"""
+        return row if self._order is None else self._order[row]
+
+    def data(self, model_index, role=Qt.DisplayRole):
+        if not model_index.isValid() or self._registry is None:
+            return None
+        registry = self._registry
+        index = self.account_at(model_index.row())
+        column = model_index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return registry.label(index)
+            if column == 1:
+                return registry.stage(index)
+            if column == 2:
+                return registry.attempts[index]
+            if column == 3:
+                return registry.fails[index]
+            if column == 4:
+                latency = registry.latency[index]
+                return "-" if math.isnan(latency) else f"{latency * 1000:.0f}ms"
+            if column == 5:
+                text = _STATUS_TEXT.get(registry.last_status[index], "-")
+                if registry.last_status[index] == STATUS_ERROR and registry.last_code[index]:
+                    text = f"{text}({registry.last_code[index]})"
+                if registry.flags[index] & QUARANTINED:
+                    text += "，Cookie失效已停止"
+                elif registry.cookie_status[index] == COOKIE_REJECTED:
+                    text += "，Cookie失效"
+                elif registry.cookie_status[index] == COOKIE_BLOCKED:
+                    text += "，被拦截"
+                return text
+            next_fire = registry.next_fire[index]
+            if registry.flags[index] & PUBLISHED or math.isnan(next_fire):
+                return "-"
+            return time.strftime("%H:%M:%S", time.localtime(next_fire))
+
+        if role == Qt.TextAlignmentRole and 2 <= column <= 4:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        if role == Qt.ForegroundRole and column == 5:
+            return _STATUS_COLOR.get(registry.last_status[index])
+        return None
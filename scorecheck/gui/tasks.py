@@ -0,0 +1,114 @@
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class Task:
+    """后台任务句柄
+
+    在工作线程中可以调用 progress() 汇报进度、检查 cancelled 提前结束；
+    在界面线程中可以调用 cancel() 取消。回调都在界面线程中执行。
+    """
+
+    def __init__(self, runner, name, on_done, on_error, on_progress):
+        self.runner = runner
+        self.name = name
+        self.future = None
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.cancelled = False
+        self.finished = False
+        self._timer = None
+
+    def progress(self, value):
+        """汇报进度（可在任意线程调用）"""
+        if not self.cancelled:
+            self.runner._progress.emit(self, value)
+
+    def cancel(self):
+        """取消任务：尚未开始的不再执行，已经开始的结果被丢弃"""
+        if not self.finished:
+            self.runner._settle(self, None, CancelledError(f"{self.name}已取消"))
+
+
+class TaskRunner(QObject):
+    """界面用的后台任务执行器
+
+    阻塞操作（发送测试邮件、解析和导入账号等）提交到线程池执行，
+    结果、异常和进度通过Qt信号回到界面线程，事件循环不会被阻塞。
+    支持超时（到时按失败处理，迟到的结果被丢弃）和取消。
+    """
+
+    busy_changed = pyqtSignal(int)  # 正在进行的任务数
+    _result = pyqtSignal(object, object, object)
+    _progress = pyqtSignal(object, object)
+
+    def __init__(self, parent=None, workers=2):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gui-task")
+        self._tasks = set()
+        self._result.connect(self._settle)
+        self._progress.connect(self._deliver_progress)
+
+    def submit(self, func, *args, name="后台任务", timeout=None, on_done=None, on_error=None,
+               on_progress=None, pass_task=False):
+        """在线程池中执行 func(*args)，pass_task 为真时以 func(task, *args) 调用"""
+        task = Task(self, name, on_done, on_error, on_progress)
+        if pass_task:
+            args = (task,) + args
+        return self._track(task, self._executor.submit(func, *args), timeout)
+
+    def watch(self, future, name="后台任务", timeout=None, on_done=None, on_error=None):
+        """跟踪一个已有的 Future（如邮件发送队列返回的）"""
+        return self._track(Task(self, name, on_done, on_error, None), future, timeout)
+
+    def _track(self, task, future, timeout):
+        task.future = future
+        self._tasks.add(task)
+        self.busy_changed.emit(len(self._tasks))
+        if timeout:
+            task._timer = QTimer(self)
+            task._timer.setSingleShot(True)
+            task._timer.timeout.connect(
+                lambda: self._settle(task, None, TimeoutError(f"{task.name}超时（{timeout}秒）")))
+            task._timer.start(int(timeout * 1000))
+        future.add_done_callback(lambda f: self._from_future(task, f))
+        return task
+
+    def _from_future(self, task, future):
+        # 在工作线程中执行，只通过信号把结果交给界面线程
+        if future.cancelled():
+            self._result.emit(task, None, CancelledError(f"{task.name}已取消"))
+        elif future.exception() is not None:
+            self._result.emit(task, None, future.exception())
+        else:
+            self._result.emit(task, future.result(), None)
+
+    def _settle(self, task, result, error):
+        if task.finished:
+            return
+        task.finished = True
+        if isinstance(error, (CancelledError, TimeoutError)):
+            task.cancelled = True
+            task.future.cancel()
+        if task._timer is not None:
+            task._timer.stop()
+        self._tasks.discard(task)
+        self.busy_changed.emit(len(self._tasks))
+        if error is None:
+            if task.on_done is not None:
+                task.on_done(result)
+        elif task.on_error is not None:
+            task.on_error(error)
+
+    def _deliver_progress(self, task, value):
+        if not task.finished and task.on_progress is not None:
+            task.on_progress(value)
+
+    def shutdown(self):
+        """取消所有任务并关闭线程池"""
+        for task in list(self._tasks):
+            task.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
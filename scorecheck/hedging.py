@@ -0,0 +1,55 @@
+import bisect
+from collections import deque
+
+
+class HedgePolicy:
+    """对冲请求策略
+
+    记录最近的请求耗时；一次查询超过这些耗时的 percentile 分位数仍未返回时，
+    允许再发一个相同的请求，取先返回的一个。额外请求受预算限制：每次查询积累 budget 个额度，
+    每次对冲消耗 1 个，所以对冲请求最多约占全部请求的 budget（例如 0.05 即 5%），
+    额度最多积累 max_tokens 个，限制突发的额外请求；服务器整体变慢时也不会让请求量翻倍。
+    只在事件循环线程中使用，不加锁。
+    """
+
+    def __init__(self, percentile=0.95, budget=0.05, window=256, min_samples=20, min_delay=0.05,
+                 max_tokens=50):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_tokens = max_tokens
+        self._samples = deque(maxlen=window)
+        self._sorted = []
+        self._tokens = 0.0
+        self.sent = 0  # 已发出的对冲请求数
+        self.won = 0  # 对冲请求先返回的次数
+
+    def record(self, latency):
+        """记录一次完成的请求耗时（秒）"""
+        if latency is None:
+            return
+        if len(self._samples) == self._samples.maxlen:
+            old = self._samples[0]
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._samples.append(latency)
+        bisect.insort(self._sorted, latency)
+
+    def delay(self):
+        """本次查询等待多久后发出对冲请求，样本不足时返回 None"""
+        if len(self._sorted) < self.min_samples:
+            return None
+        value = self._sorted[min(len(self._sorted) - 1, int(self.percentile * len(self._sorted)))]
+        return max(self.min_delay, value)
+
+    def started(self):
+        """每发起一次查询调用一次，积累对冲额度"""
+        self._tokens = min(self.max_tokens, self._tokens + self.budget)
+
+    def acquire(self):
+        """申请发出一次对冲请求，预算不足时返回 False"""
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.sent += 1
+        return True
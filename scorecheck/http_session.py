@@ -0,0 +1,252 @@
+import socket
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+
+# 所有账号共用的请求头，只有Cookie和User-Agent随账号变化
+STATIC_HEADERS = {
+    "Accept": "*/*",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "zh-CN,zh;q=0.9,en;q=0.8",
+    "Connection": "keep-alive",
+    "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+    "Origin": "https://bm.ruankao.org.cn",
+    "Referer": "https://bm.ruankao.org.cn/index.php/query/score",
+    "Priority": "u=1, i",
+    "Sec-Ch-Ua": '"Google Chrome";v="137", "Chromium";v="137", "Not/A)Brand";v="24"',
+    "Sec-Ch-Ua-Mobile": "?0",
+    "Sec-Ch-Ua-Platform": '"Windows"',
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-origin",
+    "X-Requested-With": "XMLHttpRequest"
+}
+
+
+# 当前线程最近一次请求的分阶段耗时（秒），只有新建连接时才有 dns/connect/tls
+_timings = threading.local()
+
+
+def _record(**phases):
+    current = getattr(_timings, "phases", None)
+    if current is not None:
+        current.update(phases)
+
+
+class DnsCache:
+    """DNS解析缓存：同一主机在 ttl 秒内只解析一次，新建连接时省去DNS查询"""
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._entries = {}  # (主机, 端口) -> (地址, 过期时间)
+        self._lock = threading.Lock()
+
+    def resolve(self, host, port, refresh=False):
+        """返回主机的地址，解析失败时返回 None"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get((host, port))
+        if entry is not None and not refresh and now < entry[1]:
+            return entry[0]
+        try:
+            address = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)[0][4][0]
+        except OSError:
+            # 解析失败时沿用未过期太久的旧地址
+            return entry[0] if entry is not None else None
+        with self._lock:
+            self._entries[(host, port)] = (address, now + self.ttl)
+        return address
+
+    def forget(self, host, port):
+        with self._lock:
+            self._entries.pop((host, port), None)
+
+
+dns_cache = DnsCache()
+
+
+class _TimedConnectionMixin:
+    """新建连接时分别记录DNS解析和TCP连接耗时，DNS结果来自 dns_cache"""
+
+    def _new_conn(self):
+        host = self._dns_host
+        t0 = time.perf_counter()
+        address = dns_cache.resolve(host, self.port)
+        t1 = time.perf_counter()
+        try:
+            # 直接连接已解析的地址，避免再解析一次；证书校验和SNI仍使用 self.host
+            if address is not None:
+                self._dns_host = address
+            try:
+                sock = super()._new_conn()
+            except Exception:
+                if address is None:
+                    raise
+                # 缓存的地址可能已经失效，清掉后按主机名重新连接
+                dns_cache.forget(host, self.port)
+                self._dns_host = host
+                sock = super()._new_conn()
+        finally:
+            self._dns_host = host
+        t2 = time.perf_counter()
+        _record(dns=t1 - t0, connect=t2 - t1)
+        return sock
+
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def connect(self):
+        t0 = time.perf_counter()
+        super().connect()
+        phases = getattr(_timings, "phases", None)
+        if phases is not None:
+            # 建连总耗时减去DNS和TCP即为TLS握手耗时
+            phases["tls"] = time.perf_counter() - t0 - phases.get("dns", 0.0) - phases.get("connect", 0.0)
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用带计时连接的适配器"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": TimedHTTPConnectionPool,
+            "https": TimedHTTPSConnectionPool
+        }
+
+
+class SessionPool:
+    """长连接HTTP会话池
+
+    内部只有一个 requests.Session，底层 urllib3 连接池按主机复用 keep-alive 连接，
+    多个线程可以同时使用。仅对建立连接阶段的失败自动重试（请求尚未发出，重试是安全的）。
+    """
+
+    def __init__(self, pool_size=16, max_hosts=4, retries=2, backoff=0.3):
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        self.session.headers.clear()
+        self.session.headers.update(STATIC_HEADERS)
+        # Cookie由每个账号自己携带，不让服务器下发的Cookie在账号之间串用
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        retry = Retry(total=retries, connect=retries, read=0, status=0, other=0,
+                      backoff_factor=backoff, raise_on_status=False)
+        adapter = TimedHTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_size,
+                              max_retries=retry, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def post(self, url, cookie, user_agent, data, timeout=15, headers=None):
+        """发送查询请求，只附加随账号变化的请求头（headers 为额外的请求头，如条件请求头）
+
+        返回的 response 额外带有 timings 属性：dns/connect/tls（仅新建连接时）、
+        ttfb（发出请求到收到响应头）和 total（含读取响应体）。
+        """
+        request_headers = {"Cookie": cookie, "User-Agent": user_agent}
+        if headers:
+            request_headers.update(headers)
+        phases = _timings.phases = {}
+        start = time.perf_counter()
+        try:
+            response = self.session.post(
+                url,
+                headers=request_headers,
+                data=data,
+                timeout=timeout
+            )
+        finally:
+            _timings.phases = None
+        phases["total"] = time.perf_counter() - start
+        setup = phases.get("dns", 0.0) + phases.get("connect", 0.0) + phases.get("tls", 0.0)
+        phases["ttfb"] = max(0.0, response.elapsed.total_seconds() - setup)
+        response.timings = phases
+        return response
+
+    def prewarm(self, url, count, user_agent=None, timeout=5):
+        """预热到 url 所在主机的连接，返回可用的连接数
+
+        刷新DNS缓存，然后从连接池取出最多 count 个空闲连接：未连接（或已被服务器断开）的
+        完成TCP和TLS握手，已连接的发一个HEAD探测保活，最后全部放回连接池。
+        之后的查询请求直接使用这些连接。
+        """
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        dns_cache.resolve(parts.hostname, port, refresh=True)
+        pool = self._connection_pool(url)
+        connections = [pool._get_conn() for _ in range(min(count, self.pool_size))]
+        warmed = 0
+        for conn in connections:
+            try:
+                conn.timeout = timeout
+                if _is_open(conn):
+                    headers = dict(STATIC_HEADERS)
+                    if user_agent:
+                        headers["User-Agent"] = user_agent
+                    conn.request("HEAD", "/", headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.headers.get("Connection", "").lower() == "close":
+                        conn.close()
+                        continue
+                else:
+                    conn.connect()
+                warmed += 1
+            except Exception:
+                conn.close()
+            finally:
+                pool._put_conn(conn)
+        return warmed
+
+    def _connection_pool(self, url):
+        # 与 session.post 取同一个 urllib3 连接池：requests 2.32 起按TLS参数区分连接池，
+        # 参数要和发送请求时一样合并环境变量（如 REQUESTS_CA_BUNDLE、代理）
+        settings = self.session.merge_environment_settings(url, {}, None, None, None)
+        adapter = self.session.get_adapter(url)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = requests.Request("POST", url).prepare()
+            return adapter.get_connection_with_tls_context(request, settings["verify"], settings["proxies"],
+                                                           settings["cert"])
+        return adapter.get_connection(url, settings["proxies"])
+
+    def close(self):
+        self.session.close()
+
+
+def _is_open(conn):
+    # urllib3 2.x 提供 is_connected，1.x 只能看是否有socket
+    connected = getattr(conn, "is_connected", None)
+    return connected if connected is not None else conn.sock is not None
+
+
+_shared_pool = None
+_shared_lock = threading.Lock()
+
+
+def shared_pool(pool_size=16):
+    """获取进程内共享的会话池，池容量不足时按需扩容"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None or _shared_pool.pool_size < pool_size:
+            # 旧的会话池可能仍被其他引擎持有，交给垃圾回收处理
+            _shared_pool = SessionPool(pool_size=pool_size)
+        return _shared_pool
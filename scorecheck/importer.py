@@ -0,0 +1,218 @@
+"""账号批量导入
+
+支持三种来源：
+- 浏览器“复制为cURL”得到的单条命令（parse_curl）
+- CSV文件，每行一个账号，列名与配置文件中的账号字段相同（如 name, cookie, receiver_email）
+- 浏览器开发者工具导出的HAR文件，从成绩查询请求中提取URL、考试阶段、Cookie和User-Agent
+
+CSV逐行读取，不会把整个文件读进内存；按会话Cookie去重，重复的账号只保留第一个。
+"""
+import csv
+import io
+import json
+import os
+import re
+import shlex
+from collections import namedtuple
+from urllib.parse import parse_qs, unquote
+
+from .config import ConfigError, build_account
+from .registry import AccountRegistry
+
+ImportResult = namedtuple("ImportResult", ["accounts", "added", "duplicates", "invalid", "errors"])
+
+# CSV中常见的中文列名
+_CSV_ALIASES = {
+    "姓名": "name",
+    "名称": "name",
+    "考试阶段": "stage",
+    "邮箱": "receiver_email",
+    "收件邮箱": "receiver_email",
+    "user-agent": "user_agent",
+    "useragent": "user_agent",
+}
+
+# 最多保留的错误说明条数
+_MAX_ERRORS = 20
+
+
+def parse_cookie(cookie_str):
+    """把Cookie字符串拆成 [(键, 值), ...]"""
+    cookies = []
+    for cookie in cookie_str.split(';'):
+        cookie = cookie.strip()
+        if '=' in cookie:
+            key, value = cookie.split('=', 1)
+            cookies.append((key.strip(), value.strip()))
+    return cookies
+
+
+def session_key(cookie_str):
+    """用于去重的会话标识：优先取会话Cookie（如 PHPSESSID），没有时用整理后的整个Cookie"""
+    cookies = parse_cookie(cookie_str)
+    for key, value in cookies:
+        if "sess" in key.lower():
+            return f"{key}={value}"
+    return "; ".join(f"{key}={value}" for key, value in sorted(cookies))
+
+
+def parse_curl(text):
+    """解析cURL命令，返回 {"url", "headers", "cookie", "user_agent", "data", "stage"}
+
+    同时支持bash格式和Windows cmd格式（^转义）的“复制为cURL”。
+    """
+    text = text.strip()
+    if "^\"" in text:
+        text = re.sub(r"\^(.)", r"\1", text.replace("^\r\n", " ").replace("^\n", " "))
+    text = text.replace("\\\r\n", " ").replace("\\\n", " ")
+    try:
+        tokens = shlex.split(text)
+    except ValueError as e:
+        raise ValueError(f"cURL命令格式错误: {e}")
+
+    url = None
+    headers = {}
+    cookie = ""
+    data = ""
+    tokens = iter(tokens[1:] if tokens and tokens[0].lower().startswith("curl") else tokens)
+    for token in tokens:
+        if token in ("-H", "--header"):
+            header = next(tokens, "")
+            if ':' in header:
+                key, value = header.split(':', 1)
+                headers[key.strip()] = value.strip()
+        elif token in ("-b", "--cookie"):
+            cookie = next(tokens, "")
+        elif token in ("-d", "--data", "--data-raw", "--data-binary", "--data-urlencode"):
+            data = next(tokens, "")
+        elif token in ("-X", "--request", "-A", "--user-agent", "-e", "--referer", "-u", "--user"):
+            value = next(tokens, "")
+            if token in ("-A", "--user-agent"):
+                headers["User-Agent"] = value
+        elif token.startswith("http://") or token.startswith("https://"):
+            url = token
+        elif token == "--url":
+            url = next(tokens, None)
+
+    if not url:
+        raise ValueError("无法解析URL")
+
+    # Cookie也可能放在请求头里
+    for key in list(headers):
+        if key.lower() == "cookie":
+            cookie = cookie or headers.pop(key)
+
+    stage = None
+    if data:
+        values = parse_qs(data)
+        if "stage" in values:
+            stage = values["stage"][0]
+        else:
+            stage_match = re.search(r"stage=([^&]+)", data)
+            stage = unquote(stage_match.group(1)) if stage_match else None
+
+    user_agent = next((value for key, value in headers.items() if key.lower() == "user-agent"), None)
+    return {"url": url, "headers": headers, "cookie": cookie, "user_agent": user_agent, "data": data,
+            "stage": stage}
+
+
+def _csv_field(name):
+    name = name.strip().lower()
+    return _CSV_ALIASES.get(name, name)
+
+
+def iter_csv(path, progress=None, encoding="utf-8-sig"):
+    """逐行读取CSV，生成账号的原始参数（空单元格不输出，由默认值补齐；数值在 build_account 中转换）"""
+    total = os.path.getsize(path) or 1
+    with open(path, "rb") as raw:
+        text = io.TextIOWrapper(raw, encoding=encoding, newline="")
+        reader = csv.reader(text)
+        header = next(reader, None)
+        if not header:
+            return
+        fields = [_csv_field(name) for name in header]
+        for count, row in enumerate(reader, 1):
+            account = {}
+            for field, value in zip(fields, row):
+                value = value.strip()
+                if not value:
+                    continue
+                account[field] = value
+            if account:
+                yield account
+            if progress is not None and count % 1000 == 0:
+                progress(raw.tell() * 100 // total)
+
+
+def _har_headers(items):
+    return {item.get("name", "").lower(): item.get("value", "") for item in items or []}
+
+
+def iter_har(path, progress=None, url_filter="/query/score"):
+    """从HAR文件中提取成绩查询请求，生成账号的原始参数
+
+    HAR是单个JSON文档，标准库没有增量解析器，这里整体读入后逐条处理请求。
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        entries = json.load(f).get("log", {}).get("entries", [])
+    total = len(entries) or 1
+    for count, entry in enumerate(entries, 1):
+        if progress is not None and count % 1000 == 0:
+            progress(count * 100 // total)
+        request = entry.get("request") or {}
+        url = request.get("url", "")
+        if url_filter and url_filter not in url:
+            continue
+
+        headers = _har_headers(request.get("headers"))
+        cookie = headers.get("cookie") or "; ".join(
+            f"{item['name']}={item['value']}" for item in request.get("cookies") or [] if "name" in item)
+        if not cookie:
+            continue
+
+        account = {"url": url.split("?", 1)[0], "cookie": cookie}
+        if headers.get("user-agent"):
+            account["user_agent"] = headers["user-agent"]
+        post = request.get("postData") or {}
+        stage = next((item.get("value") for item in post.get("params") or [] if item.get("name") == "stage"), None)
+        if stage is None and post.get("text"):
+            stage = parse_qs(post["text"]).get("stage", [None])[0]
+        if stage:
+            account["stage"] = unquote(stage)
+        yield account
+
+
+def import_accounts(path, defaults=None, registry=None, progress=None, should_stop=None):
+    """导入CSV或HAR文件中的账号，返回 ImportResult
+
+    defaults 为每个账号的默认参数（如界面上填写的考试阶段和邮件设置）；
+    registry 不为空时追加到其中，并跳过已有的会话。
+    progress(百分比) 和 should_stop() 供后台线程汇报进度和中途取消。
+    """
+    registry = registry if registry is not None else AccountRegistry()
+    seen = {session_key(cookie) for cookie in registry.cookies}
+    is_har = os.path.splitext(path)[1].lower() in (".har", ".json")
+    rows = iter_har(path, progress) if is_har else iter_csv(path, progress)
+
+    added = duplicates = invalid = 0
+    errors = []
+    for line, raw in enumerate(rows, 1):
+        if should_stop is not None and should_stop():
+            break
+        key = session_key(raw.get("cookie", ""))
+        if key and key in seen:
+            duplicates += 1
+            continue
+        try:
+            registry.add(build_account(raw, defaults))
+        except ConfigError as e:
+            invalid += 1
+            if len(errors) < _MAX_ERRORS:
+                errors.append(f"第{line}条: {e}")
+            continue
+        seen.add(key)
+        added += 1
+
+    if progress is not None:
+        progress(100)
+    return ImportResult(registry, added, duplicates, invalid, errors)
@@ -0,0 +1,106 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from logging import DEBUG, INFO, WARNING, ERROR  # noqa: F401  供调用方使用的日志级别
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON，便于事后检索"""
+
+    def format(self, record):
+        return json.dumps({
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage()
+        }, ensure_ascii=False)
+
+
+class LogPipeline:
+    """有界日志管道
+
+    log() 可以在任意线程调用，只做一次加锁的 deque 追加：
+    - 最近 capacity 条日志保存在环形缓冲区中，界面定时调用 drain() 批量取走新日志
+    - 写文件和控制台输出由 QueueListener 在后台线程完成，文件按大小滚动
+    低于 level 的日志（如每次请求的请求/响应内容）直接丢弃。
+    """
+
+    def __init__(self, capacity=5000, level=INFO, file_path=None, max_bytes=5 * 1024 * 1024,
+                 backup_count=5, console=False):
+        self.capacity = capacity
+        self.level = level
+        self._lock = threading.Lock()
+        self._ring = deque(maxlen=capacity)
+        self._pending = deque(maxlen=capacity)
+        self._pending_dropped = 0
+        self.dropped = 0  # 后台队列满时丢弃的条数
+
+        handlers = []
+        if file_path:
+            file_handler = logging.handlers.RotatingFileHandler(
+                file_path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S"))
+            handlers.append(console_handler)
+
+        self._queue = None
+        self._listener = None
+        if handlers:
+            self._queue = queue.Queue(maxsize=capacity * 4)
+            self._listener = logging.handlers.QueueListener(self._queue, *handlers)
+            self._listener.start()
+
+    def log(self, message, level=INFO):
+        """记录一条日志"""
+        if level < self.level:
+            return
+        created = time.time()
+        line = f"[{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(created))}] {message}"
+        with self._lock:
+            self._ring.append(line)
+            if len(self._pending) == self.capacity:
+                self._pending_dropped += 1
+            self._pending.append(line)
+
+        if self._queue is not None:
+            record = logging.makeLogRecord({
+                "msg": message, "levelno": level, "levelname": logging.getLevelName(level),
+                "created": created, "msecs": (created % 1) * 1000
+            })
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.dropped += 1
+
+    def debug(self, message):
+        self.log(message, DEBUG)
+
+    def drain(self):
+        """取走上次调用以来的新日志（已格式化的行）"""
+        with self._lock:
+            lines = list(self._pending)
+            self._pending.clear()
+            dropped, self._pending_dropped = self._pending_dropped, 0
+        if dropped:
+            lines.insert(0, f"...（日志过多，省略 {dropped} 条）")
+        return lines
+
+    def recent(self):
+        """环形缓冲区中保留的最近日志"""
+        with self._lock:
+            return list(self._ring)
+
+    def close(self):
+        """停止后台线程并关闭日志文件"""
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
@@ -0,0 +1,236 @@
+import queue
+import smtplib
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from email.header import Header
+from email.mime.text import MIMEText
+
+from .profiling import profiler
+
+
+# SMTP账号配置，作为连接复用和限速的键
+SmtpProfile = namedtuple("SmtpProfile", ["server", "port", "sender", "password", "use_ssl"])
+
+
+def profile_from_params(params):
+    """从查询参数中提取SMTP配置"""
+    return SmtpProfile(
+        params["smtp_server"],
+        params["smtp_port"],
+        params["sender_email"],
+        params["sender_pwd"],
+        params.get("smtp_ssl", True)
+    )
+
+
+def build_message(profile, receivers, subject, html):
+    """构建HTML邮件"""
+    msg = MIMEText(html, "html", "utf-8")
+    msg["Subject"] = Header(subject, "utf-8")
+    msg["From"] = profile.sender
+    msg["To"] = ", ".join(receivers)
+    return msg.as_string()
+
+
+class _MailJob:
+    __slots__ = ("profile", "receivers", "message", "future", "queued_at", "tries")
+
+    def __init__(self, profile, receivers, message):
+        self.profile = profile
+        self.receivers = receivers
+        self.message = message
+        self.future = Future()
+        self.queued_at = time.monotonic()
+        self.tries = 0
+
+
+class MailDispatcher:
+    """后台邮件发送队列
+
+    邮件先进入有界队列，由少量工作线程发送。每个工作线程为每个SMTP账号保持一条已登录的
+    长连接并在多封邮件之间复用；同一SMTP服务器的发送间隔不小于 min_interval，
+    失败时按指数退避重试。submit() 立即返回 Future，调用方永远不会被SMTP握手阻塞。
+    """
+
+    def __init__(self, workers=2, queue_size=1000, min_interval=0.5, max_retries=3,
+                 backoff=2.0, idle_timeout=60, timeout=30):
+        self.workers = workers
+        self.min_interval = min_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._lock = threading.Lock()
+        self._next_send = {}
+        self._running = False
+
+        # 吞吐与延迟统计
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dropped = 0
+        self.connects = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+            self._threads = [threading.Thread(target=self._worker, name=f"mailer-{i}", daemon=True)
+                             for i in range(self.workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def join(self, timeout=10):
+        """等待队列中的邮件发完，返回是否已全部处理"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return not self._queue.unfinished_tasks
+
+    def stop(self, timeout=10):
+        """停止发送线程，最多等待 timeout 秒让队列中的邮件发完"""
+        if not self._running:
+            return
+        deadline = time.monotonic() + timeout
+        self.join(timeout)
+        self._running = False
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()) + 1)
+        self._threads = []
+
+    def submit(self, profile, receivers, subject, html):
+        """提交一封邮件，返回 Future（结果为 True，失败时带异常）"""
+        self.start()
+        job = _MailJob(profile, list(receivers), build_message(profile, receivers, subject, html))
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            job.future.set_exception(RuntimeError("邮件队列已满"))
+        return job.future
+
+    def stats(self):
+        """返回发送统计"""
+        with self._lock:
+            done = self.sent + self.failed
+            return {
+                "queued": self._queue.qsize(),
+                "sent": self.sent,
+                "failed": self.failed,
+                "retried": self.retried,
+                "dropped": self.dropped,
+                "connects": self.connects,
+                "avg_latency": self.total_latency / done if done else 0.0,
+                "max_latency": self.max_latency,
+            }
+
+    def _throttle(self, server):
+        """同一SMTP服务器的发送限速"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_send.get(server, 0.0))
+            self._next_send[server] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _connect(self, profile):
+        smtp_class = smtplib.SMTP_SSL if profile.use_ssl else smtplib.SMTP
+        server = smtp_class(profile.server, profile.port, timeout=self.timeout)
+        if profile.password:
+            server.login(profile.sender, profile.password)
+        with self._lock:
+            self.connects += 1
+        return server
+
+    @staticmethod
+    def _close(server):
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def _worker(self):
+        connections = {}  # profile -> [smtp, last_used]
+        while self._running:
+            try:
+                job = self._queue.get(timeout=1)
+            except queue.Empty:
+                # 关闭空闲过久的连接
+                now = time.monotonic()
+                for profile, (server, last_used) in list(connections.items()):
+                    if now - last_used > self.idle_timeout:
+                        self._close(server)
+                        del connections[profile]
+                continue
+
+            try:
+                # 排队期间被取消的邮件不再发送
+                if job.future.set_running_or_notify_cancel():
+                    self._send(job, connections)
+            finally:
+                self._queue.task_done()
+
+        for server, _ in connections.values():
+            self._close(server)
+
+    def _send(self, job, connections):
+        while True:
+            job.tries += 1
+            try:
+                self._throttle(job.profile.server)
+                entry = connections.get(job.profile)
+                if entry is None:
+                    entry = connections[job.profile] = [self._connect(job.profile), 0.0]
+                with profiler.stage("smtp_send"):
+                    entry[0].sendmail(job.profile.sender, job.receivers, job.message)
+                entry[1] = time.monotonic()
+            except Exception as e:
+                # 连接可能已失效，丢弃后重连
+                entry = connections.pop(job.profile, None)
+                if entry is not None:
+                    self._close(entry[0])
+                if job.tries > self.max_retries or not self._running:
+                    with self._lock:
+                        self.failed += 1
+                        self._record_latency(job)
+                    job.future.set_exception(e)
+                    return
+                with self._lock:
+                    self.retried += 1
+                time.sleep(self.backoff ** (job.tries - 1))
+                continue
+
+            with self._lock:
+                self.sent += 1
+                self._record_latency(job)
+            job.future.set_result(True)
+            return
+
+    def _record_latency(self, job):
+        latency = time.monotonic() - job.queued_at
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+
+
+_shared_dispatcher = None
+_shared_lock = threading.Lock()
+
+
+def shared_dispatcher():
+    """获取进程内共享的邮件发送队列"""
+    global _shared_dispatcher
+    with _shared_lock:
+        if _shared_dispatcher is None:
+            _shared_dispatcher = MailDispatcher()
+        return _shared_dispatcher
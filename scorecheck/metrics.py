@@ -0,0 +1,281 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .registry import COOKIE_BLOCKED, COOKIE_REJECTED
+
+# 请求耗时分桶（秒），覆盖正常响应到15秒超时
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 30.0)
+# 响应大小分桶（字节）
+SIZE_BUCKETS = (128, 256, 512, 1024, 4096, 16384, 65536)
+
+# 查询结果分类
+OUTCOMES = ("published", "not_published", "logged_out", "blocked", "http_error", "exception")
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    body = ",".join(f'{name}="{str(value)}"' for name, value in pairs)
+    return "{" + body + "}"
+
+
+class Counter:
+    """累加计数器"""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels=()):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def total(self):
+        with self._lock:
+            return sum(self._values.values())
+
+    def items(self):
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {value}" for labels, value in items]
+
+
+class Gauge(Counter):
+    """可设置的瞬时值"""
+    kind = "gauge"
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram:
+    """固定分桶直方图，分位数按桶内线性插值估算"""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [各桶计数..., +Inf计数, 总和]
+        self._lock = threading.Lock()
+
+    def observe(self, value, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def count(self, labels=()):
+        with self._lock:
+            series = self._series.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def quantile(self, q, labels=()):
+        """估算分位数（0 < q < 1），没有数据时返回 None"""
+        with self._lock:
+            series = self._series.get(labels)
+            if not series:
+                return None
+            counts = series[:-1]
+        total = sum(counts)
+        if not total:
+            return None
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for i, count in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if count and seen + count >= rank:
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return self.buckets[-1]
+
+    def render(self):
+        lines = []
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += series[i]
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', bound))} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', '+Inf'))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表，按Prometheus文本格式输出"""
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._add(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def classify(result):
+    """把 QueryResult 归类为 OUTCOMES 之一"""
+    if result.success:
+        return "published"
+    if result.session == COOKIE_REJECTED:
+        return "logged_out"
+    if result.session == COOKIE_BLOCKED:
+        return "blocked"
+    if not result.error:
+        return "not_published"
+    return "http_error" if result.status_code is not None else "exception"
+
+
+class PollMetrics:
+    """查询相关的指标：结果计数、分阶段耗时和响应大小"""
+
+    PHASES = ("dns", "connect", "tls", "ttfb", "total")
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry()
+        self.attempts = self.registry.counter(
+            "scorecheck_attempts_total", "查询次数（按结果分类）", ("outcome",))
+        self.latency = self.registry.histogram(
+            "scorecheck_request_seconds", "查询各阶段耗时", ("phase",))
+        self.response_bytes = self.registry.histogram(
+            "scorecheck_response_bytes", "响应体大小", buckets=SIZE_BUCKETS)
+        self.unchanged = self.registry.counter(
+            "scorecheck_unchanged_responses_total", "与上次相同、跳过解析的响应数")
+        self.hedges = self.registry.counter(
+            "scorecheck_hedged_requests_total", "发出对冲请求的查询次数（按先返回的一方分类）", ("winner",))
+        self.circuits = self.registry.gauge(
+            "scorecheck_circuit_state", "各主机熔断器状态（0正常，1试探中，2已熔断）", ("host",))
+        self.quarantined = self.registry.counter(
+            "scorecheck_quarantined_accounts_total", "因登录失效被移出轮询的账号数")
+        self.coalesced = self.registry.counter(
+            "scorecheck_coalesced_queries_total", "与进行中的相同查询合并、没有另发请求的查询次数")
+
+    def observe(self, result):
+        """记录一次查询"""
+        self.attempts.inc((classify(result),))
+        for phase in self.PHASES:
+            value = result.timings.get(phase)
+            if value is not None:
+                self.latency.observe(value, (phase,))
+        if result.size is not None:
+            self.response_bytes.observe(result.size)
+        if result.unchanged:
+            self.unchanged.inc()
+        if result.hedged:
+            self.hedges.inc((result.hedged,))
+
+    def circuit(self, host, state):
+        """记录主机熔断器的状态"""
+        self.circuits.set(state, (host,))
+
+    def quarantine(self):
+        """记录一个账号因登录失效被隔离"""
+        self.quarantined.inc()
+
+    def coalesce(self):
+        """记录一次合并到进行中的相同查询、没有另发请求的查询"""
+        self.coalesced.inc()
+
+    def summary(self):
+        """界面摘要：请求数、各类结果、总耗时p50/p99和错误率"""
+        counts = {outcome: self.attempts.value((outcome,)) for outcome in OUTCOMES}
+        total = sum(counts.values())
+        errors = counts["blocked"] + counts["http_error"] + counts["exception"]
+        hedge_wins = self.hedges.value(("hedge",))
+        return {
+            "total": total,
+            "counts": counts,
+            "p50": self.latency.quantile(0.5, ("total",)),
+            "p99": self.latency.quantile(0.99, ("total",)),
+            "error_rate": errors / total if total else 0.0,
+            "hedged": self.hedges.value(("primary",)) + hedge_wins,
+            "hedge_wins": hedge_wins,
+            "circuits": {labels[0]: state for labels, state in self.circuits.items() if state},
+            "quarantined": self.quarantined.total(),
+            "coalesced": self.coalesced.total(),
+        }
+
+
+class MetricsServer:
+    """本地Prometheus指标接口（只监听127.0.0.1）"""
+
+    def __init__(self, registry, port=9108, host="127.0.0.1"):
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        self._thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
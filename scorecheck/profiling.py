@@ -0,0 +1,283 @@
+"""运行时性能分析
+
+可以在运行中随时开关（界面上的“性能分析”按钮，或无界面模式下发送 SIGUSR1），不需要重启：
+- 分阶段计时：query_score、JSON解析、日志、send_email 和SMTP发送的次数、总耗时和最长耗时
+- 采样分析：后台线程每隔 interval 秒抓取所有线程的调用栈（轮询循环、HTTP线程和邮件线程都包括在内），
+  统计最耗时的函数，并输出可用 flamegraph.pl / speedscope 打开的折叠栈文件；
+  停在 WAIT_FRAMES 中（等锁、等队列、select、等网络数据）或两次采样间没有用到CPU（支持线程CPU时钟的平台）
+  的线程只按线程名单独计数，不计入函数统计和折叠栈
+- 内存跟踪：每隔 snapshot_interval 秒统计一次各类型的对象数，记录相对上一次和开启时增长最多的类型；
+  trace_allocations 为 True 时同时用 tracemalloc 记录增长最多的分配位置（会让查询慢好几倍，只在排查泄漏时打开）
+关闭时把报告写到 output_dir 下，返回报告文件路径。关闭状态下计时只多一次属性检查。
+"""
+import functools
+import gc
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from contextlib import contextmanager
+
+
+# 一次内存快照：各类型的对象数，以及 tracemalloc 快照（未开启时为 None）
+MemorySnapshot = namedtuple("MemorySnapshot", ["objects", "allocations"])
+
+# 栈顶是这些函数（文件名, 函数名）时线程在阻塞等待，不占CPU：
+# 锁和条件变量、线程池取任务、事件循环和服务器的 select、socket/SSL 读写和建连
+WAIT_FRAMES = frozenset([
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+    ("selectors.py", "select"),
+    ("wait.py", "do_poll"),  # urllib3 等待socket可读
+    ("socket.py", "accept"),
+    ("socket.py", "readinto"),
+    ("socket.py", "create_connection"),
+    ("ssl.py", "read"),
+    ("ssl.py", "write"),
+    ("ssl.py", "do_handshake"),
+    ("connection.py", "_recv"),
+    ("connection.py", "poll"),
+])
+
+
+def _thread_cpu_time(ident):
+    """线程已用的CPU时间，平台不支持时返回 None"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+class Profiler:
+    """性能分析开关和数据收集（进程内共享一个实例：profiler）"""
+
+    def __init__(self, output_dir="profiles", interval=0.01, snapshot_interval=300, top=15, trace_allocations=False,
+                 log=None):
+        self.output_dir = output_dir
+        self.trace_allocations = trace_allocations
+        self.interval = interval
+        self.snapshot_interval = snapshot_interval
+        self.top = top
+        self.log = log or (lambda *args: None)
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._stages = {}  # 阶段 -> [次数, 总耗时, 最长耗时]
+        self._stacks = Counter()  # 折叠的调用栈 -> 采样次数（只有在运行的线程）
+        self._waiting = Counter()  # 线程名 -> 阻塞等待的采样次数
+        self._samples = 0
+        self._stop = threading.Event()
+        self._threads = []
+        self._started_at = None
+        self._cpu_start = None
+        self._memory_lines = []
+        self._baseline = None
+        self._previous = None
+
+    # ---- 开关 ----
+
+    def start(self):
+        with self._lock:
+            if self.enabled:
+                return
+            self._stages = {}
+            self._stacks = Counter()
+            self._waiting = Counter()
+            self._samples = 0
+            self._memory_lines = []
+            self._started_at = time.time()
+            self._cpu_start = time.process_time()
+            self._stop.clear()
+            self.enabled = True
+        if self.trace_allocations and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self._baseline = self._snapshot()
+        self._threads = [threading.Thread(target=self._sample, name="profiler-sampler", daemon=True),
+                         threading.Thread(target=self._watch_memory, name="profiler-memory", daemon=True)]
+        for thread in self._threads:
+            thread.start()
+        self.log(f"性能分析已开启，关闭时报告写入 {os.path.abspath(self.output_dir)}")
+
+    def stop(self):
+        """关闭分析并写出报告，返回报告文件路径（未开启时返回 None）"""
+        with self._lock:
+            if not self.enabled:
+                return None
+            self.enabled = False
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(5)
+        self._threads = []
+        self._memory_diff("关闭时", self._snapshot(), self._previous)
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._baseline = self._previous = None
+        path = self._write_report()
+        self.log(f"性能分析已关闭，报告: {path}")
+        return path
+
+    def toggle(self):
+        """切换开关，关闭时返回报告路径"""
+        if self.enabled:
+            return self.stop()
+        self.start()
+        return None
+
+    # ---- 分阶段计时 ----
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, time.perf_counter() - start)
+
+    def wrap(self, func, name=None):
+        """包装函数，开启分析时记录每次调用的耗时"""
+        name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self.enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def _add(self, name, elapsed):
+        with self._lock:
+            stats = self._stages.get(name)
+            if stats is None:
+                stats = self._stages[name] = [0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+
+    def stages(self):
+        """各阶段的 {名称: (次数, 总耗时, 平均耗时, 最长耗时)}"""
+        with self._lock:
+            return {name: (count, total, total / count, longest)
+                    for name, (count, total, longest) in self._stages.items()}
+
+    # ---- 采样和内存 ----
+
+    def _sample(self):
+        cpu_times = {}  # 线程 -> 上次采样时的CPU时间
+        while not self._stop.wait(self.interval):
+            own = {thread.ident for thread in self._threads}  # 不统计分析器自己的线程
+            threads = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            waiting = []
+            for ident, frame in sys._current_frames().items():
+                if ident in own:
+                    continue
+                code = frame.f_code
+                cpu = _thread_cpu_time(ident)
+                previous, cpu_times[ident] = cpu_times.get(ident), cpu
+                if (os.path.basename(code.co_filename), code.co_name) in WAIT_FRAMES or (cpu is not None
+                                                                                          and cpu == previous):
+                    # 同一线程池的线程（query_0、query_1……）合并计数
+                    waiting.append(re.sub(r"[_-]\d+$", "", threads.get(ident, "?")))
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stacks.append(";".join(reversed(names)))
+            with self._lock:
+                self._stacks.update(stacks)
+                self._waiting.update(waiting)
+                self._samples += 1
+
+    def _snapshot(self):
+        objects = Counter(type(obj).__name__ for obj in gc.get_objects())
+        return MemorySnapshot(objects, tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None)
+
+    def _watch_memory(self):
+        self._previous = self._baseline
+        while not self._stop.wait(self.snapshot_interval):
+            snapshot = self._snapshot()
+            self._memory_diff(time.strftime("%H:%M:%S"), snapshot, self._previous)
+            self._previous = snapshot
+
+    def _memory_diff(self, title, snapshot, previous):
+        total = sum(snapshot.objects.values())
+        lines = [f"== {title}：{total} 个对象（开启时 {sum(self._baseline.objects.values())} 个）"]
+        if snapshot.allocations is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            lines[0] += f"，已分配 {current / 2 ** 20:.1f}MB，峰值 {peak / 2 ** 20:.1f}MB"
+        bases = [("相对开启时", self._baseline)]
+        if previous is not None and previous is not self._baseline:
+            bases.insert(0, ("相对上一次", previous))
+        for label, base in bases:
+            growth = snapshot.objects.copy()
+            growth.subtract(base.objects)
+            lines.append(f"-- {label}增长最多的类型：")
+            lines += [f"   {name}: {count:+d}" for name, count in growth.most_common(self.top) if count > 0]
+            if snapshot.allocations is not None and base.allocations is not None:
+                lines.append(f"-- {label}增长最多的分配位置：")
+                lines += [f"   {stat}" for stat in snapshot.allocations.compare_to(base.allocations, "lineno")[:self.top]]
+        with self._lock:
+            self._memory_lines.extend(lines)
+        self.log("\n".join(lines[:4]))
+
+    # ---- 报告 ----
+
+    def _write_report(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.output_dir, f"profile-{stamp}.txt")
+        with self._lock:
+            stacks = Counter(self._stacks)
+            waiting = Counter(self._waiting)
+            samples = self._samples
+            memory = list(self._memory_lines)
+        duration = time.time() - self._started_at
+        cpu = time.process_time() - self._cpu_start
+
+        lines = [f"分析时长 {duration:.1f}s，进程CPU {cpu:.2f}s，采样 {samples} 次（间隔 {self.interval * 1000:.0f}ms）", ""]
+        lines.append("== 分阶段耗时")
+        lines.append(f"{'阶段':<16}{'次数':>8}{'总耗时(s)':>12}{'平均(ms)':>10}{'最长(ms)':>10}")
+        for name, (count, total, average, longest) in sorted(self.stages().items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:<16}{count:>8}{total:>12.3f}{average * 1000:>10.2f}{longest * 1000:>10.2f}")
+
+        # 函数出现在栈顶（自身耗时）和栈中任意位置（累计耗时）的采样次数
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for name in set(frames):
+                cumulative[name] += count
+        busy = sum(stacks.values())
+        idle = sum(waiting.values())
+        total = busy or 1
+        lines += ["", f"== 线程采样：运行中 {busy} 次，阻塞等待 {idle} 次（等待的采样不计入下面的函数统计）"]
+        lines += [f"{count * 100 / (busy + idle):6.1f}%  等待中：{name}" for name, count in waiting.most_common(self.top)]
+        for title, counter in (("自身耗时", own), ("累计耗时", cumulative)):
+            lines += ["", f"== 采样最多的函数（{title}，占运行中线程采样的比例）"]
+            lines += [f"{count * 100 / total:6.1f}%  {name}" for name, count in counter.most_common(self.top)]
+
+        lines += ["", "== 内存增长"] + memory
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(os.path.join(self.output_dir, f"profile-{stamp}.folded"), "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+profiler = Profiler()
@@ -0,0 +1,333 @@
+"""账号注册表
+
+账号很多时，每个账号一份完整的参数字典会占掉大部分内存。注册表按列存储账号：
+URL、考试阶段、User-Agent、SMTP配置和轮询策略这些多个账号共用的字段只保存一份，
+每个账号只记录它们的编号；尝试次数、失败次数、最近状态等计数器放在 array 中，
+批量统计（如“所有未公布的账号”）只需扫描一列。
+"""
+import math
+from array import array
+from itertools import compress
+
+from .mailer import SmtpProfile
+
+# 标志位
+FINISHED = 1
+PUBLISHED = 2
+EMAIL = 4
+NOTIFIED = 8  # 成绩通知邮件已发送
+QUARANTINED = 16  # 会话已失效，移出轮询
+
+# 最近一次查询的结果
+STATUS_NONE = 0
+STATUS_PENDING = 1  # 成绩未公布
+STATUS_ERROR = 2
+STATUS_PUBLISHED = 3
+
+# Cookie状态
+COOKIE_UNKNOWN = 0
+COOKIE_OK = 1
+COOKIE_REJECTED = 2  # 已退出登录（401、跳转登录页、提示登录过期），Cookie已失效
+COOKIE_BLOCKED = 3  # 请求被拦截（403、访问频繁、需要验证码）
+
+_NAN = float("nan")
+
+# 每个账号独有或单独存储的字段，其余字段归入共享的轮询策略
+_OWN_KEYS = ("name", "cookie", "receiver_email", "enable_email", "url", "stage", "user_agent",
+             "smtp_server", "smtp_port", "sender_email", "sender_pwd", "smtp_ssl")
+
+# 列名和类型码
+_COLUMNS = (
+    ("url_id", "I"),
+    ("stage_id", "I"),
+    ("agent_id", "I"),
+    ("smtp_id", "I"),
+    ("policy_id", "I"),
+    ("receiver_id", "I"),
+    ("flags", "B"),
+    ("attempts", "I"),
+    ("fails", "I"),
+    ("errors", "I"),
+    ("last_status", "B"),
+    ("last_code", "H"),
+    ("cookie_status", "B"),
+    ("next_fire", "d"),
+    ("published_at", "d"),
+    ("latency", "f"),
+)
+
+# 复制到子集中的运行状态列
+_STATE_COLUMNS = ("flags", "attempts", "fails", "errors", "last_status", "last_code", "cookie_status",
+                  "next_fire", "published_at", "latency")
+
+
+class _Pool:
+    """去重表：相同的值只保存一份，账号中记录编号"""
+    __slots__ = ("values", "_ids")
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def intern(self, value):
+        index = self._ids.get(value)
+        if index is None:
+            index = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def __len__(self):
+        return len(self.values)
+
+
+def _column(name):
+    def get(self):
+        return getattr(self.registry, name)[self.index]
+
+    def set(self, value):
+        getattr(self.registry, name)[self.index] = value
+
+    return property(get, set)
+
+
+def _optional(name):
+    # 浮点列用 NaN 表示“没有值”
+    def get(self):
+        value = getattr(self.registry, name)[self.index]
+        return None if math.isnan(value) else value
+
+    def set(self, value):
+        getattr(self.registry, name)[self.index] = _NAN if value is None else value
+
+    return property(get, set)
+
+
+def _flag(bit):
+    def get(self):
+        return bool(self.registry.flags[self.index] & bit)
+
+    def set(self, value):
+        if value:
+            self.registry.flags[self.index] |= bit
+        else:
+            self.registry.flags[self.index] &= ~bit
+
+    return property(get, set)
+
+
+class AccountState:
+    """单个账号的轮询状态（注册表中一行的视图，读写直接落在列上）"""
+    __slots__ = ("registry", "index")
+
+    def __init__(self, registry, index):
+        self.registry = registry
+        self.index = index
+
+    @property
+    def label(self):
+        return self.registry.label(self.index)
+
+    @label.setter
+    def label(self, value):
+        self.registry.names[self.index] = value
+
+    attempt_count = _column("attempts")
+    fail_count = _column("fails")
+    errors = _column("errors")  # 连续出错次数，用于退避
+    last_status = _column("last_status")
+    status_code = _column("last_code")
+    cookie_status = _column("cookie_status")
+    next_fire = _optional("next_fire")  # 下一次查询的时间戳
+    published_at = _optional("published_at")  # 发现成绩公布的时间戳
+    latency = _optional("latency")  # 最近一次请求耗时（秒）
+    finished = _flag(FINISHED)
+    published = _flag(PUBLISHED)
+    notified = _flag(NOTIFIED)
+    quarantined = _flag(QUARANTINED)
+
+
+class _States:
+    """按编号访问账号状态视图的序列"""
+    __slots__ = ("registry",)
+
+    def __init__(self, registry):
+        self.registry = registry
+
+    def __len__(self):
+        return len(self.registry)
+
+    def __getitem__(self, index):
+        if not -len(self.registry) <= index < len(self.registry):
+            raise IndexError(index)
+        return AccountState(self.registry, index % len(self.registry))
+
+    def __iter__(self):
+        for index in range(len(self.registry)):
+            yield AccountState(self.registry, index)
+
+
+class AccountRegistry:
+    """按列存储的账号表
+
+    registry[i] 返回第 i 个账号的参数字典（按需拼出，与 build_account 的结果相同），
+    registry.states[i] 返回其运行状态视图。轮询时只读单个字段的地方用 url(i)、cookie(i)、policy(i) 等，
+    不必每次拼出完整的字典。
+    """
+
+    def __init__(self, accounts=()):
+        self.urls = _Pool()
+        self.stages = _Pool()
+        self.agents = _Pool()
+        self.smtp = _Pool()
+        self.policies = _Pool()
+        self.receivers = _Pool()
+        for name, typecode in _COLUMNS:
+            setattr(self, name, array(typecode))
+        self.cookies = []
+        self.names = []
+        self._policy_dicts = {}  # 策略编号 -> 策略字典
+        for params in accounts:
+            self.add(params)
+
+    @classmethod
+    def of(cls, accounts):
+        """把参数字典列表转换为注册表，已经是注册表时原样返回"""
+        return accounts if isinstance(accounts, cls) else cls(accounts)
+
+    def add(self, params):
+        """添加一个账号，返回其编号"""
+        smtp = SmtpProfile(
+            params.get("smtp_server", ""),
+            params.get("smtp_port", 465),
+            params.get("sender_email", ""),
+            params.get("sender_pwd", ""),
+            params.get("smtp_ssl", True)
+        )
+        policy = tuple(sorted((key, value) for key, value in params.items() if key not in _OWN_KEYS))
+        row = {
+            "url_id": self.urls.intern(params["url"]),
+            "stage_id": self.stages.intern(params["stage"]),
+            "agent_id": self.agents.intern(params.get("user_agent", "")),
+            "smtp_id": self.smtp.intern(smtp),
+            "policy_id": self.policies.intern(policy),
+            "receiver_id": self.receivers.intern(params.get("receiver_email", "")),
+            "flags": EMAIL if params.get("enable_email") else 0,
+            "next_fire": _NAN,
+            "published_at": _NAN,
+            "latency": _NAN,
+        }
+        # 账号数按 cookies 计算，最后追加，其他线程读到的账号各列都已完整
+        self.names.append(params.get("name") or None)
+        for name, _ in _COLUMNS:
+            getattr(self, name).append(row.get(name, 0))
+        self.cookies.append(params["cookie"])
+        return len(self.cookies) - 1
+
+    def __len__(self):
+        return len(self.cookies)
+
+    def __getitem__(self, index):
+        return self.params(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.params(index)
+
+    def params(self, index):
+        """拼出账号的参数字典"""
+        smtp = self.smtp.values[self.smtp_id[index]]
+        params = dict(self.policies.values[self.policy_id[index]])
+        params.update(
+            url=self.urls.values[self.url_id[index]],
+            stage=self.stages.values[self.stage_id[index]],
+            user_agent=self.agents.values[self.agent_id[index]],
+            cookie=self.cookies[index],
+            smtp_server=smtp.server,
+            smtp_port=smtp.port,
+            sender_email=smtp.sender,
+            sender_pwd=smtp.password,
+            smtp_ssl=smtp.use_ssl,
+            receiver_email=self.receivers.values[self.receiver_id[index]],
+            enable_email=bool(self.flags[index] & EMAIL)
+        )
+        if self.names[index]:
+            params["name"] = self.names[index]
+        return params
+
+    def label(self, index):
+        return self.names[index] or f"账号{index + 1}"
+
+    def url(self, index):
+        return self.urls.values[self.url_id[index]]
+
+    def stage(self, index):
+        return self.stages.values[self.stage_id[index]]
+
+    def user_agent(self, index):
+        return self.agents.values[self.agent_id[index]]
+
+    def cookie(self, index):
+        return self.cookies[index]
+
+    def receiver(self, index):
+        return self.receivers.values[self.receiver_id[index]]
+
+    def email_enabled(self, index):
+        return bool(self.flags[index] & EMAIL)
+
+    def smtp_profile(self, index):
+        return self.smtp.values[self.smtp_id[index]]
+
+    def policy(self, index):
+        """账号的轮询策略（interval、max_attempts、fail_interval 等），同一策略的账号共用一个字典，不要修改"""
+        policy_id = self.policy_id[index]
+        policy = self._policy_dicts.get(policy_id)
+        if policy is None:
+            policy = self._policy_dicts[policy_id] = dict(self.policies.values[policy_id])
+        return policy
+
+    def request(self, index):
+        """query_score 需要的参数（URL、考试阶段、Cookie和User-Agent）"""
+        return {"url": self.url(index), "stage": self.stage(index), "cookie": self.cookies[index],
+                "user_agent": self.user_agent(index)}
+
+    @property
+    def states(self):
+        return _States(self)
+
+    def _mask(self, flag, value):
+        # 查表把标志列转换为 0/1 字节串，批量扫描不经过Python循环
+        table = bytes(bool(flags & flag) == value for flags in range(256))
+        return self.flags.tobytes().translate(table)
+
+    def select(self, flag, value=True):
+        """标志位 flag 为（或不为）真的账号编号"""
+        return list(compress(range(len(self)), self._mask(flag, value)))
+
+    def count(self, flag, value=True):
+        return self._mask(flag, value).count(1)
+
+    def unpublished(self):
+        return self.select(PUBLISHED, False)
+
+    def state_row(self, index):
+        """账号运行状态列的值（用于在进程间传递）"""
+        return tuple(getattr(self, name)[index] for name in _STATE_COLUMNS)
+
+    def set_state_row(self, index, row):
+        for name, value in zip(_STATE_COLUMNS, row):
+            getattr(self, name)[index] = value
+
+    def copy(self):
+        """复制整个注册表（包括显示名称和运行状态）"""
+        return self.subset(range(len(self)))
+
+    def subset(self, indexes):
+        """取出部分账号组成新的注册表，保留原来的显示名称和运行状态"""
+        subset = AccountRegistry()
+        for index in indexes:
+            new = subset.add(self.params(index))
+            subset.names[new] = self.label(index)
+            for name in _STATE_COLUMNS:
+                getattr(subset, name)[new] = getattr(self, name)[index]
+        return subset
@@ -0,0 +1,75 @@
+import hashlib
+import threading
+
+from .importer import session_key
+
+
+class ResponseCache:
+    """按账号（URL、考试阶段和会话Cookie）缓存最近一次响应的指纹和解析结果
+
+    成绩公布前接口会连续几周返回完全相同的“未公布”响应。响应体（加上Content-Type）
+    的哈希与上次相同时直接复用上次的判断，不再解析JSON、也不记录响应内容；
+    只有内容变化的响应才会完整解析并检查是否公布。
+    服务器返回过 ETag/Last-Modified 时，下次请求带上条件请求头，收到304同样复用上次结果。
+    每个账号的缓存和条件请求头互不共用，一个账号的结果不会被当成另一个账号的。
+    查询在线程池中执行，读写都加锁。
+    """
+
+    def __init__(self):
+        self._entries = {}  # 账号键 -> (指纹, success, result)
+        self._validators = {}  # 账号键 -> 条件请求头
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(url, stage, cookie):
+        """账号的缓存键；只取会话Cookie，其他Cookie被服务器更新时不会变成新的账号"""
+        text = f"{url}\n{stage}\n{session_key(cookie)}"
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    @staticmethod
+    def fingerprint(response):
+        digest = hashlib.blake2b(response.content, digest_size=16)
+        digest.update(response.headers.get("Content-Type", "").encode("latin-1", "replace"))
+        return digest.digest()
+
+    def conditional_headers(self, key):
+        """下次请求要带的条件请求头，服务器不支持时为 None"""
+        with self._lock:
+            return self._validators.get(key)
+
+    def lookup(self, key, fingerprint):
+        """指纹与上次相同时返回上次的 (success, result)，否则返回 None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            return None
+
+    def last(self, key, sent):
+        """304响应对应的上次 (success, result)
+
+        sent 是请求时带的条件请求头；其间缓存已被同一账号的新响应（如对冲请求）替换时返回 None。
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._validators.get(key) != sent:
+                return None
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def store(self, key, fingerprint, success, result, headers):
+        validators = {}
+        if headers.get("ETag"):
+            validators["If-None-Match"] = headers["ETag"]
+        if headers.get("Last-Modified"):
+            validators["If-Modified-Since"] = headers["Last-Modified"]
+        with self._lock:
+            self._entries[key] = (fingerprint, success, result)
+            self._validators[key] = validators or None
+
+    def __len__(self):
+        return len(self._entries)
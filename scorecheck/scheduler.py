@@ -0,0 +1,132 @@
+import random
+import time
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+TIME_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d")
+
+
+def parse_time(value):
+    """把配置中的时间（时间戳或 "2025-08-10 09:00" 格式字符串）转换为时间戳"""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间格式: {value}")
+
+
+def parse_retry_after(value, now=None):
+    """解析 Retry-After 响应头（秒数或HTTP日期），返回需要等待的秒数"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when - (now if now is not None else time.time()))
+
+
+class PollScheduler:
+    """自适应轮询调度
+
+    - 没有配置公布窗口时，按固定间隔 interval 轮询
+    - 窗口开始前 ramp 秒以外按 idle_interval 低频轮询，进入 ramp 阶段后线性加快，
+      窗口内按 burst_interval 高频轮询，窗口结束后恢复 interval
+    - 连续出错时按 2^errors 指数退避，最长 max_backoff 秒
+    - 服务器返回 Retry-After（如429）时至少等待对应时长
+    - 每次间隔加上 ±jitter 比例的随机抖动，避免大量账号同时发请求
+    speed 大于1时（回放加速）Retry-After 和最短间隔按同样倍数缩短，其余间隔由 replayed() 换算。
+    """
+
+    def __init__(self, interval, window_start=None, window_end=None, idle_interval=None,
+                 burst_interval=None, ramp=6 * 3600, jitter=0.1, max_backoff=3600, rng=None, speed=1.0):
+        self.speed = speed
+        self.interval = interval
+        self.window_start = window_start
+        self.window_end = window_end
+        self.idle_interval = idle_interval or max(interval, 3600)
+        self.burst_interval = burst_interval or interval
+        self.ramp = ramp
+        self.jitter = jitter
+        self.max_backoff = max(max_backoff, interval)
+        self.rng = rng or random.Random()
+
+    @classmethod
+    def from_params(cls, params):
+        """根据账号参数创建调度器"""
+        return cls(
+            params["interval"],
+            window_start=parse_time(params.get("release_start")),
+            window_end=parse_time(params.get("release_end")),
+            idle_interval=params.get("idle_interval"),
+            burst_interval=params.get("burst_interval"),
+            ramp=params.get("ramp", 6 * 3600),
+            jitter=params.get("jitter", 0.1),
+            max_backoff=params.get("max_backoff", 3600)
+        )
+
+    def replayed(self, wall_time, speed):
+        """回放磁带时使用的调度器
+
+        wall_time 把录制时的时间戳换算为回放时的时间戳；公布窗口按它平移，
+        各间隔、ramp 和最长退避除以 speed，每次查询在磁带中前进的时间与实际轮询时相同。
+        """
+        def moved(when):
+            return None if when is None else wall_time(when)
+
+        return PollScheduler(self.interval / speed, moved(self.window_start), moved(self.window_end),
+                             self.idle_interval / speed, self.burst_interval / speed, self.ramp / speed,
+                             self.jitter, self.max_backoff / speed, self.rng, speed)
+
+    def base_interval(self, now):
+        """不考虑错误和抖动时，当前时刻的轮询间隔"""
+        if self.window_start is None:
+            return self.interval
+        if self.window_end is not None and now > self.window_end:
+            return self.interval
+        if now >= self.window_start:
+            return self.burst_interval
+        ramp_start = self.window_start - self.ramp
+        if now <= ramp_start or self.ramp <= 0:
+            return self.idle_interval
+        # 在ramp阶段从低频线性过渡到高频
+        ratio = (now - ramp_start) / self.ramp
+        return self.idle_interval + (self.burst_interval - self.idle_interval) * ratio
+
+    def next_delay(self, now=None, errors=0, retry_after=None):
+        """计算距离下一次查询的秒数"""
+        if now is None:
+            now = time.time()
+        delay = self.base_interval(now)
+        if errors:
+            delay = min(delay * (2 ** min(errors, 16)), self.max_backoff)
+        if self.jitter:
+            delay *= self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+        if retry_after is not None:
+            delay = max(delay, retry_after / self.speed)
+        return max(1.0 / self.speed, delay)
+
+    def preview(self, start, duration):
+        """不含抖动和错误时，单个账号在 [start, start+duration) 内的触发时刻"""
+        times = []
+        t = start
+        end = start + duration
+        while t < end:
+            times.append(t)
+            t += max(1.0, self.base_interval(t))
+        return times
+
+    def load_profile(self, start, duration, accounts=1, bucket=3600):
+        """按 bucket 秒分桶统计 accounts 个账号预计产生的请求数，返回 [(桶起始时间, 请求数)]"""
+        counts = [0] * max(1, int((duration + bucket - 1) // bucket))
+        for t in self.preview(start, duration):
+            counts[int((t - start) // bucket)] += accounts
+        return [(start + i * bucket, count) for i, count in enumerate(counts)]
@@ -0,0 +1,70 @@
+"""会话健康判断
+
+Cookie过期后接口照样返回200，只是 msg 不再是“未公布”，不加区分的话会被当成“成绩未公布”一直查下去。
+这里按响应判断会话状态（registry 中的 COOKIE_* 常量）：
+- COOKIE_OK：正常返回了查询结果（无论成绩是否公布）
+- COOKIE_REJECTED：已退出登录（401、跳转到登录页、提示登录或会话过期）
+- COOKIE_BLOCKED：请求被拦截（403、访问过于频繁、需要验证码），会话本身可能仍有效
+- COOKIE_UNKNOWN：无法判断（超时、连接错误、5xx、429），不改变原来的状态
+另外把响应中的 Set-Cookie 合并进账号的Cookie，服务器续期会话时不会因为仍用旧Cookie而掉线。
+"""
+from .importer import parse_cookie
+from .registry import COOKIE_BLOCKED, COOKIE_OK, COOKIE_REJECTED, COOKIE_UNKNOWN
+
+# 响应内容（msg 或页面文字）中出现这些词时判断为已退出登录
+LOGIN_MARKERS = ("登录", "登陆", "未授权", "会话", "过期", "失效", "login", "unauthorized", "session", "expired")
+# 出现这些词时判断为被拦截
+BLOCK_MARKERS = ("频繁", "拦截", "验证码", "禁止访问", "限制访问", "blocked", "captcha", "access denied",
+                 "forbidden")
+
+
+def _mentions(text, markers):
+    text = text.lower()
+    return any(marker in text for marker in markers)
+
+
+def classify_message(msg):
+    """接口正常返回JSON时，按 msg 判断会话状态"""
+    msg = str(msg or "")
+    if _mentions(msg, LOGIN_MARKERS):
+        return COOKIE_REJECTED
+    if _mentions(msg, BLOCK_MARKERS):
+        return COOKIE_BLOCKED
+    return COOKIE_OK
+
+
+def classify_response(status_code, text="", location=""):
+    """按状态码、响应内容（非JSON时）和跳转地址判断会话状态"""
+    if status_code == 401 or _mentions(location, ("login", "登录")):
+        return COOKIE_REJECTED
+    if status_code == 403 or status_code == 200:
+        # 403可能是Cookie失效，也可能是防火墙拦截；200却不是JSON一般是登录页或拦截页
+        if _mentions(text, LOGIN_MARKERS):
+            return COOKIE_REJECTED
+        if status_code == 403 or _mentions(text, BLOCK_MARKERS):
+            return COOKIE_BLOCKED
+    return COOKIE_UNKNOWN
+
+
+def redirect_location(response):
+    """跳转后的地址：requests 自动跟随跳转时为最终URL，不跟随时为 Location 响应头"""
+    if getattr(response, "history", None):
+        return str(response.url)
+    return response.headers.get("Location", "") if 300 <= response.status_code < 400 else ""
+
+
+def cookie_updates(response):
+    """响应（包括跳转经过的响应）中 Set-Cookie 设置的 {名称: 值}，没有时返回 None"""
+    updates = {}
+    for item in list(getattr(response, "history", None) or ()) + [response]:
+        cookies = getattr(item, "cookies", None)
+        if cookies:
+            updates.update(cookies.items())
+    return updates or None
+
+
+def merge_cookie(cookie, updates):
+    """把更新合并进Cookie请求头，保持原有顺序，新的Cookie追加在末尾"""
+    merged = dict(parse_cookie(cookie))
+    merged.update(updates)
+    return "; ".join(f"{key}={value}" for key, value in merged.items())
@@ -0,0 +1,262 @@
+import multiprocessing
+import queue
+import threading
+import zlib
+
+from .engine import PollEngine, QueryResult
+from .logpipe import ERROR, INFO
+from .mailer import MailDispatcher
+from .registry import FINISHED, AccountRegistry
+from .state_store import StateStore
+
+# 子进程事件批量发送的条件：攒够这么多条或距上次发送超过这么多秒
+BATCH_SIZE = 500
+BATCH_INTERVAL = 0.1
+
+
+def shard_of(cookie, shards):
+    """按Cookie稳定哈希到分片，同一账号每次运行都落在同一进程"""
+    return zlib.crc32(cookie.encode("utf-8")) % shards
+
+
+class _EventBatcher:
+    """子进程中收集引擎事件，按批通过队列发回父进程"""
+
+    def __init__(self, events, shard):
+        self.events = events
+        self.shard = shard
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._flush_loop, daemon=True)
+        self._thread.start()
+
+    def put(self, event):
+        with self._lock:
+            self._buffer.append(event)
+            full = len(self._buffer) >= BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._buffer = self._buffer, []
+        if batch:
+            self.events.put((self.shard, batch))
+
+    def _flush_loop(self):
+        while not self._closed.wait(BATCH_INTERVAL):
+            self.flush()
+
+    def close(self):
+        self._closed.set()
+        self._thread.join()
+        self.flush()
+
+
+class _ForwardingMetrics:
+    """子进程中的指标代理，把每次查询的结果发回父进程汇总"""
+
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    def observe(self, result):
+        self.batcher.put(("attempt", result.success, result.error, result.status_code,
+                          result.timings, result.size, result.unchanged, result.hedged, result.session))
+
+    def circuit(self, host, state):
+        self.batcher.put(("circuit", host, state))
+
+    def quarantine(self):
+        self.batcher.put(("quarantine",))
+
+    def coalesce(self):
+        self.batcher.put(("coalesce",))
+
+
+def _shard_main(shard, indexes, accounts, engine_options, events, stop_event):
+    """子进程入口：运行本分片的轮询引擎
+
+    accounts 是父进程注册表的子集，显示名称沿用父进程中的全局编号。
+    账号状态变化时把该账号的状态列发回父进程（按全局编号），进度由父进程按已结束的账号数计算。
+    """
+    batcher = _EventBatcher(events, shard)
+    # 各分片打开同一个状态库，SQLite的WAL模式支持多进程写入
+    store = StateStore(engine_options["state_file"]) if engine_options.get("state_file") else None
+    engine = PollEngine(
+        accounts,
+        log=lambda message, level=INFO: batcher.put(("log", message, level)),
+        status=lambda message: batcher.put(("status", message)),
+        changed=lambda index: batcher.put(("state", indexes[index], accounts.state_row(index))),
+        host_limit=engine_options.get("host_limit", 8),
+        hedge_percentile=engine_options.get("hedge_percentile", 0),
+        hedge_budget=engine_options.get("hedge_budget", 0.05),
+        rate_limit=engine_options.get("rate_limit", 0),
+        breaker_threshold=engine_options.get("breaker_threshold", 5),
+        breaker_cooldown=engine_options.get("breaker_cooldown", 30),
+        prewarm_lead=engine_options.get("prewarm_lead", 120),
+        keepalive_interval=engine_options.get("keepalive_interval", 20),
+        digest_window=engine_options.get("digest_window", 600),
+        http2_hosts=engine_options.get("http2_hosts", ()),
+        quarantine_after=engine_options.get("quarantine_after", 2),
+        metrics=_ForwardingMetrics(batcher) if engine_options.get("metrics") else None,
+        mailer=MailDispatcher(**engine_options["mailer"]) if engine_options.get("mailer") else None,
+        store=store
+    )
+
+    # 只轮询 is_set()：进程退出时若还阻塞在 stop_event.wait() 中，父进程之后的 set() 会一直等它的应答
+    exited = threading.Event()
+
+    def watch_stop():
+        while not exited.wait(0.2):
+            if stop_event.is_set():
+                engine.stop()
+                return
+
+    watcher = threading.Thread(target=watch_stop, daemon=True)
+    watcher.start()
+    try:
+        engine.run()
+        engine.mailer.stop()
+    finally:
+        exited.set()
+        watcher.join()
+        if store is not None:
+            store.close()
+        final = [(index, accounts.state_row(local), accounts.cookies[local])
+                 for local, index in enumerate(indexes)]
+        batcher.put(("done", final))
+        batcher.close()
+
+
+class ShardedEngine:
+    """多进程分片轮询
+
+    账号按Cookie哈希分到 processes 个子进程，每个子进程运行一个 PollEngine。
+    子进程的日志、状态和查询结果批量发回父进程，再交给与 PollEngine 相同的回调；
+    账号状态写回父进程的注册表（self.accounts / self.states）并调用 changed(index)，界面看板可以直接读取。
+    stop() 通过进程间事件通知所有子进程停止。
+    """
+
+    def __init__(self, accounts, processes=2, log=None, status=None, progress=None, changed=None, host_limit=8,
+                 metrics=None, mailer_options=None, state_file=None, hedge_percentile=0, hedge_budget=0.05,
+                 rate_limit=0, breaker_threshold=5, breaker_cooldown=30, prewarm_lead=120, keepalive_interval=20,
+                 digest_window=600, http2_hosts=(), quarantine_after=2):
+        self.accounts = AccountRegistry.of(accounts)
+        self.processes = max(1, min(processes, len(accounts)))
+        self.states = self.accounts.states
+        self.log = log or (lambda *args: None)
+        self.status = status or (lambda *args: None)
+        self.progress = progress or (lambda *args: None)
+        self.changed = changed or (lambda *args: None)
+        self.host_limit = host_limit
+        self.metrics = metrics
+        self.mailer_options = mailer_options  # 子进程邮件队列的参数，为空时使用默认设置
+        self.state_file = state_file
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.rate_limit = rate_limit
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.prewarm_lead = prewarm_lead
+        self.keepalive_interval = keepalive_interval
+        self.digest_window = digest_window
+        self.http2_hosts = list(http2_hosts or ())
+        self.quarantine_after = quarantine_after
+        self.running = True
+        # spawn在各平台行为一致，也不会把父进程（如GUI）的线程状态复制进子进程
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+
+    def stop(self):
+        """停止所有分片（可在任意线程调用）"""
+        self.running = False
+        self.log("正在停止查询...")
+        self._stop_event.set()
+
+    def run(self):
+        shards = [[] for _ in range(self.processes)]
+        for index, cookie in enumerate(self.accounts.cookies):
+            shards[shard_of(cookie, self.processes)].append(index)
+        active = sum(1 for indexes in shards if indexes)
+
+        events = self._context.Queue()
+        options = {"host_limit": self.host_limit, "metrics": self.metrics is not None,
+                   "mailer": self.mailer_options, "state_file": self.state_file,
+                   "hedge_percentile": self.hedge_percentile, "hedge_budget": self.hedge_budget,
+                   # 限速按实际启动的进程数平分（没有账号的分片不启动），所有进程合计仍是 rate_limit
+                   "rate_limit": self.rate_limit / active if self.rate_limit else 0,
+                   "breaker_threshold": self.breaker_threshold, "breaker_cooldown": self.breaker_cooldown,
+                   "prewarm_lead": self.prewarm_lead, "keepalive_interval": self.keepalive_interval,
+                   "digest_window": self.digest_window, "http2_hosts": self.http2_hosts,
+                   "quarantine_after": self.quarantine_after}
+        workers = {}
+        for shard, indexes in enumerate(shards):
+            if not indexes:
+                continue
+            process = self._context.Process(
+                target=_shard_main,
+                args=(shard, indexes, self.accounts.subset(indexes), options, events, self._stop_event),
+                name=f"scorecheck-shard-{shard}",
+                daemon=True
+            )
+            process.start()
+            workers[shard] = process
+        if self._stop_event.is_set():
+            self.running = False
+
+        self.log(f"已启动 {len(workers)} 个查询进程，共 {len(self.accounts)} 个账号")
+        accounts = self.accounts
+        finished = accounts.count(FINISHED)
+        pending = set(workers)
+
+        while pending:
+            try:
+                shard, batch = events.get(timeout=0.5)
+            except queue.Empty:
+                # 子进程异常退出时不会发送done，避免一直等待
+                for shard in list(pending):
+                    if not workers[shard].is_alive() and events.empty():
+                        self.log(f"查询进程 {shard} 异常退出（退出码 {workers[shard].exitcode}）", ERROR)
+                        pending.discard(shard)
+                continue
+
+            for event in batch:
+                kind = event[0]
+                if kind == "log":
+                    self.log(event[1], event[2])
+                elif kind == "status":
+                    self.status(event[1])
+                elif kind == "state":
+                    _, index, row = event
+                    was_finished = accounts.flags[index] & FINISHED
+                    accounts.set_state_row(index, row)
+                    if accounts.flags[index] & FINISHED and not was_finished:
+                        finished += 1
+                        self.progress(finished * 100 // len(accounts))
+                    self.changed(index)
+                elif kind == "attempt":
+                    if self.metrics is not None:
+                        _, success, error, status_code, timings, size, unchanged, hedged, session = event
+                        self.metrics.observe(QueryResult(success, None, status_code, error, timings=timings,
+                                                         size=size, unchanged=unchanged, hedged=hedged,
+                                                         session=session))
+                elif kind == "circuit":
+                    if self.metrics is not None:
+                        self.metrics.circuit(event[1], event[2])
+                elif kind == "quarantine":
+                    if self.metrics is not None:
+                        self.metrics.quarantine()
+                elif kind == "coalesce":
+                    if self.metrics is not None:
+                        self.metrics.coalesce()
+                elif kind == "done":
+                    for index, row, cookie in event[1]:
+                        accounts.set_state_row(index, row)
+                        self.states[index].finished = True
+                        accounts.cookies[index] = cookie
+                        self.changed(index)
+                    pending.discard(shard)
+
+        for process in workers.values():
+            process.join(5)
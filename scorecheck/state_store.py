@@ -0,0 +1,149 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS account_state (
+    key TEXT PRIMARY KEY,
+    label TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    fails INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    last_status INTEGER NOT NULL DEFAULT 0,
+    last_code INTEGER NOT NULL DEFAULT 0,
+    last_result TEXT,
+    cookie_status INTEGER NOT NULL DEFAULT 0,
+    next_fire REAL,
+    published INTEGER NOT NULL DEFAULT 0,
+    published_at REAL,
+    notified INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL,
+    quarantined INTEGER NOT NULL DEFAULT 0,
+    cookie_jar TEXT
+)
+"""
+
+# 旧版本数据库中没有的列，打开时补上
+_ADDED_COLUMNS = (
+    ("quarantined", "INTEGER NOT NULL DEFAULT 0"),
+    ("cookie_jar", "TEXT"),  # 服务器更新过的Cookie，未更新时为空
+)
+
+FIELDS = ("label", "attempts", "fails", "errors", "last_status", "last_code", "last_result", "cookie_status",
+          "next_fire", "published", "published_at", "notified", "updated_at", "quarantined", "cookie_jar")
+
+_UPSERT = (f"INSERT OR REPLACE INTO account_state (key, {', '.join(FIELDS)}) "
+           f"VALUES ({', '.join('?' * (len(FIELDS) + 1))})")
+
+
+def account_key(url, stage, cookie, receiver=""):
+    """账号在状态库中的键：同一接口、考试阶段、Cookie和收件人视为同一个账号
+
+    多个收件人关注同一考生（共用Cookie）时各自的通知状态要分开保存。
+    没有收件人时与旧版本的键相同；录制磁带只按请求区分账号，不传 receiver。
+    """
+    text = f"{url}\n{stage}\n{cookie}"
+    if receiver:
+        text += f"\n{receiver}"
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class StateStore:
+    """账号查询状态的持久化存储（SQLite，WAL模式）
+
+    put() 只把最新状态放进内存中的待写表（同一账号多次更新只保留最后一次），
+    后台线程每隔 flush_interval 秒或攒够 batch_size 条时在一个事务中批量写入，
+    每分钟成千上万次查询也只对应少量的提交和fsync。
+    """
+
+    def __init__(self, path, flush_interval=1.0, batch_size=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending = {}
+        self._wakeup = threading.Event()
+        self._closed = False
+        self.writes = 0  # 已写入的行数
+        self.commits = 0  # 已提交的事务数
+
+        # 写连接由后台线程和 flush() 加锁共用，load() 另开连接读取
+        self._conn = self._connect()
+        self._conn.execute(_SCHEMA)
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(account_state)")}
+        for name, definition in _ADDED_COLUMNS:
+            if name not in columns:
+                try:
+                    self._conn.execute(f"ALTER TABLE account_state ADD COLUMN {name} {definition}")
+                except sqlite3.OperationalError:
+                    pass  # 多进程分片同时打开时，其他进程已经加上了
+        self._conn.commit()
+        self._thread = threading.Thread(target=self._writer, name="state-store", daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # WAL模式下NORMAL在断电时最多丢失最后几个事务，不会损坏数据库
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def load(self):
+        """读取所有已保存的状态，返回 {键: sqlite3.Row}"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            return {row["key"]: row for row in conn.execute("SELECT * FROM account_state")}
+        finally:
+            conn.close()
+
+    def put(self, key, **values):
+        """记录账号的最新状态（异步写入）"""
+        values["updated_at"] = time.time()
+        row = (key,) + tuple(values.get(field) for field in FIELDS)
+        with self._lock:
+            self._pending[key] = row
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def flush(self):
+        """立即写入所有待写的状态"""
+        with self._write_lock:
+            with self._lock:
+                rows, self._pending = list(self._pending.values()), {}
+            if not rows:
+                return
+            try:
+                with self._conn:
+                    self._conn.executemany(_UPSERT, rows)
+            except sqlite3.Error:
+                # 写入失败时放回待写表（期间有更新的以新的为准）
+                with self._lock:
+                    for row in rows:
+                        self._pending.setdefault(row[0], row)
+                raise
+            self.writes += len(rows)
+            self.commits += 1
+
+    def _writer(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # 数据库暂时被锁等错误不影响查询，下一轮再写
+                time.sleep(self.flush_interval)
+
+    def close(self):
+        """写入剩余状态并关闭数据库"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wakeup.set()
+        self._thread.join()
+        self.flush()
+        self._conn.close()
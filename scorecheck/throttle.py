@@ -0,0 +1,108 @@
+import random
+
+# 熔断器状态
+CLOSED = 0
+HALF_OPEN = 1
+OPEN = 2
+CIRCUIT_NAMES = ("正常", "试探中", "已熔断")
+
+
+class TokenBucket:
+    """令牌桶限速：平均每秒 rate 个请求，最多突发 burst 个
+
+    reserve() 预约下一个令牌并返回需要等待的秒数，等待中的请求按预约顺序依次发出，
+    同一主机的总请求速率因此是可预期的。
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1.0, rate))
+        self._tokens = self.burst
+        self._updated = None
+
+    def _refill(self, now):
+        if self._updated is not None:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, now):
+        """预约一个令牌，返回还需等待的秒数（0表示立即可用）"""
+        self._refill(now)
+        self._tokens -= 1
+        return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self, now):
+        """有现成的令牌时取走并返回 True，否则不预约、返回 False"""
+        self._refill(now)
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+
+class CircuitBreaker:
+    """熔断器：连续 threshold 次服务端错误（5xx、超时、连接失败）后暂停访问该主机
+
+    熔断 cooldown 秒后进入试探状态，只放行一个请求：成功则恢复，失败则再次熔断，
+    冷却时间翻倍（不超过 max_cooldown）。状态变化时调用 on_change(状态)。
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0, max_cooldown=300.0, probe_timeout=60.0, on_change=None):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.probe_timeout = probe_timeout
+        self.on_change = on_change
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._probe_at = None
+
+    def _set(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_change is not None:
+                self.on_change(state)
+
+    def allow(self, now):
+        """是否可以发出请求；熔断中返回 False"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if now < self.opened_at + self.cooldown:
+                return False
+            self._set(HALF_OPEN)
+        # 试探状态只放行一个请求；试探请求迟迟没有结果时再放行一个
+        if self._probe_at is not None and now < self._probe_at + self.probe_timeout:
+            return False
+        self._probe_at = now
+        return True
+
+    def retry_at(self, now):
+        """被拒绝的请求下次可以再试的时间（带随机抖动，避免恢复时同时涌入）"""
+        if self.state == OPEN:
+            when = self.opened_at + self.cooldown
+        else:
+            when = now + min(self.cooldown, 5.0)
+        return max(now, when) + random.uniform(0, min(self.cooldown, 5.0))
+
+    def record(self, failed, now):
+        """记录一次请求的结果"""
+        if not failed:
+            self.failures = 0
+            self.cooldown = self.base_cooldown
+            self._probe_at = None
+            self._set(CLOSED)
+            return
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._open(now)
+        elif self.state == CLOSED and self.failures >= self.threshold:
+            self._open(now)
+
+    def _open(self, now):
+        self.opened_at = now
+        self._probe_at = None
+        self._set(OPEN)
@@ -0,0 +1,133 @@
+import math
+import time
+
+
+class TimingWheel:
+    """分层时间轮
+
+    每个键对应一个到期时间。插入、取消都是 O(1)；advance() 按批返回到期的键。
+    第 i 层每个槽覆盖 slots^i 个 tick，条目放在与当前 tick 处于同一个 slots^(i+1) 区间
+    的最低一层，走到它所在的区间起点时再下沉到更低层（级联），超出最高层的条目放在溢出表中。
+    next_due() 给出下一次需要处理的时间，调用方只需睡到那一刻，空闲时不会空转。
+    """
+
+    def __init__(self, tick=0.1, slots=64, levels=4, origin=None):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.origin = time.time() if origin is None else origin
+        self._spans = [slots ** i for i in range(levels + 1)]
+        self._wheels = [[{} for _ in range(slots)] for _ in range(levels)]
+        self._overflow = {}
+        self._ready = {}
+        self._where = {}  # 键 -> 所在的字典
+        self._current = 0  # 已处理到的tick
+
+    def __len__(self):
+        return len(self._where)
+
+    def __contains__(self, key):
+        return key in self._where
+
+    def _tick_of(self, when):
+        # 到期时间向上取整，保证不会提前触发
+        return max(0, math.ceil((when - self.origin) / self.tick - 1e-9))
+
+    def _elapsed_ticks(self, now):
+        # 当前时间向下取整：只处理已经完整走过的tick
+        return max(0, math.floor((now - self.origin) / self.tick + 1e-9))
+
+    def time_of(self, tick):
+        return self.origin + tick * self.tick
+
+    def _place(self, key, tick):
+        if tick <= self._current:
+            bucket = self._ready
+        else:
+            bucket = self._overflow
+            for level in range(self.levels):
+                if tick // self._spans[level + 1] == self._current // self._spans[level + 1]:
+                    bucket = self._wheels[level][(tick // self._spans[level]) % self.slots]
+                    break
+        bucket[key] = tick
+        self._where[key] = bucket
+
+    def schedule(self, key, when):
+        """安排（或重新安排）键在 when 时刻到期"""
+        self.cancel(key)
+        self._place(key, self._tick_of(when))
+
+    def cancel(self, key):
+        """取消键，返回是否存在"""
+        bucket = self._where.pop(key, None)
+        if bucket is None:
+            return False
+        del bucket[key]
+        return True
+
+    def clear(self):
+        for key in list(self._where):
+            self.cancel(key)
+
+    def _cascade(self, bucket):
+        entries = list(bucket.items())
+        bucket.clear()
+        for key, tick in entries:
+            self._place(key, tick)
+
+    def _step(self):
+        """前进一个tick，返回该tick到期的条目"""
+        self._current += 1
+        current = self._current
+        if current % self._spans[self.levels] == 0 and self._overflow:
+            self._cascade(self._overflow)
+        for level in range(self.levels - 1, 0, -1):
+            if current % self._spans[level] == 0:
+                self._cascade(self._wheels[level][(current // self._spans[level]) % self.slots])
+        bucket = self._wheels[0][current % self.slots]
+        due = list(bucket)
+        bucket.clear()
+        return due
+
+    def _next_tick(self, include_ready=True):
+        """下一个需要处理的tick（有条目到期或需要级联），没有条目时返回 None"""
+        if not self._where:
+            return None
+        if include_ready and self._ready:
+            return self._current
+        current = self._current
+        # 低层的槽一定早于更高层的槽，找到的第一个非空槽就是答案
+        for level in range(self.levels):
+            span = self._spans[level]
+            block = (current // self._spans[level + 1]) * self._spans[level + 1]
+            wheel = self._wheels[level]
+            for slot in range((current // span) % self.slots + 1, self.slots):
+                if wheel[slot]:
+                    return block + slot * span
+        if self._overflow:
+            top = self._spans[self.levels]
+            return (current // top + 1) * top
+        return None
+
+    def next_due(self):
+        """下一次需要调用 advance() 的时间戳，没有条目时返回 None"""
+        tick = self._next_tick()
+        return None if tick is None else self.time_of(tick)
+
+    def advance(self, now=None):
+        """推进到 now，返回所有已到期的键"""
+        target = self._elapsed_ticks(time.time() if now is None else now)
+        due = []
+        while self._current < target:
+            next_tick = self._next_tick(include_ready=False)
+            if next_tick is None or next_tick > target:
+                self._current = target
+                break
+            # 中间没有任何条目的tick直接跳过
+            self._current = max(self._current, next_tick - 1)
+            due.extend(self._step())
+        due.extend(self._ready)
+        self._ready.clear()
+        for key in due:
+            del self._where[key]
+        return due
@@ -0,0 +1,97 @@
+"""查询请求的传输层
+
+传输层只需提供 post(url, cookie, user_agent, data, timeout, headers)，返回带 status_code、content、
+headers、json() 和 timings 的响应；可选提供 prewarm(url, count, user_agent) 用于预热连接。
+- http1：SessionPool（requests + urllib3），每个并发请求占用一条连接
+- http2：Http2Transport（httpx），多个账号的请求在少数几条连接上多路复用；
+  服务器不支持HTTP/2（TLS协商不出h2，或是明文http）时自动退回HTTP/1.1
+"""
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from .http_session import STATIC_HEADERS, shared_pool
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 为可选功能：pip install "httpx[http2]"
+    httpx = None
+
+PROTOCOLS = ("http1", "http2")
+
+
+class Http2Transport:
+    """基于 httpx 的HTTP/2传输层
+
+    httpx 的连接池对HTTP/2连接会复用到并发流用尽为止，所以同一主机通常只需要一条连接；
+    退回HTTP/1.1时最多开 pool_size 条连接，与 SessionPool 相同。
+    """
+
+    def __init__(self, pool_size=16, timeout=15):
+        if httpx is None:
+            raise RuntimeError("HTTP/2 需要安装 httpx[http2]")
+        try:
+            self.client = httpx.Client(
+                http2=True,
+                headers=STATIC_HEADERS,
+                timeout=timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+        except ImportError as e:
+            # 装了 httpx 但没装 h2
+            raise RuntimeError(f"HTTP/2 需要安装 httpx[http2]: {e}")
+        self.pool_size = pool_size
+        self.protocols = Counter()  # 实际使用的协议版本 -> 请求数
+        self._lock = threading.Lock()
+
+    def post(self, url, cookie, user_agent, data, timeout=15, headers=None):
+        """发送查询请求；timings 只有 ttfb 和 total（httpx 不提供分阶段耗时）"""
+        request_headers = {"Cookie": cookie, "User-Agent": user_agent}
+        if headers:
+            request_headers.update(headers)
+        start = time.perf_counter()
+        response = self.client.post(url, headers=request_headers, data=data, timeout=timeout)
+        total = time.perf_counter() - start
+        response.timings = {"ttfb": response.elapsed.total_seconds(), "total": total}
+        with self._lock:
+            self.protocols[response.http_version] += 1
+        return response
+
+    def prewarm(self, url, count, user_agent=None, timeout=5):
+        """预热连接：HTTP/2 下一个HEAD请求就建好了可复用的连接，返回成功的请求数"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        headers = {"User-Agent": user_agent} if user_agent else None
+        # 退回HTTP/1.1时需要多条连接，并发发送才会各占一条
+        parallel = 1 if self.protocols.get("HTTP/2") else min(count, self.pool_size)
+        results = []
+
+        def probe():
+            try:
+                self.client.head(origin, headers=headers, timeout=timeout)
+                results.append(True)
+            except Exception:
+                pass
+
+        threads = [threading.Thread(target=probe, daemon=True) for _ in range(parallel)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout + 1)
+        return len(results)
+
+    def close(self):
+        self.client.close()
+
+
+def create_transport(protocol, pool_size=16):
+    """按协议名创建传输层（http1 返回进程内共享的 SessionPool）
+
+    http2 不可用（没有安装 httpx[http2]）时抛出 RuntimeError，由调用方决定是否退回 http1。
+    """
+    if protocol == "http2":
+        return Http2Transport(pool_size=pool_size)
+    if protocol == "http1":
+        return shared_pool(pool_size=pool_size)
+    raise ValueError(f"未知的传输协议: {protocol}")
@@ -0,0 +1,54 @@
+import json
+import time
+
+from scorecheck import cli
+from scorecheck.mailer import MailDispatcher
+
+URL = "https://example.com/query/score/result"
+SMTP = {"smtp_server": "smtp.example.com", "sender_email": "a@example.com", "sender_pwd": "x",
+        "receiver_email": "b@example.com"}
+
+
+def write_config(tmp_path, **defaults):
+    path = tmp_path / "config.json"
+    path.write_text(json.dumps({"defaults": dict({"url": URL, "stage": "x"}, **SMTP, **defaults),
+                                "accounts": [{"name": "a", "cookie": "PHPSESSID=1"}]}), encoding="utf-8")
+    return str(path)
+
+
+def write_cassette(tmp_path, bodies, step=1.0):
+    path = tmp_path / "day.cassette"
+    with open(path, "w", encoding="utf-8") as f:
+        for offset, body in enumerate(bodies):
+            f.write(json.dumps({"t": 1000.0 + offset * step, "url": URL, "stage": "x", "account": "0" * 16,
+                                "status": 200, "headers": {"Content-Type": "application/json"},
+                                "body": json.dumps(body), "timings": {"total": 0.0}}) + "\n")
+    return str(path)
+
+
+def test_replay_sends_no_mail(tmp_path, monkeypatch):
+    sent = []
+    monkeypatch.setattr(MailDispatcher, "submit", lambda self, *args: sent.append(args))
+    config = write_config(tmp_path)
+    cassette = write_cassette(tmp_path, [{"msg": "ok", "data": {"score": 60}}])
+    assert cli.main([config, "--replay", cassette, "--check-once", "-q"]) == 0
+    assert sent == []
+
+
+def test_replay_scales_poll_interval_to_cassette_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(MailDispatcher, "submit", lambda self, *args: None)
+    # 磁带每60秒一条，第300秒起成绩公布；按60秒间隔、600倍速回放约0.5秒找到成绩
+    pending = {"msg": "成绩未公布"}
+    cassette = write_cassette(tmp_path, [pending] * 5 + [{"msg": "ok", "data": {"score": 60}}] * 2, step=60)
+    config = write_config(tmp_path, interval=60, jitter=0, max_attempts=20)
+    start = time.monotonic()
+    assert cli.main([config, "--replay", cassette, "--replay-speed", "600", "-q"]) == 0
+    assert time.monotonic() - start < 5
+
+
+def test_replay_rejects_interval_longer_than_cassette(tmp_path):
+    cassette = write_cassette(tmp_path, [{"msg": "成绩未公布"}] * 3, step=60)
+    config = write_config(tmp_path, interval=600)
+    assert cli.main([config, "--replay", cassette, "--replay-speed", "60", "-q"]) == 1
+    # 单次查询不受限制
+    assert cli.main([config, "--replay", cassette, "--check-once", "-q"]) == 2
@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from scorecheck import engine as engine_module
+from scorecheck.config import build_account
+from scorecheck.engine import PollEngine, QueryResult
+from scorecheck.state_store import StateStore
+
+URL = "https://example.com/query/score/result"
+SMTP = {"smtp_server": "smtp.example.com", "sender_email": "a@example.com", "sender_pwd": "x"}
+
+
+class RecordingMailer:
+    """记录发出的邮件；发给 fail_once 中收件人的第一封邮件发送失败"""
+
+    def __init__(self, fail_once=()):
+        self.fail_once = set(fail_once)
+        self.sent = []
+
+    def submit(self, profile, receivers, subject, html):
+        future = Future()
+        if receivers[0] in self.fail_once:
+            self.fail_once.discard(receivers[0])
+            future.set_exception(OSError("SMTP连接失败"))
+            return future
+        self.sent.append((receivers[0], subject))
+        future.set_result(True)
+        return future
+
+    def join(self, timeout=None):
+        return True
+
+
+def test_identical_queries_share_one_request(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def query_score(params, log, session, cache):
+        with lock:
+            calls.append(params["cookie"])
+        time.sleep(0.2)
+        return QueryResult(False, "成绩未公布", 200, timings={"total": 0.2})
+
+    monkeypatch.setattr(engine_module, "query_score", query_score)
+    # 前两个账号的URL、Cookie和考试阶段相同，第三个Cookie不同
+    accounts = [build_account({"url": URL, "stage": "x", "cookie": cookie, "name": name, "max_attempts": 1})
+                for name, cookie in (("a", "PHPSESSID=1"), ("b", "PHPSESSID=1"), ("c", "PHPSESSID=2"))]
+    engine = PollEngine(accounts)
+    engine.run()
+
+    assert sorted(calls) == ["PHPSESSID=1", "PHPSESSID=2"]
+    assert [state.attempt_count for state in engine.states] == [1, 1, 1]
+    assert all(state.finished for state in engine.states)
+
+
+def test_watchers_are_notified_once_across_restarts(tmp_path, monkeypatch):
+    calls = []
+
+    def query_score(params, log, session, cache):
+        calls.append(params["cookie"])
+        time.sleep(0.05)
+        return QueryResult(True, {"score": 60}, 200, timings={"total": 0.05})
+
+    monkeypatch.setattr(engine_module, "query_score", query_score)
+    receivers = ["dad@example.com", "mom@example.com", "me@example.com"]
+    accounts = [build_account(dict(SMTP, url=URL, stage="x", cookie="PHPSESSID=1", receiver_email=receiver))
+                for receiver in receivers]
+    mailer = RecordingMailer(fail_once={"mom@example.com"})
+    path = str(tmp_path / "state.db")
+    for _ in range(2):
+        store = StateStore(path)
+        PollEngine(accounts, store=store, mailer=mailer, prewarm_lead=0).run()
+        store.close()
+
+    # 第一次运行共用一次请求；重启后只为发送失败的收件人再查一次并补发，每个收件人恰好收到一封
+    assert calls == ["PHPSESSID=1", "PHPSESSID=1"]
+    assert sorted(mailer.sent) == [(receiver, "成绩已公布") for receiver in sorted(receivers)]
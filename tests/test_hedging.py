@@ -0,0 +1,66 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from scorecheck import engine as engine_module
+from scorecheck.engine import PollEngine, QueryResult
+from scorecheck.hedging import HedgePolicy
+
+
+def test_delay_needs_samples_and_uses_percentile():
+    hedge = HedgePolicy(percentile=0.5, min_samples=4, min_delay=0.0)
+    for latency in (0.1, 0.2, 0.3):
+        hedge.record(latency)
+    assert hedge.delay() is None
+    hedge.record(0.4)
+    assert hedge.delay() == 0.3
+
+
+def test_window_drops_oldest_sample():
+    hedge = HedgePolicy(percentile=0.99, window=3, min_samples=1, min_delay=0.0)
+    for latency in (5.0, 0.1, 0.2, 0.3):
+        hedge.record(latency)
+    assert hedge.delay() == 0.3
+
+
+def test_budget_limits_hedges():
+    hedge = HedgePolicy(budget=0.5)
+    hedge.started()
+    assert not hedge.acquire()
+    hedge.started()
+    assert hedge.acquire()
+    assert not hedge.acquire()
+    assert hedge.sent == 1
+
+
+def test_slow_primary_latency_is_recorded_when_hedge_wins(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def query_score(params, log, session, cache):
+        with lock:
+            calls.append(None)
+            latency = 0.3 if len(calls) == 1 else 0.01
+        time.sleep(latency)
+        return QueryResult(False, "未公布", 200, timings={"total": latency})
+
+    monkeypatch.setattr(engine_module, "query_score", query_score)
+    engine = PollEngine([], hedge_percentile=0.5, hedge_budget=1)
+    for _ in range(engine.hedge.min_samples):
+        engine.hedge.record(0.05)
+
+    async def run():
+        engine._loop = asyncio.get_running_loop()
+        engine._executor = ThreadPoolExecutor(max_workers=2)
+        outcome = await engine._query({}, lambda *args: None, "example.com")
+        await asyncio.sleep(0.4)
+        engine._executor.shutdown()
+        return outcome
+
+    outcome = asyncio.run(run())
+    assert outcome.hedged == "hedge"
+    assert engine.hedge.won == 1
+    # 先返回的对冲请求不记录，原请求完成后记录它的耗时
+    assert 0.3 in engine.hedge._samples
+    assert 0.01 not in engine.hedge._samples
@@ -0,0 +1,65 @@
+import pytest
+
+from scorecheck.config import ConfigError, build_account
+from scorecheck.importer import import_accounts, parse_cookie, session_key
+from scorecheck.scheduler import PollScheduler
+
+BASE = {"url": "https://example.com/query/score/result", "stage": "2025年上半年", "cookie": "PHPSESSID=a"}
+
+
+def write_csv(tmp_path, text):
+    path = tmp_path / "accounts.csv"
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_csv_values_are_converted(tmp_path):
+    path = write_csv(tmp_path, "cookie,burst_interval,jitter,smtp_ssl,interval\n"
+                               "PHPSESSID=a,60,0.2,false,300\n")
+    result = import_accounts(path, defaults={"url": BASE["url"], "stage": BASE["stage"]})
+    params = result.accounts[0]
+    assert result.added == 1
+    assert params["burst_interval"] == 60.0
+    assert params["jitter"] == 0.2
+    assert params["smtp_ssl"] is False
+    assert params["interval"] == 300
+    # 转换后的参数可以直接生成调度器
+    PollScheduler.from_params(params).next_delay(0, 0)
+
+
+def test_csv_invalid_values_are_reported(tmp_path):
+    path = write_csv(tmp_path, "cookie,jitter\nPHPSESSID=a,abc\nPHPSESSID=b,0.1\n")
+    result = import_accounts(path, defaults={"url": BASE["url"], "stage": BASE["stage"]})
+    assert result.added == 1
+    assert result.invalid == 1
+    assert "jitter" in result.errors[0]
+
+
+def test_csv_duplicate_sessions_are_skipped(tmp_path):
+    path = write_csv(tmp_path, "姓名,cookie\n甲,PHPSESSID=a; x=1\n乙,x=2; PHPSESSID=a\n丙,PHPSESSID=b\n")
+    result = import_accounts(path, defaults={"url": BASE["url"], "stage": BASE["stage"]})
+    assert (result.added, result.duplicates) == (2, 1)
+    assert [result.accounts.label(i) for i in range(2)] == ["甲", "丙"]
+
+
+@pytest.mark.parametrize("value, expected", [("true", True), ("0", False), ("是", True), (False, False)])
+def test_bool_fields(value, expected):
+    assert build_account(dict(BASE, smtp_ssl=value))["smtp_ssl"] is expected
+
+
+@pytest.mark.parametrize("field, value", [("interval", "1.5"), ("max_backoff", "soon"), ("smtp_ssl", "maybe"),
+                                          ("smtp_port", True)])
+def test_bad_values_raise(field, value):
+    with pytest.raises(ConfigError):
+        build_account(dict(BASE, **{field: value}))
+
+
+def test_missing_required_field():
+    with pytest.raises(ConfigError):
+        build_account({"url": BASE["url"], "stage": BASE["stage"]})
+
+
+def test_cookie_helpers():
+    assert parse_cookie("a=1; b = 2;c") == [("a", "1"), ("b", "2")]
+    assert session_key("x=1; PHPSESSID=abc") == "PHPSESSID=abc"
+    assert session_key("b=2; a=1") == "a=1; b=2"
@@ -0,0 +1,29 @@
+import threading
+import time
+
+from scorecheck.profiling import WAIT_FRAMES, Profiler
+
+
+def _spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_waiting_threads_are_counted_separately(tmp_path):
+    stop = threading.Event()
+    idle = threading.Thread(target=stop.wait, name="idle-1", daemon=True)
+    busy = threading.Thread(target=_spin, args=(stop,), name="busy", daemon=True)
+    idle.start()
+    busy.start()
+    profiler = Profiler(output_dir=str(tmp_path), interval=0.005, snapshot_interval=60)
+    profiler.start()
+    time.sleep(0.3)
+    profiler.stop()
+    stop.set()
+
+    assert profiler._waiting["idle"] > 0
+    assert any("_spin" in stack for stack in profiler._stacks)
+    # 统计中的栈顶都不是等待函数
+    for stack in profiler._stacks:
+        name, location = stack.rsplit(";", 1)[-1].split(" (")
+        assert (location.split(":")[0], name) not in WAIT_FRAMES
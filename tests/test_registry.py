@@ -0,0 +1,87 @@
+import math
+
+from scorecheck.config import build_account
+from scorecheck.registry import FINISHED, PUBLISHED, QUARANTINED, AccountRegistry
+
+URL = "https://example.com/query/score/result"
+
+
+def account(i, **extra):
+    return build_account(dict({"url": URL, "stage": "2025年上半年", "name": f"u{i}", "cookie": f"PHPSESSID={i}"},
+                              **extra))
+
+
+def test_params_round_trip_and_shared_pools():
+    accounts = [account(i) for i in range(3)] + [account(3, interval=60, smtp_ssl=False)]
+    registry = AccountRegistry(accounts)
+    assert len(registry) == 4
+    assert [registry[i] for i in range(4)] == accounts
+    assert list(registry) == accounts
+    # 相同的URL、考试阶段和轮询策略只保存一份
+    assert len(registry.urls) == 1 and len(registry.stages) == 1
+    assert len(registry.policies) == 2
+
+
+def test_field_accessors_match_params():
+    registry = AccountRegistry([account(0), account(1, interval=60, enable_email=True)])
+    for index in range(2):
+        params = registry.params(index)
+        assert registry.url(index) == params["url"]
+        assert registry.stage(index) == params["stage"]
+        assert registry.cookie(index) == params["cookie"]
+        assert registry.user_agent(index) == params["user_agent"]
+        assert registry.email_enabled(index) == params["enable_email"]
+        assert registry.policy(index)["interval"] == params["interval"]
+        assert registry.request(index) == {key: params[key] for key in ("url", "stage", "cookie", "user_agent")}
+    # 同一策略的账号共用一个字典
+    registry.add(account(2))
+    assert registry.policy(2) is registry.policy(0)
+
+
+def test_state_views_write_to_columns():
+    registry = AccountRegistry([account(0), account(1)])
+    state = registry.states[1]
+    assert state.next_fire is None
+    state.attempt_count = 5
+    state.next_fire = 12.5
+    state.published = True
+    assert registry.attempts[1] == 5
+    assert registry.next_fire[1] == 12.5
+    assert registry.flags[1] & PUBLISHED
+    state.next_fire = None
+    assert math.isnan(registry.next_fire[1])
+    assert registry.states[-1].label == "u1"
+    assert AccountRegistry([{"url": URL, "stage": "x", "cookie": "c"}]).states[0].label == "账号1"
+
+
+def test_flag_scans():
+    registry = AccountRegistry([account(i) for i in range(6)])
+    for index in (1, 4):
+        registry.states[index].published = True
+    registry.states[4].quarantined = True
+    assert registry.unpublished() == [0, 2, 3, 5]
+    assert registry.select(PUBLISHED) == [1, 4]
+    assert registry.count(QUARANTINED) == 1
+    assert registry.count(FINISHED, False) == 6
+
+
+def test_subset_keeps_labels_and_state():
+    registry = AccountRegistry([account(i) for i in range(4)])
+    registry.names[2] = None
+    registry.states[2].attempt_count = 7
+    registry.states[3].published = True
+    subset = registry.subset([2, 3])
+    assert len(subset) == 2
+    assert [state.label for state in subset.states] == ["账号3", "u3"]
+    assert subset.states[0].attempt_count == 7
+    assert subset.select(PUBLISHED) == [1]
+    assert subset.cookie(0) == "PHPSESSID=2"
+
+
+def test_copy_and_state_rows_are_independent():
+    registry = AccountRegistry([account(0)])
+    copy = registry.copy()
+    copy.states[0].attempt_count = 3
+    assert registry.states[0].attempt_count == 0
+    registry.set_state_row(0, copy.state_row(0))
+    assert registry.states[0].attempt_count == 3
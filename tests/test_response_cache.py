@@ -0,0 +1,113 @@
+import threading
+
+from requests.structures import CaseInsensitiveDict
+
+from scorecheck import engine as engine_module
+from scorecheck.config import build_account
+from scorecheck.engine import PollEngine, QueryResult, query_score
+from scorecheck.logpipe import INFO
+from scorecheck.response_cache import ResponseCache
+
+URL = "https://example.com/query/score/result"
+
+
+class FakeResponse:
+    def __init__(self, body, status_code=200, headers=None):
+        self.content = body.encode("utf-8")
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict({"Content-Type": "application/json"}, **(headers or {}))
+        self.timings = {"total": 0.01}
+
+    def json(self):
+        import json
+        return json.loads(self.content)
+
+
+class FakeSession:
+    """按Cookie返回预设响应，记录每次请求带的请求头"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.sent = []
+
+    def post(self, url, cookie, user_agent, data, timeout=15, headers=None):
+        self.sent.append((cookie, headers))
+        return self.responses[cookie]()
+
+
+def params(cookie):
+    return {"url": URL, "stage": "2025年上半年", "cookie": cookie, "user_agent": "test"}
+
+
+def test_keys_are_per_account():
+    assert ResponseCache.key(URL, "s", "PHPSESSID=a") != ResponseCache.key(URL, "s", "PHPSESSID=b")
+    # 只有非会话Cookie变化时仍是同一个账号
+    assert ResponseCache.key(URL, "s", "PHPSESSID=a; t=1") == ResponseCache.key(URL, "s", "t=2; PHPSESSID=a")
+
+
+def test_fingerprint_hit_reuses_own_verdict():
+    cache = ResponseCache()
+    body = '{"msg": "未公布"}'
+    session = FakeSession({"PHPSESSID=a": lambda: FakeResponse(body)})
+    first = query_score(params("PHPSESSID=a"), session=session, cache=cache)
+    second = query_score(params("PHPSESSID=a"), session=session, cache=cache)
+    assert not first.unchanged
+    assert second.unchanged and second.result == first.result
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_success_is_not_shared_between_accounts():
+    cache = ResponseCache()
+    body = '{"msg": "ok", "data": {"score": 60}}'
+    session = FakeSession({
+        "PHPSESSID=a": lambda: FakeResponse(body, headers={"ETag": '"v1"'}),
+        "PHPSESSID=b": lambda: FakeResponse("", status_code=304),
+    })
+    assert query_score(params("PHPSESSID=a"), session=session, cache=cache).success
+    outcome = query_score(params("PHPSESSID=b"), session=session, cache=cache)
+    # B 没有带 A 的条件请求头，304也不会拿到 A 的成绩
+    assert session.sent[1] == ("PHPSESSID=b", None)
+    assert not outcome.success
+    assert outcome.result != {"score": 60}
+
+
+def test_not_modified_uses_own_validators():
+    cache = ResponseCache()
+    responses = iter([FakeResponse('{"msg": "未公布"}', headers={"ETag": '"v1"'}), FakeResponse("", 304)])
+    session = FakeSession({"PHPSESSID=a": lambda: next(responses)})
+    query_score(params("PHPSESSID=a"), session=session, cache=cache)
+    outcome = query_score(params("PHPSESSID=a"), session=session, cache=cache)
+    assert session.sent[1] == ("PHPSESSID=a", {"If-None-Match": '"v1"'})
+    assert outcome.unchanged and outcome.result == "成绩未公布: 未公布"
+
+
+def test_concurrent_access():
+    cache = ResponseCache()
+    keys = [ResponseCache.key(URL, "s", f"PHPSESSID={i}") for i in range(50)]
+
+    def work(key):
+        for n in range(200):
+            cache.store(key, bytes([n % 3]), False, "x", {})
+            cache.lookup(key, bytes([n % 3]))
+
+    threads = [threading.Thread(target=work, args=(key,)) for key in keys]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(cache) == 50
+    assert cache.hits == 50 * 200
+
+
+def test_engine_does_not_log_unchanged_results(monkeypatch):
+    outcomes = iter([False, True, True])
+
+    def query_score(params, log, session, cache):
+        return QueryResult(False, "成绩未公布: 未公布", 200, timings={"total": 0.01}, unchanged=next(outcomes))
+
+    monkeypatch.setattr(engine_module, "query_score", query_score)
+    logs = []
+    account = build_account({"url": URL, "stage": "x", "cookie": "PHPSESSID=1", "interval": 1, "jitter": 0,
+                             "max_attempts": 3})
+    PollEngine([account], log=lambda message, level=INFO: logs.append((message, level)), prewarm_lead=0).run()
+    assert [message for message, _ in logs if message.startswith("查询结果")] == ["查询结果: 成绩未公布: 未公布"]
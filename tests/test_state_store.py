@@ -0,0 +1,93 @@
+from concurrent.futures import Future
+
+import pytest
+
+from scorecheck import engine as engine_module
+from scorecheck.config import build_account
+from scorecheck.engine import PollEngine, QueryResult
+from scorecheck.state_store import StateStore, account_key
+
+URL = "https://example.com/query/score/result"
+SMTP = {"smtp_server": "smtp.example.com", "sender_email": "a@example.com", "sender_pwd": "x"}
+
+
+class FakeMailer:
+    """记录提交的邮件，发给 failing 中收件人的邮件发送失败"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    def submit(self, profile, receivers, subject, html):
+        future = Future()
+        if self.failing.intersection(receivers):
+            future.set_exception(OSError("SMTP连接失败"))
+        else:
+            self.sent.append((receivers[0], subject))
+            future.set_result(True)
+        return future
+
+    def join(self, timeout=None):
+        return True
+
+
+@pytest.fixture
+def published(monkeypatch):
+    monkeypatch.setattr(engine_module, "query_score", lambda *args: QueryResult(True, {"score": 60}, 200,
+                                                                                 timings={"total": 0.01}))
+
+
+def watchers():
+    # 两个收件人关注同一考生，共用Cookie
+    return [build_account(dict(SMTP, url=URL, stage="x", cookie="PHPSESSID=1", name=name, receiver_email=receiver))
+            for name, receiver in (("爸爸", "dad@example.com"), ("妈妈", "mom@example.com"))]
+
+
+def run(path, mailer):
+    store = StateStore(path)
+    engine = PollEngine(watchers(), store=store, mailer=mailer, prewarm_lead=0)
+    engine.run()
+    store.close()
+    return engine
+
+
+def test_key_includes_receiver():
+    assert account_key(URL, "x", "c", "a@example.com") != account_key(URL, "x", "c", "b@example.com")
+    # 没有收件人时与旧版本的键相同
+    assert account_key(URL, "x", "c", "") == account_key(URL, "x", "c")
+
+
+def test_shared_cookie_watchers_keep_separate_rows(tmp_path, published):
+    path = str(tmp_path / "state.db")
+    first = run(path, FakeMailer(failing={"mom@example.com"}))
+    assert [state.notified for state in first.states] == [True, False]
+    store = StateStore(path)
+    assert len(store.load()) == 2
+    store.close()
+
+    # 重启后只给上次没有收到通知的收件人补发
+    mailer = FakeMailer()
+    second = run(path, mailer)
+    assert mailer.sent == [("mom@example.com", "成绩已公布")]
+    assert [state.notified for state in second.states] == [True, True]
+
+
+def test_legacy_rows_are_adopted_only_for_unshared_cookies(tmp_path, published):
+    path = str(tmp_path / "state.db")
+    store = StateStore(path)
+    # 旧版本的键不含收件人
+    for cookie in ("PHPSESSID=1", "PHPSESSID=2"):
+        store.put(account_key(URL, "x", cookie), label="旧记录", attempts=3, fails=3, errors=0, last_status=3,
+                  last_code=200, cookie_status=1, published=1, notified=1, quarantined=0)
+    store.close()
+
+    accounts = watchers() + [build_account(dict(SMTP, url=URL, stage="x", cookie="PHPSESSID=2", name="单独",
+                                                receiver_email="solo@example.com"))]
+    store = StateStore(path)
+    mailer = FakeMailer()
+    engine = PollEngine(accounts, store=store, mailer=mailer, prewarm_lead=0)
+    engine.run()
+    store.close()
+    # 单独的账号沿用旧记录，不再重发；共用Cookie的旧记录分不清是谁的，重新查询并通知
+    assert sorted(receiver for receiver, _ in mailer.sent) == ["dad@example.com", "mom@example.com"]
+    assert engine.states[2].attempt_count == 3
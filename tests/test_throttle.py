@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from scorecheck.engine import PollEngine
+from scorecheck.throttle import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, TokenBucket
+
+
+def test_bucket_burst_then_rate():
+    bucket = TokenBucket(rate=2, burst=2)
+    assert bucket.reserve(0.0) == 0.0
+    assert bucket.reserve(0.0) == 0.0
+    # 令牌用完后按预约顺序排队，每个间隔 1/rate 秒
+    assert bucket.reserve(0.0) == pytest.approx(0.5)
+    assert bucket.reserve(0.0) == pytest.approx(1.0)
+    # 补充不超过 burst
+    assert bucket.reserve(100.0) == 0.0
+    assert bucket.try_take(100.0)
+    assert not bucket.try_take(100.0)
+
+
+def test_try_take_does_not_reserve():
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.try_take(0.0)
+    assert not bucket.try_take(0.5)
+    assert bucket.reserve(0.5) == pytest.approx(0.5)
+
+
+def test_breaker_opens_probes_and_recovers():
+    changes = []
+    breaker = CircuitBreaker(threshold=3, cooldown=10, on_change=changes.append)
+    for _ in range(2):
+        breaker.record(True, 0.0)
+    assert breaker.state == CLOSED and breaker.allow(0.0)
+    breaker.record(True, 0.0)
+    assert breaker.state == OPEN
+    assert not breaker.allow(5.0)
+    assert 10.0 <= breaker.retry_at(5.0) <= 15.0
+    # 冷却结束只放行一个试探请求
+    assert breaker.allow(10.0)
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow(10.5)
+    breaker.record(False, 11.0)
+    assert breaker.state == CLOSED and breaker.allow(11.0)
+    assert changes == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_failed_probe_doubles_cooldown():
+    breaker = CircuitBreaker(threshold=1, cooldown=10, max_cooldown=30)
+    breaker.record(True, 0.0)
+    assert breaker.allow(10.0)
+    breaker.record(True, 10.0)
+    assert breaker.state == OPEN and breaker.cooldown == 20
+    assert not breaker.allow(25.0)
+    assert breaker.allow(30.0)
+    breaker.record(True, 30.0)
+    assert breaker.cooldown == 30
+
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(threshold=2, cooldown=10)
+    breaker.record(True, 0.0)
+    breaker.record(False, 0.0)
+    breaker.record(True, 0.0)
+    assert breaker.state == CLOSED
+
+
+def test_open_breaker_does_not_consume_tokens():
+    engine = PollEngine([])
+    host = "example.com"
+    bucket = engine._limiters[host] = TokenBucket(rate=1, burst=1)
+    breaker = engine._breakers[host] = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record(True, time.time())
+
+    async def throttle():
+        engine._stopping = asyncio.Event()
+        return [await engine._throttle(host) for _ in range(5)]
+
+    assert all(retry_at is not None for retry_at in asyncio.run(throttle()))
+    # 熔断期间被拒绝的查询没有占用令牌
+    assert bucket.try_take(time.time())
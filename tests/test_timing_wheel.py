@@ -0,0 +1,91 @@
+import random
+
+from scorecheck.timing_wheel import TimingWheel
+
+
+def wheel(**kwargs):
+    return TimingWheel(tick=1, slots=4, levels=2, origin=0, **kwargs)
+
+
+def test_due_keys_are_returned_in_batches():
+    w = wheel()
+    w.schedule("a", 2)
+    w.schedule("b", 2)
+    w.schedule("c", 3)
+    assert w.advance(1) == []
+    assert sorted(w.advance(2)) == ["a", "b"]
+    assert w.advance(3) == ["c"]
+    assert len(w) == 0
+
+
+def test_never_fires_early():
+    w = wheel()
+    w.schedule("a", 2.5)
+    assert w.advance(2.4) == []
+    assert w.advance(3) == ["a"]
+
+
+def test_past_times_are_ready_immediately():
+    w = wheel()
+    w.advance(5)
+    w.schedule("late", 1)
+    assert w.next_due() == 5
+    assert w.advance(5) == ["late"]
+
+
+def test_cancel_and_reschedule():
+    w = wheel()
+    w.schedule("a", 3)
+    w.schedule("b", 3)
+    assert w.cancel("a")
+    assert not w.cancel("a")
+    assert "a" not in w
+    w.schedule("b", 6)
+    assert w.advance(5) == []
+    assert w.advance(6) == ["b"]
+
+
+def test_entries_cascade_from_upper_levels_and_overflow():
+    # 4个槽、2层：第0层覆盖4个tick，第1层16个，更远的放在溢出表中
+    w = wheel()
+    for when in (5, 17, 40, 100):
+        w.schedule(when, when)
+    fired = {}
+    for now in range(1, 101):
+        for key in w.advance(now):
+            fired[key] = now
+    assert fired == {5: 5, 17: 17, 40: 40, 100: 100}
+
+
+def test_next_due_skips_empty_ticks():
+    w = wheel()
+    assert w.next_due() is None
+    w.schedule("a", 37)
+    due = w.next_due()
+    assert due <= 37
+    # next_due 可能是级联的时刻，一直推进到它，键最终在到期时返回
+    fired = []
+    while not fired:
+        fired = w.advance(w.next_due())
+    assert fired == ["a"]
+    assert w.time_of(w._current) == 37
+
+
+def test_matches_sorted_order_on_random_schedule():
+    rng = random.Random(1)
+    w = TimingWheel(tick=0.5, slots=8, levels=3, origin=0)
+    expected = {}
+    for key in range(500):
+        when = rng.uniform(0, 600)
+        w.schedule(key, when)
+        expected[key] = when
+    for key in range(0, 500, 7):
+        w.cancel(key)
+        del expected[key]
+    now = 0
+    while len(w):
+        now = w.next_due()
+        for key in w.advance(now):
+            assert expected[key] <= now < expected[key] + 0.5 + 1e-9
+            del expected[key]
+    assert not expected